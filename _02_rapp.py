@@ -1,171 +1,799 @@
 import pandas as pd
+import numpy as np
 import re
 import _04_pdf_utils as pdf_utils
 import io
+import os
+import time
+import pickle
+import datetime
+import tempfile
+import threading
 import openpyxl
-from openpyxl.styles import Font, Alignment, Border, Side
+import config
 
-def executer_rapprochement(data_banque, data_compta, data_etat_prec=None, date_rapprochement=None):
+try:
+    import pyarrow.parquet as pq # Lecture des journaux Parquet (colonnes utiles seulement)
+except ImportError:
+    pq = None
+from collections import deque
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, Border, Side, NamedStyle
+
+# ----------------------------------------------------------------------------------
+# INDEX DE POINTAGE PAR MONTANT
+# Multimap montant -> file (deque) des indices disponibles, dans l'ordre du DataFrame.
+# Remplace les filtres "df[(df[col] == montant) & (~df.index.isin(utilises))]" :
+# chaque recherche devient O(1) amorti au lieu d'un balayage complet du DataFrame.
+# ----------------------------------------------------------------------------------
+def construire_index_montants(series):
+    """Construit {montant: deque(indices)} pour les montants strictement positifs d'une colonne."""
+    index = {}
+    for idx, val in series[series > 0].items():
+        index.setdefault(val, deque()).append(idx)
+    return index
+
+def prendre_premier_disponible(index, montant, utilises):
     """
-    Exécute le rapprochement bancaire entièrement en mémoire.
-    
-    Args:
-        data_banque: DataFrame ou file-like object (Excel)
-        data_compta: DataFrame ou file-like object (Excel)
-        data_etat_prec: DataFrame ou file-like object (Excel) (Optionnel)
-        date_rapprochement: Date/Datetime/String
-        
-    Returns:
-        tuple: (excel_bytes: io.BytesIO, pdf_bytes: bytes, stats: dict)
+    Retourne (et consomme) le premier indice non encore utilisé pour ce montant, ou None.
+    Les indices consommés via un autre index (ex: ligne pointée en débit ET en crédit) sont
+    écartés paresseusement grâce à l'ensemble 'utilises'.
     """
-    
-    # Helpers pour la gestion des dates
-    def format_date_val(val):
-        if pd.isna(val): return ""
-        try:
-            return pd.to_datetime(val, dayfirst=True).strftime('%d/%m/%Y')
-        except:
-            return val
-    
-    def get_date_obj(val):
-        if pd.isna(val): return pd.Timestamp.min
+    file = index.get(montant)
+    while file:
+        idx = file.popleft()
+        if idx not in utilises:
+            utilises.add(idx)
+            return idx
+    return None
+
+# ----------------------------------------------------------------------------------
+# NORMALISATION DES DATES
+# Chaque colonne de dates est parsée une seule fois, de façon vectorisée : les valeurs distinctes
+# sont essayées contre une cascade de formats explicites, puis (en dernier recours) par le parseur
+# générique jour/mois. Les chaînes déjà rencontrées sont mémorisées d'un appel à l'autre.
+# ----------------------------------------------------------------------------------
+FORMATS_DATES = ('%d/%m/%Y', '%d/%m/%y', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d-%m-%Y', '%d.%m.%Y')
+MAX_CACHE_DATES = 100000
+_cache_dates = {}       # texte -> date, partagé entre les rapprochements (les plus anciens sortent en premier)
+_verrou_cache_dates = threading.Lock()
+
+def _memoriser_dates(nouvelles: dict):
+    """Ajoute des dates au cache partagé, en évinçant les plus anciennes au-delà de MAX_CACHE_DATES (jamais de vidage)."""
+    with _verrou_cache_dates:
+        _cache_dates.update(nouvelles)
+        while len(_cache_dates) > MAX_CACHE_DATES:
+            _cache_dates.pop(next(iter(_cache_dates)))
+
+def _parser_date_libre(val):
+    """Dernier recours (valeur hors cascade) : parseur générique, jour en premier."""
+    try:
+        return pd.Timestamp(pd.to_datetime(val, dayfirst=True))
+    except Exception:
+        return pd.NaT
+
+def normaliser_dates(values):
+    """
+    Parse une colonne de dates (texte, dates, Timestamps...) en une passe.
+    Retourne (dates: Series datetime64 avec NaT si invalide, vides: masque numpy des valeurs manquantes).
+    Les textes sont convertis via une table locale (cache partagé lu puis complété) : une éviction
+    concurrente du cache ne peut pas faire échouer la conversion.
+    """
+    serie = pd.Series(values).reset_index(drop=True)
+    vides = serie.isna().to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie, vides
+
+    valeurs = serie[~vides].astype(object)
+    est_texte = (valeurs.map(type) == str).to_numpy()
+    textes = valeurs[est_texte].unique()
+    correspondance = {}
+    a_parser = []
+    for t in textes:
+        date = _cache_dates.get(t)
+        if date is None: a_parser.append(t)
+        else: correspondance[t] = date
+    if a_parser:
+        nouvelles = {}
+        restants = pd.Index(a_parser, dtype=object)
+        for fmt in FORMATS_DATES:
+            if restants.empty: break
+            parses = pd.to_datetime(restants, format=fmt, errors='coerce')
+            ok = ~parses.isna()
+            nouvelles.update(zip(restants[ok], parses[ok]))
+            restants = restants[~ok]
+        for t in restants:
+            nouvelles[t] = _parser_date_libre(t)
+        correspondance.update(nouvelles)
+        _memoriser_dates(nouvelles)
+
+    converties = pd.Series(pd.NaT, index=valeurs.index, dtype='datetime64[ns]')
+    if est_texte.any():
+        converties[est_texte] = pd.to_datetime(valeurs[est_texte].map(correspondance), errors='coerce').to_numpy()
+    if not est_texte.all():
+        # Dates, Timestamps, nombres... : un seul appel vectorisé (pas de mémo, réservé aux textes)
+        autres = valeurs[~est_texte]
         try:
-            return pd.to_datetime(val, dayfirst=True)
-        except:
-            return pd.Timestamp.min
+            parses = pd.to_datetime(autres, errors='coerce', dayfirst=True)
+        except (TypeError, ValueError):
+            # Types incompatibles entre eux (ex: fuseaux horaires différents) : valeur par valeur
+            parses = pd.to_datetime(autres.map(_parser_date_libre), errors='coerce')
+        converties[~est_texte] = parses.to_numpy()
 
-    def load_data(data, header=0):
-        if data is None: return None
-        if isinstance(data, pd.DataFrame):
-            return data.copy()
-        return pd.read_excel(data, header=header)
+    dates = pd.Series(pd.NaT, index=serie.index, dtype='datetime64[ns]')
+    if len(valeurs):
+        dates[~vides] = converties.to_numpy()
+    return dates, vides
 
-    # Chargement
+def dates_tri_et_affichage(values):
+    """
+    Pour une colonne de dates : (clés de tri datetime64, libellés jj/mm/aaaa).
+    Valeur vide -> (Timestamp.min, "") ; valeur non reconnue -> (Timestamp.min, valeur d'origine).
+    """
+    dates, vides = normaliser_dates(values)
+    originales = pd.Series(values).reset_index(drop=True)
+    invalides = dates.isna().to_numpy()
+    tri = dates.where(~invalides, pd.Timestamp.min).to_numpy()
+    affichage = dates.dt.strftime('%d/%m/%Y').to_numpy(dtype=object)
+    affichage[invalides] = originales.to_numpy(dtype=object)[invalides]
+    affichage[vides] = ""
+    return tri, affichage
+
+# ----------------------------------------------------------------------------------
+# POINTAGE APPROCHÉ (TOLÉRANCE DE MONTANT + FENÊTRE DE DATES)
+# Index trié par montant, puis par date à montant égal : les montants de la tolérance sont trouvés
+# par np.searchsorted, et dans chaque montant la date la plus proche aussi (O(log n) par montant
+# distinct, même pour les montants récurrents : loyers, salaires, frais). Les lignes déjà pointées
+# sont sautées grâce à des tableaux "suivant libre" (union-find), dans chaque sens de parcours.
+# ----------------------------------------------------------------------------------
+NAT_JOURS = np.iinfo(np.int64).min
+EPSILON_MONTANT = 1e-6
+
+def dates_en_jours(series):
+    """Convertit une colonne de dates (texte jj/mm/aaaa ou dates) en nombre de jours (int64, NAT_JOURS si invalide)."""
+    dates, _ = normaliser_dates(series)
+    jours = dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+    jours[dates.isna().to_numpy()] = NAT_JOURS
+    return jours
+
+def construire_index_trie(montants, jours, indices):
+    """
+    Index des lignes à montant strictement positif, trié par montant (ordre du fichier conservé à montant égal).
+    Pour chaque montant distinct (cle), ses lignes datées sont aussi triées par (jour, rang dans le fichier)
+    et ses lignes sans date par rang, pour trouver la date la plus proche par np.searchsorted.
+    """
+    montants = np.asarray(montants, dtype=float)
+    positifs = np.flatnonzero(montants > 0)
+    ordre = positifs[np.argsort(montants[positifs], kind='stable')]
+    montants_tries = montants[ordre]
+    jours_tries = np.asarray(jours, dtype=np.int64)[ordre]
+    n = len(ordre)
+
+    cles, debuts_cles = np.unique(montants_tries, return_index=True)
+    cle_de = np.repeat(np.arange(len(cles)), np.diff(np.append(debuts_cles, n)))
+    datees = jours_tries != NAT_JOURS
+    # Positions (dans l'ordre par montant) des lignes datées, triées par (montant, jour, rang)
+    par_date = np.flatnonzero(datees)
+    par_date = par_date[np.lexsort((par_date, jours_tries[par_date], cle_de[par_date]))]
+    sans_date = np.flatnonzero(~datees)
+    return {
+        'montants': montants_tries,
+        'jours': jours_tries,
+        'indices': [indices[i] for i in ordre],
+        'rangs': ordre,
+        'suivant': list(range(n + 1)),
+        # Montants distincts : bornes dans l'ordre par montant, suivant montant non épuisé
+        'cles': cles,
+        'bornes_cles': np.append(debuts_cles, n),
+        'suivant_cle': list(range(len(cles) + 1)),
+        # Lignes datées par (montant, jour, rang) : parcours vers la droite et vers la gauche (positions miroir)
+        'par_date': par_date,
+        'jours_par_date': jours_tries[par_date],
+        'bornes_date': np.searchsorted(cle_de[par_date], np.arange(len(cles) + 1), side='left'),
+        'suivant_date': list(range(len(par_date) + 1)),
+        'precedent_date': list(range(len(par_date) + 1)),
+        # Lignes sans date par (montant, rang)
+        'sans_date': sans_date,
+        'bornes_sans_date': np.searchsorted(cle_de[sans_date], np.arange(len(cles) + 1), side='left'),
+        'suivant_sans_date': list(range(len(sans_date) + 1)),
+    }
+
+def _suivant_libre(suivant, pos):
+    """Première position non consommée >= pos (avec compression de chemin)."""
+    racine = pos
+    while suivant[racine] != racine:
+        racine = suivant[racine]
+    while suivant[pos] != racine:
+        suivant[pos], pos = racine, suivant[pos]
+    return racine
+
+def _premier_disponible(suivant, pos, fin, est_pris):
+    """Première position >= pos (et < fin) dont la ligne n'est pas pointée ; les lignes pointées rencontrées sont retirées."""
+    pos = _suivant_libre(suivant, pos)
+    while pos < fin and est_pris(pos):
+        suivant[pos] = pos + 1
+        pos = _suivant_libre(suivant, pos + 1)
+    return pos
+
+def _dernier_disponible(precedent, pos, debut, est_pris):
+    """Dernière position <= pos (et >= debut) dont la ligne n'est pas pointée, debut - 1 sinon (parcours en positions miroir)."""
+    n = len(precedent) - 1
+    miroir = _premier_disponible(precedent, n - 1 - pos, n - debut, lambda m: est_pris(n - 1 - m))
+    return n - 1 - miroir
+
+def _meilleur_candidat_montant(index, cle, jour, fenetre_jours, est_pris):
+    """
+    Pour un montant distinct de l'index : position (ordre par montant) de la ligne la mieux placée,
+    sa distance en jours (None : date inconnue ou fenêtre non utilisée) et si sa date est inconnue.
+    Les lignes datées hors fenêtre sont exclues. Retourne une liste de 0 à 2 candidats (datée, sans date).
+    """
+    if fenetre_jours is None or jour == NAT_JOURS:
+        # Pas de critère de date : la ligne la plus haute dans le fichier
+        debut, fin = index['bornes_cles'][cle], index['bornes_cles'][cle + 1]
+        pos = _premier_disponible(index['suivant'], debut, fin, est_pris)
+        return [(pos, None, fenetre_jours is not None)] if pos < fin else []
+
+    candidats = []
+    par_date, jours_par_date = index['par_date'], index['jours_par_date']
+    debut, fin = index['bornes_date'][cle], index['bornes_date'][cle + 1]
+    pris_date = lambda p: est_pris(par_date[p])
+    if debut < fin:
+        milieu = debut + int(np.searchsorted(jours_par_date[debut:fin], jour, side='left'))
+        proches = []
+        droite = _premier_disponible(index['suivant_date'], milieu, fin, pris_date)
+        if droite < fin and jours_par_date[droite] - jour <= fenetre_jours:
+            proches.append((int(jours_par_date[droite]) - int(jour), par_date[droite]))
+        gauche = _dernier_disponible(index['precedent_date'], milieu - 1, debut, pris_date) if milieu > debut else debut - 1
+        if gauche >= debut and jour - jours_par_date[gauche] <= fenetre_jours:
+            # Même jour : la ligne la plus haute dans le fichier (premier disponible du jour)
+            jour_g = jours_par_date[gauche]
+            premier_jour = debut + int(np.searchsorted(jours_par_date[debut:fin], jour_g, side='left'))
+            gauche = _premier_disponible(index['suivant_date'], premier_jour, fin, pris_date)
+            proches.append((int(jour) - int(jour_g), par_date[gauche]))
+        if proches:
+            ecart, pos = min(proches, key=lambda c: (c[0], index['rangs'][c[1]]))
+            candidats.append((pos, ecart, False))
+
+    sans_date = index['sans_date']
+    debut, fin = index['bornes_sans_date'][cle], index['bornes_sans_date'][cle + 1]
+    if debut < fin:
+        p = _premier_disponible(index['suivant_sans_date'], debut, fin, lambda q: est_pris(sans_date[q]))
+        if p < fin:
+            candidats.append((sans_date[p], None, True))
+    return candidats
+
+def chercher_pointage_approche(index, montant, jour, tolerance, fenetre_jours, utilises):
+    """
+    Meilleur candidat disponible pour (montant, jour) dans l'index trié, puis consommation de ce candidat.
+    Score = 1 - 0.5 * écart_montant / tolérance - 0.5 * écart_jours / fenêtre (1.0 = montant et date identiques).
+    À score égal, la ligne la plus haute dans le fichier l'emporte. Retourne None si aucun candidat.
+    Chaque montant distinct de la tolérance ne propose que sa ligne la plus proche en date (recherche dichotomique).
+    """
+    montants = index['montants']
+    indices = index['indices']
+    est_pris = lambda pos: indices[pos] in utilises
+    cles, bornes = index['cles'], index['bornes_cles']
+    debut = int(np.searchsorted(cles, montant - tolerance - EPSILON_MONTANT, side='left'))
+    fin = int(np.searchsorted(cles, montant + tolerance + EPSILON_MONTANT, side='right'))
+
+    meilleur = None
+    cle = _suivant_libre(index['suivant_cle'], debut)
+    while cle < fin:
+        # Montant épuisé (toutes ses lignes pointées) : retiré définitivement de l'index des montants
+        if _premier_disponible(index['suivant'], bornes[cle], bornes[cle + 1], est_pris) >= bornes[cle + 1]:
+            index['suivant_cle'][cle] = cle + 1
+            cle = _suivant_libre(index['suivant_cle'], cle + 1)
+            continue
+
+        for pos, ecart_jours, sans_date in _meilleur_candidat_montant(index, cle, jour, fenetre_jours, est_pris):
+            ecart_montant = abs(montants[pos] - montant)
+            score = 1.0
+            if tolerance > 0:
+                score -= 0.5 * ecart_montant / tolerance
+            if sans_date:
+                # Date inconnue : candidat admis avec la pénalité maximale de date
+                score -= 0.5
+            elif ecart_jours is not None and fenetre_jours > 0:
+                score -= 0.5 * ecart_jours / fenetre_jours
+
+            cle_tri = (-score, index['rangs'][pos])
+            if meilleur is None or cle_tri < meilleur[0]:
+                meilleur = (cle_tri, pos, score, ecart_montant, ecart_jours)
+        cle = _suivant_libre(index['suivant_cle'], cle + 1)
+
+    if meilleur is None:
+        return None
+    _, pos, score, ecart_montant, ecart_jours = meilleur
+    idx = indices[pos]
+    utilises.add(idx)
+    return idx, round(score, 4), ecart_montant, ecart_jours
+
+def colonne_date(df, preferences=()):
+    """Première colonne de date du DataFrame (en privilégiant les noms donnés dans 'preferences')."""
+    for nom in preferences:
+        if nom in df.columns: return nom
+    return next((c for c in df.columns if 'date' in str(c).lower()), None)
+
+# ----------------------------------------------------------------------------------
+# POINTAGE PAR REGROUPEMENT (1 LIGNE = SOMME DE 2 A N LIGNES DE L'AUTRE COTE)
+# Ex: une remise de chèques créditée en une fois sur le relevé, saisie chèque par chèque au journal.
+# Recherche bornée : deux pointeurs pour les paires et triplets, parcours élagué au-delà,
+# nombre de candidats plafonné et budget de temps global.
+# ----------------------------------------------------------------------------------
+MAX_CANDIDATS_REGROUPEMENT = 60
+
+class BudgetEpuise(Exception):
+    pass
+
+def _en_centimes(montant):
+    return int(round(float(montant) * 100))
+
+def _paire_deux_pointeurs(valeurs, cible, debut):
+    """Indices (i, j) avec debut <= i < j et valeurs[i] + valeurs[j] == cible (valeurs triées), ou None."""
+    i, j = debut, len(valeurs) - 1
+    while i < j:
+        somme = valeurs[i] + valeurs[j]
+        if somme == cible: return (i, j)
+        if somme < cible: i += 1
+        else: j -= 1
+    return None
+
+def trouver_combinaison(valeurs, cible, taille_max, echeance):
+    """
+    Cherche des indices de 'valeurs' (entiers > 0 triés croissants) dont la somme vaut exactement 'cible',
+    en essayant d'abord les plus petites combinaisons (2, puis 3... jusqu'à taille_max).
+    Lève BudgetEpuise si l'échéance (time.monotonic()) est dépassée.
+    """
+    n = len(valeurs)
+
+    def chercher(debut, reste, k):
+        if time.monotonic() > echeance: raise BudgetEpuise()
+        if k == 2:
+            paire = _paire_deux_pointeurs(valeurs, reste, debut)
+            return list(paire) if paire else None
+        plus_grands = sum(valeurs[n - k + 1:]) if k > 1 else 0
+        for i in range(debut, n - k + 1):
+            v = valeurs[i]
+            # Valeurs triées : les k plus petites restantes dépassent déjà le reste -> inutile de continuer
+            if v * k > reste: break
+            # Même avec les plus grandes valeurs on n'atteint pas le reste -> candidat suivant
+            if v + plus_grands < reste: continue
+            suite = chercher(i + 1, reste - v, k - 1)
+            if suite: return [i] + suite
+        return None
+
+    for k in range(2, min(taille_max, n) + 1):
+        trouve = chercher(0, cible, k)
+        if trouve: return trouve
+    return None
+
+def pointer_regroupements(cibles, candidats, taille_max, fenetre_jours, echeance, utilises_cibles, utilises_candidats):
+    """
+    Explique chaque ligne 'cible' restante par une somme de lignes 'candidats' restantes.
+    cibles / candidats : listes de (indice, montant, jour) à montant > 0.
+    Les candidats sont triés une seule fois par date puis montant : pour chaque cible, la fenêtre de dates
+    est une tranche trouvée par np.searchsorted, filtrée (montant < cible, non utilisé) en NumPy.
+    Retourne la liste des groupes (indice_cible, [indices_candidats]).
+    """
+    groupes = []
+    if len(candidats) < 2: return groupes
+
+    valeurs = np.array([_en_centimes(m) for _, m, _ in candidats], dtype=np.int64)
+    jours = np.array([j for _, _, j in candidats], dtype=np.int64)
+    libres = np.array([idx not in utilises_candidats for idx, _, _ in candidats], dtype=bool)
+    connus = np.lexsort((valeurs, jours))
+    connus = connus[jours[connus] != NAT_JOURS]
+    jours_connus = jours[connus]
+    inconnus = np.flatnonzero(jours == NAT_JOURS)
+    tous = np.arange(len(candidats))
+    sans_date = 10**9
+
+    for idx_t, montant_t, jour_t in cibles:
+        if time.monotonic() > echeance: raise BudgetEpuise()
+        if idx_t in utilises_cibles: continue
+        cible = _en_centimes(montant_t)
+
+        # Candidats dans la fenêtre de dates (ceux sans date sont toujours retenus, au plus loin)
+        if jour_t == NAT_JOURS:
+            positions, ecarts = tous, np.full(len(tous), sans_date, dtype=np.int64)
+        else:
+            debut, fin = 0, len(connus)
+            if fenetre_jours is not None:
+                debut = np.searchsorted(jours_connus, jour_t - fenetre_jours, side='left')
+                fin = np.searchsorted(jours_connus, jour_t + fenetre_jours, side='right')
+            positions = np.concatenate((connus[debut:fin], inconnus))
+            ecarts = np.concatenate((np.abs(jours_connus[debut:fin] - jour_t), np.full(len(inconnus), sans_date, dtype=np.int64)))
+        garde = libres[positions] & (valeurs[positions] < cible)
+        positions, ecarts = positions[garde], ecarts[garde]
+        if len(positions) < 2: continue
+
+        # Plafond : on garde les candidats les plus proches en date (ordre du fichier à écart égal),
+        # puis tri par montant (ordre précédent conservé à montant égal)
+        if len(positions) > MAX_CANDIDATS_REGROUPEMENT:
+            proches = np.lexsort((positions, ecarts))[:MAX_CANDIDATS_REGROUPEMENT]
+            positions, ecarts = positions[proches], ecarts[proches]
+            positions = positions[np.lexsort((positions, ecarts, valeurs[positions]))]
+        else:
+            positions = positions[np.lexsort((positions, valeurs[positions]))]
+
+        combinaison = trouver_combinaison(valeurs[positions].tolist(), cible, taille_max, echeance)
+        if combinaison:
+            retenus = positions[combinaison]
+            libres[retenus] = False
+            membres = [candidats[i][0] for i in retenus.tolist()]
+            utilises_cibles.add(idx_t)
+            utilises_candidats.update(membres)
+            groupes.append((idx_t, membres))
+    return groupes
+
+# ----------------------------------------------------------------------------------
+# ECRITURE DU CLASSEUR EXCEL EN UNE SEULE PASSE
+# Classeur openpyxl en mode write-only : chaque feuille est émise ligne par ligne, sans relecture
+# ni second enregistrement. Les styles sont des styles nommés partagés, enregistrés une fois
+# par classeur, et le format #,##0 est posé colonne par colonne au moment de l'écriture.
+# ----------------------------------------------------------------------------------
+FORMAT_MONTANT = '#,##0'
+MOTS_COLONNES_MONTANT = ('debit', 'credit', 'montant')
+
+def _enregistrer_styles(wb):
+    bordure = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+    centre = Alignment(horizontal="center", vertical="center")
+    gras = Font(bold=True)
+    styles = [
+        # Feuilles de suspens (mêmes en-têtes que pandas.to_excel)
+        NamedStyle(name='entete_feuille', font=gras, border=bordure, alignment=Alignment(horizontal='center', vertical='top')),
+        NamedStyle(name='montant', number_format=FORMAT_MONTANT),
+        NamedStyle(name='date', number_format='YYYY-MM-DD'),
+        NamedStyle(name='date_heure', number_format='YYYY-MM-DD HH:MM:SS'),
+        # Feuille RAPPROCHEMENT
+        NamedStyle(name='rapp_entete', font=gras, border=bordure, alignment=centre),
+        NamedStyle(name='rapp_cellule', border=bordure, alignment=centre),
+        NamedStyle(name='rapp_libelle', border=bordure, alignment=Alignment(horizontal='left')),
+        NamedStyle(name='rapp_montant', border=bordure, alignment=centre, number_format=FORMAT_MONTANT),
+        NamedStyle(name='rapp_bordure', border=bordure),
+        NamedStyle(name='rapp_total_libelle', font=gras, border=bordure, alignment=Alignment(horizontal='center')),
+        NamedStyle(name='rapp_total_montant', font=gras, border=bordure, alignment=centre, number_format=FORMAT_MONTANT),
+    ]
+    for style in styles:
+        wb.add_named_style(style)
+
+def _cellule(ws, valeur=None, style=None):
+    cell = WriteOnlyCell(ws, value=valeur)
+    if style: cell.style = style
+    return cell
+
+def _valeur_excel(val):
+    """Convertit une valeur de DataFrame pour openpyxl : (valeur, style de date éventuel). Les vides deviennent None."""
+    if val is None or val is pd.NaT: return None, None
+    if isinstance(val, str): return val, None
     try:
-        df_banque_raw = load_data(data_banque) # Gardé pour recherche solde
-        df_compta_raw = load_data(data_compta, header=0) # Gardé pour recherche solde
-        
-        df_banque = df_banque_raw.copy()
-        df_compta = df_compta_raw.copy()
-    except Exception as e:
-        raise ValueError(f"Erreur lors du chargement des données : {e}")
+        if pd.isna(val): return None, None
+    except (TypeError, ValueError):
+        pass
+    if isinstance(val, pd.Timestamp): return val.to_pydatetime(), 'date_heure'
+    if isinstance(val, datetime.datetime): return val, 'date_heure'
+    if isinstance(val, datetime.date): return val, 'date'
+    if isinstance(val, np.generic): return val.item(), None
+    return val, None
+
+def ecrire_feuille_dataframe(wb, nom, df):
+    """Écrit un DataFrame (sans index) dans une nouvelle feuille ; les colonnes débit/crédit/montant sont au format #,##0."""
+    ws = wb.create_sheet(nom)
+    ws.append([_cellule(ws, c, 'entete_feuille') for c in df.columns])
+    est_montant = [any(m in str(c).lower() for m in MOTS_COLONNES_MONTANT) for c in df.columns]
 
+    for ligne in df.itertuples(index=False, name=None):
+        cellules = []
+        for val, montant in zip(ligne, est_montant):
+            val, style = _valeur_excel(val)
+            cellules.append(_cellule(ws, val, 'montant' if montant else style))
+        ws.append(cellules)
+
+COLONNES_RAPPROCHEMENT = ['A', 'B', 'C', 'D', 'E', 'F']
+
+# Styles (colonne A, colonne B, colonnes C à F) selon le type de ligne de l'état
+STYLES_LIGNES_RAPPROCHEMENT = {
+    'entete': ('rapp_entete', 'rapp_entete', 'rapp_entete'),
+    'operation': ('rapp_cellule', 'rapp_libelle', 'rapp_montant'),
+    'vide': (None, None, 'montant'),
+    'total': ('rapp_bordure', 'rapp_total_libelle', 'rapp_total_montant'),
+    'rectifie': ('rapp_entete', 'rapp_total_libelle', 'rapp_total_montant'),
+}
+
+def lignes_rapprochement(solde_compta, solde_banque, all_ops, totaux, rectifie, label_rectif):
+    """
+    Lignes (type, [A, B, C, D, E, F]) de l'état de rapprochement, dans l'ordre de la feuille : en-têtes,
+    solde à rectifier, suspens, totaux, solde rectifié et totaux généraux.
+    'totaux' et 'rectifie' sont des tuples (C, D, E, F).
+    """
+    yield 'entete', ["Date", "Libellés", "Compte courant", None, "Relevé bancaire", None]
+    yield 'entete', [None, None, "Débit", "Crédit", "Débit", "Crédit"]
+    yield 'operation', [None, "Solde à rectifier", solde_compta, None, None, solde_banque]
+
+    if all_ops.empty:
+        yield 'vide', [None] * 6
+
+    for date_str, libelle, v_c, v_d, v_e, v_f in zip(all_ops['date_str'], all_ops['libelle'], all_ops['col_C'], all_ops['col_D'], all_ops['col_E'], all_ops['col_F']):
+        yield 'operation', [date_str, libelle] + [float(v) if v > 0 else None for v in (v_c, v_d, v_e, v_f)]
+
+    yield 'total', [None, "Totaux"] + list(totaux)
+    yield 'rectifie', [None, label_rectif] + [v if v != 0 else "" for v in rectifie]
+    yield 'total', [None, "TOTAUX GENERAUX"] + [t + r for t, r in zip(totaux, rectifie)]
+
+def ecrire_feuille_rapprochement(wb, **rapprochement):
+    """Écrit la feuille RAPPROCHEMENT (en-têtes fusionnés, bordures, format #,##0 sur les colonnes C à F)."""
+    ws = wb.create_sheet("RAPPROCHEMENT")
+    ws.column_dimensions['B'].width = 40
+    for c in ['A','C','D','E','F']: ws.column_dimensions[c].width = 15
+    # Le mode write-only n'expose pas merge_cells : les plages sont ajoutées à merged_cells, écrit à
+    # l'enregistrement de la feuille (openpyxl 3.1 ; vérifié par tests/test_classeur.py)
+    for plage in ('A1:A2', 'B1:B2', 'C1:D1', 'E1:F1'):
+        ws.merged_cells.add(plage)
+
+    for type_ligne, valeurs in lignes_rapprochement(**rapprochement):
+        style_a, style_b, style_montant = STYLES_LIGNES_RAPPROCHEMENT[type_ligne]
+        ws.append([_cellule(ws, valeurs[0], style_a), _cellule(ws, valeurs[1], style_b)]
+                  + [_cellule(ws, v, style_montant) for v in valeurs[2:]])
+
+def ecrire_classeur(feuilles, rapprochement):
+    """
+    Produit le classeur complet en une passe et le retourne dans un BytesIO.
+    feuilles : liste de (nom, DataFrame) écrites dans l'ordre ; rapprochement : arguments de ecrire_feuille_rapprochement.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    _enregistrer_styles(wb)
+    for nom, df in feuilles:
+        ecrire_feuille_dataframe(wb, nom, df)
+    ecrire_feuille_rapprochement(wb, **rapprochement)
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+# ----------------------------------------------------------------------------------
+# SUSPENS REPORTES
+# Une ligne de suspens reportée : {'raw_date', 'libelle', 'col_C', 'col_D', 'col_E', 'col_F'}.
+# Source exacte : le grand livre des suspens (suspens_ledger) ; à défaut, relecture de l'état Excel exporté.
+# ----------------------------------------------------------------------------------
+def suspens_depuis_etat(df_etat):
+    """
+    Relit les suspens d'un état de rapprochement exporté (feuille lue avec header=None) :
+    lignes 4 à N-3, colonnes A (date), B (libellé), C à F (montants numériques).
+    """
+    suspens = []
+    start_idx = 3 # Ligne 4
+    if len(df_etat) <= start_idx:
+        return suspens
+    for idx, row in df_etat.iloc[start_idx:-3].iterrows():
+        val_lib = str(row[1]) if pd.notna(row[1]) else ""
+        if any(x in val_lib.lower() for x in ["total", "totaux", "solde"]):
+            continue
+
+        if len(row) < 6: continue
+
+        suspens.append({
+            'raw_date': row[0],
+            'libelle': row[1],
+            'col_C': row[2] if isinstance(row[2], (int, float)) else 0,
+            'col_D': row[3] if isinstance(row[3], (int, float)) else 0,
+            'col_E': row[4] if isinstance(row[4], (int, float)) else 0,
+            'col_F': row[5] if isinstance(row[5], (int, float)) else 0,
+        })
+    return suspens
+
+# ----------------------------------------------------------------------------------
+# RESULTAT DU RAPPROCHEMENT
+# Les données de l'état (suspens, lignes, totaux, stats) restent disponibles en mémoire :
+# l'aperçu se construit directement depuis cet objet, sans relire le classeur généré.
+# ----------------------------------------------------------------------------------
+class ResultatRapprochement:
+    """
+    Résultat de executer_rapprochement.
+    feuilles : [(nom_feuille, DataFrame)] dans l'ordre du classeur (hors RAPPROCHEMENT).
+    rapprochement : soldes, suspens (all_ops), totaux et solde rectifié de l'état.
+    pdf : arguments de pdf_utils.generate_pdf_report. stats : compteurs du traitement.
+    Le classeur (excel_bytes) et le rapport PDF (pdf_bytes) ne sont produits qu'au premier accès,
+    puis mémorisés ; liberer_fichiers() les oublie sans toucher aux données.
+    """
+
+    def __init__(self, feuilles, rapprochement, pdf, stats):
+        self.feuilles = feuilles
+        self.rapprochement = rapprochement
+        self.pdf = pdf
+        self.stats = stats
+        self._excel_bytes = None
+        self._pdf_bytes = None
+        self._pdf_genere = False
+
+    @property
+    def excel_bytes(self):
+        if self._excel_bytes is None:
+            self._excel_bytes = ecrire_classeur(self.feuilles, self.rapprochement).getvalue()
+        return self._excel_bytes
+
+    @property
+    def pdf_bytes(self):
+        # None si la génération FPDF échoue (mémorisé aussi, pour ne pas la relancer à chaque accès)
+        if not self._pdf_genere:
+            _, self._pdf_bytes = pdf_utils.generate_pdf_report(output_pdf_path=None, **self.pdf)
+            self._pdf_genere = True
+        return self._pdf_bytes
+
+    def liberer_fichiers(self):
+        """Oublie les fichiers déjà produits (ils seront régénérés à la demande)."""
+        self._excel_bytes = None
+        self._pdf_bytes = None
+        self._pdf_genere = False
+
+    def feuille(self, nom):
+        return next((df for n, df in self.feuilles if n == nom), None)
+
+    @property
+    def suspens_banque(self):
+        return self.feuille('RELEVE_NON_POINTEE')
+
+    @property
+    def suspens_compta(self):
+        return self.feuille('JOURNAL_NON_POINTEE')
+
+    @property
+    def totaux(self):
+        """Totaux de l'état : {'totaux', 'rectifie', 'generaux'} -> tuples (C, D, E, F), plus le libellé du solde rectifié."""
+        totaux = self.rapprochement['totaux']
+        rectifie = self.rapprochement['rectifie']
+        return {
+            'totaux': totaux,
+            'rectifie': rectifie,
+            'generaux': tuple(t + r for t, r in zip(totaux, rectifie)),
+            'label_rectif': self.rapprochement['label_rectif'],
+        }
+
+    def tableau_rapprochement(self):
+        """Lignes de la feuille RAPPROCHEMENT (colonnes A à F, vides en None), telles qu'écrites dans le classeur."""
+        lignes = [valeurs for _, valeurs in lignes_rapprochement(**self.rapprochement)]
+        return pd.DataFrame(lignes, columns=COLONNES_RAPPROCHEMENT)
+
+    def suspens_ouverts(self):
+        """Suspens restant ouverts à cet arrêté (lignes de l'état), à reporter sur le rapprochement suivant."""
+        ops = self.rapprochement['all_ops']
+        return [
+            {'raw_date': date_str, 'libelle': None if pd.isna(libelle) else libelle,
+             'col_C': float(c), 'col_D': float(d), 'col_E': float(e), 'col_F': float(f)}
+            for date_str, libelle, c, d, e, f in zip(ops['date_str'], ops['libelle'], ops['col_C'], ops['col_D'], ops['col_E'], ops['col_F'])
+        ]
+
+# ----------------------------------------------------------------------------------
+# PREPARATION DES SOURCES
+# Normalisation ligne à ligne : s'applique au fichier entier comme à chaque bloc en mode partitionné.
+# ----------------------------------------------------------------------------------
+def normaliser_releve(df_banque):
+    """Relevé : colonnes en minuscules sans accent, ligne "Solde précédent" retirée, débit/crédit sans NaN."""
     # Normalisation des noms de colonnes (Débit -> debit, Crédit -> credit)
     df_banque.rename(columns=lambda x: str(x).lower().replace('é', 'e'), inplace=True)
     
-    # Nettoyage : Suppression de la ligne "Solde précédent" si présente
-    for col in df_banque.select_dtypes(include=['object']).columns:
-        df_banque = df_banque[~df_banque[col].astype(str).str.contains("Solde précédent", case=False, na=False)]
-
-    # Normalisation Compta
-    df_compta.rename(columns=lambda x: str(x).lower().replace('é', 'e'), inplace=True)
+    # Nettoyage : Suppression de la ligne "Solde précédent" si présente (un seul masque, un seul filtrage)
+    masque_solde_prec = np.zeros(len(df_banque), dtype=bool)
+    for col in df_banque.select_dtypes(include=['object', 'string']).columns:
+        masque_solde_prec |= df_banque[col].astype(str).str.contains("Solde précédent", case=False, na=False).to_numpy()
+    if masque_solde_prec.any():
+        df_banque = df_banque[~masque_solde_prec]
 
     # Nettoyage des données (remplacement des NaN par 0 pour calculs)
-    cols_montants = ['debit', 'credit']
-    # On s'assure que les colonnes existent
-    for col in cols_montants:
+    for col in ['debit', 'credit']:
         if col not in df_banque.columns: df_banque[col] = 0
+    df_banque[['debit', 'credit']] = df_banque[['debit', 'credit']].fillna(0)
+    return df_banque
+
+def normaliser_journal(df_compta):
+    """Journal : colonnes en minuscules sans accent, débit/crédit sans NaN."""
+    df_compta.rename(columns=lambda x: str(x).lower().replace('é', 'e'), inplace=True)
+    for col in ['debit', 'credit']:
         if col not in df_compta.columns: df_compta[col] = 0
-            
-    df_banque[cols_montants] = df_banque[cols_montants].fillna(0)
-    df_compta[cols_montants] = df_compta[cols_montants].fillna(0)
-
-    # --- NETTOYAGE JOURNAL : SUPPRESSION DES ANNULATIONS (e.g. 1500 et -1500) ---
-    def get_indices_annulation(df, col):
-        indices = []
-        pos_map = {}
-        # On mappe les positifs
-        for idx, val in df[col][df[col] > 0].items():
-            v = round(val, 4)
-            pos_map.setdefault(v, []).append(idx)
-        # On cherche les correspondances avec les négatifs
-        for idx, val in df[col][df[col] < 0].items():
-            target = round(abs(val), 4)
-            if target in pos_map and pos_map[target]:
-                indices.append(idx)
-                indices.append(pos_map[target].pop(0))
-        return indices
-
-    # ----------------------------------------------------------------------------------
-    # FONCTION OPERATION ANNULEE (NOUVEAU)
-    # Vérifie le restant des transactions non pointées du relevé en opposant débit et crédit.
-    # Si montant identique et libellé similaire (regex), on supprime.
-    # ----------------------------------------------------------------------------------
-    def operation_annulée(df):
-        if df.empty: return df
-        
-        # On travaille sur une copie pour les calculs, mais on veut renvoyer le meme type de DF
-        # On va identifier les indices à supprimer
-        to_drop = []
+    df_compta[['debit', 'credit']] = df_compta[['debit', 'credit']].fillna(0)
+    return df_compta
+
+def dernier_solde(df, defaut=0):
+    """Dernier solde renseigné (colonne 'Solde') d'une source brute, defaut à défaut (lecture par blocs : solde du bloc précédent)."""
+    col_solde = next((c for c in df.columns if str(c).lower().strip() == 'solde'), None)
+    if col_solde:
+        series_valid = df[col_solde].dropna()
+        if not series_valid.empty: return series_valid.iloc[-1]
+    return defaut
+
+# ----------------------------------------------------------------------------------
+# NETTOYAGE JOURNAL : SUPPRESSION DES ANNULATIONS (e.g. 1500 et -1500)
+# ----------------------------------------------------------------------------------
+def get_indices_annulation(df, col):
+    indices = []
+    pos_map = {}
+    # On mappe les positifs
+    for idx, val in df[col][df[col] > 0].items():
+        v = round(val, 4)
+        pos_map.setdefault(v, []).append(idx)
+    # On cherche les correspondances avec les négatifs
+    for idx, val in df[col][df[col] < 0].items():
+        target = round(abs(val), 4)
+        if target in pos_map and pos_map[target]:
+            indices.append(idx)
+            indices.append(pos_map[target].pop(0))
+    return indices
+
+# ----------------------------------------------------------------------------------
+# FONCTION OPERATION ANNULEE (NOUVEAU)
+# Vérifie le restant des transactions non pointées du relevé en opposant débit et crédit.
+# Si montant identique et libellé similaire (regex), on supprime.
+# ----------------------------------------------------------------------------------
+def operation_annulée(df):
+    vide = pd.DataFrame(columns=df.columns)
+    if df.empty: return df, vide
+    
+    # S'assurer que les colonnes existent
+    if 'debit' not in df.columns or 'credit' not in df.columns:
+        return df, vide
+
+    # Similarité basée sur les NUMÉROS (ex: N° de chèque) : chaque libellé est tokenisé une seule fois.
+    # On ignore les nombres trop courts (1 ou 2 chiffres : jours ou mois isolés)
+    # et on garde les nombres de longueur >= 3 (numéros de chèque, années, références...)
+    libelles = df['libelle'].astype(str) if 'libelle' in df.columns else pd.Series('', index=df.index)
+    references = libelles.str.findall(r'\d{3,}').map(set)
+
+    # Index inversé des crédits : montant -> numéro de référence -> file des crédits (ordre du relevé)
+    index_credits = {}
+    for idx_c, montant, refs in zip(df.index, df['credit'], references):
+        if montant > 0:
+            par_ref = index_credits.setdefault(montant, {})
+            for ref in refs:
+                par_ref.setdefault(ref, deque()).append(idx_c)
+    rang = {idx: pos for pos, idx in enumerate(df.index)}
+
+    # Set des indices utilisés côté crédit pour éviter d'utiliser le meme crédit pour 2 débits
+    used_credit_indices = set()
+    to_drop = []
+    
+    for idx_d, montant, refs in zip(df.index, df['debit'], references):
+        if not montant > 0 or not refs:
+            continue
+        par_ref = index_credits.get(montant)
+        if not par_ref:
+            continue
+
+        # Premier crédit disponible (ordre du relevé) partageant au moins un numéro avec le débit
+        best_match_idx = None
+        for ref in refs:
+            file = par_ref.get(ref)
+            while file and file[0] in used_credit_indices:
+                file.popleft()
+            if file and (best_match_idx is None or rang[file[0]] < rang[best_match_idx]):
+                best_match_idx = file[0]
         
-        # Séparation (vues)
-        # S'assurer que les colonnes existent
-        if 'debit' not in df.columns or 'credit' not in df.columns:
-            return df
+        if best_match_idx is not None:
+            # On marque les deux pour suppression
+            to_drop.append(idx_d)
+            to_drop.append(best_match_idx)
+            used_credit_indices.add(best_match_idx)
             
-        debits = df[df['debit'] > 0]
-        credits = df[df['credit'] > 0]
+    if to_drop:
+        print(f"  --> Opérations annulées détectées et supprimées : {len(to_drop)//2} paires.")
+        return df.drop(to_drop), df.loc[to_drop]
         
-        # Helper de similarité basé sur les NUMÉROS (ex: N° de chèque)
-        def check_similarity(lib1, lib2):
-            if not isinstance(lib1, str) or not isinstance(lib2, str):
-                return False
-            
-            # Extraction des séquences de chiffres
-            # On cherche des identifiants numériques.
-            # On utilise une regex pour trouver tous les nombres (suite de digits)
-            nums1 = set(re.findall(r'\d+', lib1))
-            nums2 = set(re.findall(r'\d+', lib2))
-            
-            # Filtrage des nombres non significatifs
-            # On ignore les nombres trop courts (ex: 1 ou 2 chiffres) qui pourraient être des jours ou mois isolés
-            # On garde les nombres de longueur >= 3 (ex: 100, 2023, 495839...)
-            # Cela permet de matcher des numéros de chèque (souvent 7 chiffres) ou des années/références
-            nums1 = {n for n in nums1 if len(n) >= 3}
-            nums2 = {n for n in nums2 if len(n) >= 3}
-            
-            # Intersection : Y a-t-il au moins un numéro commun ?
-            common = nums1.intersection(nums2)
-            
-            return len(common) > 0
+    return df, vide
 
-        # Set des indices utilisés côté crédit pour éviter d'utiliser le meme crédit pour 2 débits
-        used_credit_indices = set()
-        
-        for idx_d, row_d in debits.iterrows():
-            amount = row_d['debit']
-            lib_d = str(row_d.get('libelle', ''))
-            
-            # Candidats crédits (Même montant exact)
-            candidates = credits[
-                (credits['credit'] == amount) & 
-                (~credits.index.isin(used_credit_indices))
-            ]
-            
-            if candidates.empty:
-                continue
-                
-            best_match_idx = None
-            
-            for idx_c, row_c in candidates.iterrows():
-                lib_c = str(row_c.get('libelle', ''))
-                
-                # Check regex similarity
-                if check_similarity(lib_d, lib_c):
-                    best_match_idx = idx_c
-                    break
-            
-            if best_match_idx is not None:
-                # On marque les deux pour suppression
-                to_drop.append(idx_d)
-                to_drop.append(best_match_idx)
-                used_credit_indices.add(best_match_idx)
-                
-        if to_drop:
-            print(f"  --> Opérations annulées détectées et supprimées : {len(to_drop)//2} paires.")
-            return df.drop(to_drop), df.loc[to_drop]
-            
-        return df, pd.DataFrame(columns=df.columns)
+# ----------------------------------------------------------------------------------
+# POINTAGE
+# ----------------------------------------------------------------------------------
+def pointer_sources(df_banque, df_compta, suspens_prec=None, tolerance_montant=0.0, fenetre_jours=None,
+                    regroupement_max=0, budget_regroupement=2.0):
+    """
+    Pointe un relevé et un journal normalisés (normaliser_releve / normaliser_journal) : annulations
+    du journal, suspens reportés, pointage 1 pour 1 (exact ou approché), regroupements, puis extraction
+    des suspens et des opérations annulées du relevé.
+    Retourne un dict : suspens_banque, suspens_compta, ops_annulees_banque, suspens_etat_prec,
+    pointages_export, regroupements_export et stats (pointages approchés / regroupements).
+    """
+    # Helper pour la gestion des dates (valeur isolée ; les colonnes passent par dates_tri_et_affichage)
+    def format_date_val(val):
+        return dates_tri_et_affichage([val])[1][0]
 
     drop_d = get_indices_annulation(df_compta, 'debit')
     drop_c = get_indices_annulation(df_compta, 'credit')
@@ -175,83 +803,130 @@ def executer_rapprochement(data_banque, data_compta, data_etat_prec=None, date_r
         # print(f"Suppression de {len(indices_a_supprimer)} lignes d'annulations dans le journal.")
         df_compta = df_compta.drop(indices_a_supprimer)
 
-    # Listes pour stocker les lignes rapprochées
+    # Listes pour stocker les lignes rapprochées (+ ensembles pour les tests d'appartenance)
     indices_banque_ok = []
     indices_compta_ok = []
+    set_banque_ok = set()
+    set_compta_ok = set()
+
+    # Index montant -> indices disponibles (premier disponible = premier dans l'ordre du fichier),
+    # partagés par le pointage de l'état précédent et le pointage principal
+    index_compta_debit = construire_index_montants(df_compta['debit'])
+    index_compta_credit = construire_index_montants(df_compta['credit'])
+    index_banque_debit = construire_index_montants(df_banque['debit'])
+    index_banque_credit = construire_index_montants(df_banque['credit'])
     
     suspens_etat_prec = []
 
     # --- LOGIQUE POINTAGE PREALABLE (ETAT PRECEDENT) ---
-    if data_etat_prec is not None:
-        print(f"Traitement de l'état précédent...")
-        try:
-            df_etat = load_data(data_etat_prec, header=None)
-            
-            start_idx = 3 # Ligne 4
-            if len(df_etat) > start_idx:
-                for idx, row in df_etat.iloc[start_idx:-3].iterrows():
-                    val_lib = str(row[1]) if pd.notna(row[1]) else ""
-                    if any(x in val_lib.lower() for x in ["total", "totaux", "solde"]):
-                        continue
-                    
-                    if len(row) < 6: continue
-                    
-                    val_c = row[2] if isinstance(row[2], (int, float)) else 0
-                    val_d = row[3] if isinstance(row[3], (int, float)) else 0
-                    val_e = row[4] if isinstance(row[4], (int, float)) else 0
-                    val_f = row[5] if isinstance(row[5], (int, float)) else 0
-                    
-                    keep_c, keep_d, keep_e, keep_f = 0, 0, 0, 0
-                    
-                    # Verification Compta
-                    if val_c > 0:
-                        match = df_compta[(df_compta['debit'] == val_c) & (~df_compta.index.isin(indices_compta_ok))]
-                        if not match.empty: indices_compta_ok.append(match.index[0])
-                        else: keep_c = val_c
-
-                    if val_d > 0:
-                        match = df_compta[(df_compta['credit'] == val_d) & (~df_compta.index.isin(indices_compta_ok))]
-                        if not match.empty: indices_compta_ok.append(match.index[0])
-                        else: keep_d = val_d
-
-                    # Verification Banque
-                    if val_e > 0:
-                        match = df_banque[(df_banque['debit'] == val_e) & (~df_banque.index.isin(indices_banque_ok))]
-                        if not match.empty: indices_banque_ok.append(match.index[0])
-                        else: keep_e = val_e
-                            
-                    if val_f > 0:
-                        match = df_banque[(df_banque['credit'] == val_f) & (~df_banque.index.isin(indices_banque_ok))]
-                        if not match.empty: indices_banque_ok.append(match.index[0])
-                        else: keep_f = val_f
-                    
-                    if any([keep_c, keep_d, keep_e, keep_f]):
-                        suspens_etat_prec.append({
-                            'raw_date': get_date_obj(row[0]),
-                            'date_str': format_date_val(row[0]),
-                            'libelle': row[1],
-                            'col_C': keep_c, 'col_D': keep_d, 'col_E': keep_e, 'col_F': keep_f
-                        })
+    for op in suspens_prec or []:
+        val_c, val_d, val_e, val_f = op['col_C'], op['col_D'], op['col_E'], op['col_F']
+        keep_c, keep_d, keep_e, keep_f = 0, 0, 0, 0
 
-        except Exception as e:
-            print(f"Erreur état précédent : {e}")
+        # Verification Compta
+        if val_c > 0:
+            idx_match = prendre_premier_disponible(index_compta_debit, val_c, set_compta_ok)
+            if idx_match is not None: indices_compta_ok.append(idx_match)
+            else: keep_c = val_c
+
+        if val_d > 0:
+            idx_match = prendre_premier_disponible(index_compta_credit, val_d, set_compta_ok)
+            if idx_match is not None: indices_compta_ok.append(idx_match)
+            else: keep_d = val_d
+
+        # Verification Banque
+        if val_e > 0:
+            idx_match = prendre_premier_disponible(index_banque_debit, val_e, set_banque_ok)
+            if idx_match is not None: indices_banque_ok.append(idx_match)
+            else: keep_e = val_e
+
+        if val_f > 0:
+            idx_match = prendre_premier_disponible(index_banque_credit, val_f, set_banque_ok)
+            if idx_match is not None: indices_banque_ok.append(idx_match)
+            else: keep_f = val_f
+
+        if any([keep_c, keep_d, keep_e, keep_f]):
+            # raw_date normalisée en une passe à la construction de l'état
+            suspens_etat_prec.append(dict(op, col_C=keep_c, col_D=keep_d, col_E=keep_e, col_F=keep_f))
 
     # --- LOGIQUE DE POINTAGE ---
-    for idx_b, row_b in df_banque.iterrows():
-        # IMPORTANT: Si cette ligne banque a déjà été utilisée (par ex. par l'état précédent), on passe.
-        if idx_b in indices_banque_ok:
-            continue
+    mode_approche = bool(tolerance_montant) or fenetre_jours is not None
+    pointages = []
+
+    if mode_approche:
+        col_jour_b = colonne_date(df_banque, ('date_valeur', 'date'))
+        col_jour_c = colonne_date(df_compta)
+        jours_b = dates_en_jours(df_banque[col_jour_b]) if col_jour_b else np.full(len(df_banque), NAT_JOURS)
+        jours_c = dates_en_jours(df_compta[col_jour_c]) if col_jour_c else np.full(len(df_compta), NAT_JOURS)
+        index_trie_credit = construire_index_trie(df_compta['credit'].values, jours_c, list(df_compta.index))
+        index_trie_debit = construire_index_trie(df_compta['debit'].values, jours_c, list(df_compta.index))
+
+        for idx_b, debit_b, credit_b, jour_b in zip(df_banque.index, df_banque['debit'], df_banque['credit'], jours_b):
+            if idx_b in set_banque_ok:
+                continue
 
-        if row_b['debit'] > 0:
-            match = df_compta[(df_compta['credit'] == row_b['debit']) & (~df_compta.index.isin(indices_compta_ok))]
-            if not match.empty:
+            if debit_b > 0:
+                trouve = chercher_pointage_approche(index_trie_credit, debit_b, jour_b, tolerance_montant, fenetre_jours, set_compta_ok)
+            elif credit_b > 0:
+                trouve = chercher_pointage_approche(index_trie_debit, credit_b, jour_b, tolerance_montant, fenetre_jours, set_compta_ok)
+            else:
+                continue
+
+            if trouve is not None:
+                idx_c, score, ecart_montant, ecart_jours = trouve
                 indices_banque_ok.append(idx_b)
-                indices_compta_ok.append(match.index[0])
-        elif row_b['credit'] > 0:
-            match = df_compta[(df_compta['debit'] == row_b['credit']) & (~df_compta.index.isin(indices_compta_ok))]
-            if not match.empty:
+                set_banque_ok.add(idx_b)
+                indices_compta_ok.append(idx_c)
+                pointages.append({'idx_banque': idx_b, 'idx_compta': idx_c, 'score': score,
+                                  'ecart_montant': ecart_montant, 'ecart_jours': ecart_jours})
+    else:
+        for idx_b, debit_b, credit_b in zip(df_banque.index, df_banque['debit'], df_banque['credit']):
+            # IMPORTANT: Si cette ligne banque a déjà été utilisée (par ex. par l'état précédent), on passe.
+            if idx_b in set_banque_ok:
+                continue
+
+            if debit_b > 0:
+                idx_c = prendre_premier_disponible(index_compta_credit, debit_b, set_compta_ok)
+            elif credit_b > 0:
+                idx_c = prendre_premier_disponible(index_compta_debit, credit_b, set_compta_ok)
+            else:
+                continue
+
+            if idx_c is not None:
                 indices_banque_ok.append(idx_b)
-                indices_compta_ok.append(match.index[0])
+                set_banque_ok.add(idx_b)
+                indices_compta_ok.append(idx_c)
+
+    # --- POINTAGE PAR REGROUPEMENT (après le pointage 1 pour 1) ---
+    groupes = []
+    if regroupement_max and regroupement_max >= 2:
+        col_jour_gb = colonne_date(df_banque, ('date_valeur', 'date'))
+        col_jour_gc = colonne_date(df_compta)
+        jours_gb = dates_en_jours(df_banque[col_jour_gb]) if col_jour_gb else np.full(len(df_banque), NAT_JOURS)
+        jours_gc = dates_en_jours(df_compta[col_jour_gc]) if col_jour_gc else np.full(len(df_compta), NAT_JOURS)
+
+        def restants(df, col, jours, utilises):
+            return [(idx, m, j) for idx, m, j in zip(df.index, df[col], jours) if m > 0 and idx not in utilises]
+
+        echeance = time.monotonic() + budget_regroupement
+        try:
+            # Débit banque <-> Crédit compta, puis Crédit banque <-> Débit compta ; dans chaque sens,
+            # une ligne du relevé expliquée par plusieurs lignes du journal, puis l'inverse.
+            for col_b, col_c in (('debit', 'credit'), ('credit', 'debit')):
+                for g_b, membres in pointer_regroupements(restants(df_banque, col_b, jours_gb, set_banque_ok), restants(df_compta, col_c, jours_gc, set_compta_ok),
+                                                          regroupement_max, fenetre_jours, echeance, set_banque_ok, set_compta_ok):
+                    groupes.append({'banque': [g_b], 'compta': membres})
+                for g_c, membres in pointer_regroupements(restants(df_compta, col_c, jours_gc, set_compta_ok), restants(df_banque, col_b, jours_gb, set_banque_ok),
+                                                          regroupement_max, fenetre_jours, echeance, set_compta_ok, set_banque_ok):
+                    groupes.append({'banque': membres, 'compta': [g_c]})
+        except BudgetEpuise:
+            print(f"⚠️ Budget de recherche des regroupements épuisé ({budget_regroupement}s) : recherche interrompue.")
+
+        for g in groupes:
+            indices_banque_ok.extend(g['banque'])
+            indices_compta_ok.extend(g['compta'])
+        if groupes:
+            print(f"  --> Regroupements détectés : {len(groupes)}")
 
     # --- EXTRACTION DES SUSPENS ---
     suspens_banque = df_banque.drop(indices_banque_ok)
@@ -262,6 +937,80 @@ def executer_rapprochement(data_banque, data_compta, data_etat_prec=None, date_r
     
     suspens_compta = df_compta.drop(indices_compta_ok)
 
+    # Détail des pointages approchés (mode tolérance / fenêtre de dates)
+    # Détail des regroupements (une ligne expliquée par une somme de lignes de l'autre côté)
+    regroupements_export = None
+    if groupes:
+        col_lib_gb = next((c for c in df_banque.columns if 'libell' in str(c).lower()), None)
+        col_lib_gc = next((c for c in df_compta.columns if 'libell' in str(c).lower()), None)
+        lignes = []
+        for num, g in enumerate(groupes, 1):
+            for origine, df_src, col_d, col_l, indices in (('Relevé', df_banque, col_jour_gb, col_lib_gb, g['banque']),
+                                                          ('Journal', df_compta, col_jour_gc, col_lib_gc, g['compta'])):
+                for idx in indices:
+                    row = df_src.loc[idx]
+                    lignes.append({
+                        'groupe': num,
+                        'origine': origine,
+                        'date': format_date_val(row[col_d]) if col_d else "",
+                        'libelle': row[col_l] if col_l else "",
+                        'debit': row['debit'],
+                        'credit': row['credit']
+                    })
+        regroupements_export = pd.DataFrame(lignes)
+
+    pointages_export = None
+    if mode_approche:
+        col_lib_pb = next((c for c in df_banque.columns if 'libell' in str(c).lower()), None)
+        col_lib_pc = next((c for c in df_compta.columns if 'libell' in str(c).lower()), None)
+        lignes = []
+        for p in pointages:
+            row_b = df_banque.loc[p['idx_banque']]
+            row_c = df_compta.loc[p['idx_compta']]
+            lignes.append({
+                'date_banque': format_date_val(row_b[col_jour_b]) if col_jour_b else "",
+                'libelle_banque': row_b[col_lib_pb] if col_lib_pb else "",
+                'montant_banque': row_b['debit'] if row_b['debit'] > 0 else row_b['credit'],
+                'date_journal': format_date_val(row_c[col_jour_c]) if col_jour_c else "",
+                'libelle_journal': row_c[col_lib_pc] if col_lib_pc else "",
+                'montant_journal': row_c['debit'] if row_c['debit'] > 0 else row_c['credit'],
+                'ecart_montant': p['ecart_montant'],
+                'ecart_jours': p['ecart_jours'],
+                'score': p['score']
+            })
+        pointages_export = pd.DataFrame(lignes, columns=['date_banque', 'libelle_banque', 'montant_banque', 'date_journal',
+                                                         'libelle_journal', 'montant_journal', 'ecart_montant', 'ecart_jours', 'score'])
+
+    stats = {}
+    if groupes:
+        stats['regroupements'] = len(groupes)
+    if mode_approche:
+        scores = [p['score'] for p in pointages]
+        stats['pointages_approches'] = sum(1 for sc in scores if sc < 1.0)
+        stats['score_moyen'] = round(sum(scores) / len(scores), 4) if scores else None
+
+    return {
+        'suspens_banque': suspens_banque,
+        'suspens_compta': suspens_compta,
+        'ops_annulees_banque': ops_annulees_banque,
+        'suspens_etat_prec': suspens_etat_prec,
+        'pointages_export': pointages_export,
+        'regroupements_export': regroupements_export,
+        'stats': stats,
+    }
+
+# ----------------------------------------------------------------------------------
+# CONSTRUCTION DE L'ETAT DE RAPPROCHEMENT
+# ----------------------------------------------------------------------------------
+def construire_resultat(pointage, solde_banque, solde_compta, date_rapprochement=None):
+    """Feuilles de suspens, lignes et totaux de l'état, données du PDF et stats à partir du résultat de pointer_sources."""
+    suspens_banque = pointage['suspens_banque']
+    suspens_compta = pointage['suspens_compta']
+    ops_annulees_banque = pointage['ops_annulees_banque']
+    suspens_etat_prec = pointage['suspens_etat_prec']
+    pointages_export = pointage['pointages_export']
+    regroupements_export = pointage['regroupements_export']
+
     # Préparation Export
     cols_to_drop_banque = [c for c in suspens_banque.columns if 'solde' in str(c).lower()]
     suspens_banque_export = suspens_banque.drop(columns=cols_to_drop_banque)
@@ -271,249 +1020,113 @@ def executer_rapprochement(data_banque, data_compta, data_etat_prec=None, date_r
 
     col_date_compta = next((c for c in suspens_compta_export.columns if 'date' in str(c).lower()), None)
     if col_date_compta:
-        try:
-            suspens_compta_export[col_date_compta] = pd.to_datetime(suspens_compta_export[col_date_compta], errors='coerce').dt.strftime('%d/%m/%Y')
-        except: pass
+        # Affichage jj/mm/aaaa (texte saisi lu jour en premier), valeur non reconnue conservée telle quelle
+        _, affichage = dates_tri_et_affichage(suspens_compta_export[col_date_compta])
+        affichage[suspens_compta_export[col_date_compta].isna().to_numpy()] = np.nan
+        suspens_compta_export[col_date_compta] = affichage
 
     cols_to_drop_annulees = [c for c in ops_annulees_banque.columns if 'solde' in str(c).lower()]
     ops_annulees_banque_export = ops_annulees_banque.drop(columns=cols_to_drop_annulees)
 
-    # Création du buffer Excel
-    excel_buffer = io.BytesIO()
-    with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-        suspens_banque_export.to_excel(writer, sheet_name='RELEVE_NON_POINTEE', index=False)
-        suspens_compta_export.to_excel(writer, sheet_name='JOURNAL_NON_POINTEE', index=False)
-        
-        if not ops_annulees_banque_export.empty:
-            ops_annulees_banque_export.to_excel(writer, sheet_name='OPERATIONS_ANNULEES', index=False)
-
-    # Ajout feuille Rapprochement avec OpenPyXL
-    # Ajout feuille Rapprochement avec OpenPyXL
-    excel_buffer.seek(0)
-    wb = openpyxl.load_workbook(excel_buffer)
-    
-    # -----------------------------------------------------------
-    # MISE EN FORME DES FEUILLES PRECEDENTES (Nombre #,##0)
-    # -----------------------------------------------------------
-    accounting_format = '#,##0'
-    sheets_to_format = ['RELEVE_NON_POINTEE', 'JOURNAL_NON_POINTEE', 'OPERATIONS_ANNULEES']
-    
-    for sh_name in sheets_to_format:
-        if sh_name in wb.sheetnames:
-            ws_tmp = wb[sh_name]
-            # On parcourt les colonnes pour trouver Debit/Credit
-            # On suppose que les en-têtes sont en ligne 1
-            header_cells = list(ws_tmp[1]) # Tuple of cells
-            col_indices_to_format = []
-            
-            for cell in header_cells:
-                val = str(cell.value).lower()
-                if 'debit' in val or 'credit' in val or 'montant' in val:
-                    col_indices_to_format.append(cell.column) # 1-based index
-            
-            if col_indices_to_format:
-                for row in ws_tmp.iter_rows(min_row=2):
-                    for cell in row:
-                        if cell.column in col_indices_to_format:
-                            cell.number_format = accounting_format
-    
-    wb.save(excel_buffer) # Sauvegarde interne avant de continuer
-    
-    
-    # CALCUL DES SOLDES
-    def get_last_solde(df):
-        col_solde = next((c for c in df.columns if str(c).lower().strip() == 'solde'), None)
-        if col_solde:
-            series_valid = df[col_solde].dropna()
-            if not series_valid.empty: return series_valid.iloc[-1]
-        return 0
-
-    solde_banque = get_last_solde(df_banque_raw)
-    solde_compta = get_last_solde(df_compta_raw)
-
-    sheet_name_rapp = "RAPPROCHEMENT"
-    if sheet_name_rapp in wb.sheetnames: del wb[sheet_name_rapp]
-    ws = wb.create_sheet(sheet_name_rapp)
-
-    # En-têtes, Styles (identique code original)
-    ws['A1'] = "Date"; ws['B1'] = "Libellés"; ws['C1'] = "Compte courant"; ws['E1'] = "Relevé bancaire"
-    ws['C2'] = "Débit"; ws['D2'] = "Crédit"; ws['E2'] = "Débit"; ws['F2'] = "Crédit"
-    ws['B3'] = "Solde à rectifier"; ws['C3'] = solde_compta; ws['F3'] = solde_banque
-
-    ws.merge_cells('A1:A2'); ws.merge_cells('B1:B2'); ws.merge_cells('C1:D1'); ws.merge_cells('E1:F1')
-    
-    bold_font = Font(bold=True)
-    center_align = Alignment(horizontal="center", vertical="center")
-    thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-
-    for row in ws.iter_rows(min_row=1, max_row=2, max_col=6):
-        for cell in row:
-            cell.font = bold_font; cell.alignment = center_align; cell.border = thin_border
-
-    # Ligne 3 styles
-    for col in range(1, 7):
-        cell = ws.cell(row=3, column=col)
-        cell.border = thin_border
-        cell.alignment = Alignment(horizontal='left') if col == 2 else center_align
-
-    ws.column_dimensions['B'].width = 40
-    for c in ['A','C','D','E','F']: ws.column_dimensions[c].width = 15
-
     # Collecte Opérations
     col_date_c = next((c for c in suspens_compta.columns if 'date' in str(c).lower()), None)
     col_lib_c = next((c for c in suspens_compta.columns if 'libell' in str(c).lower()), None)
     col_date_b = next((c for c in suspens_banque.columns if 'date' in str(c).lower()), None)
     col_lib_b = next((c for c in suspens_banque.columns if 'libell' in str(c).lower()), None)
     
-    all_ops = []
-    
-    for item in suspens_etat_prec:
-        if any([item['col_C'], item['col_D'], item['col_E'], item['col_F']]):
-            all_ops.append(item)
-
-    # Compta
-    for _, row in suspens_compta.iterrows():
-        d_val = row.get('debit', 0); c_val = row.get('credit', 0)
-        raw_date = row[col_date_c] if col_date_c else None
-        lib = row[col_lib_c] if col_lib_c else ""
-        
-        if d_val > 0:
-            all_ops.append({'raw_date': get_date_obj(raw_date), 'date_str': format_date_val(raw_date), 'libelle': lib, 'col_C': 0, 'col_D': 0, 'col_E': 0, 'col_F': d_val})
-        elif c_val > 0:
-            all_ops.append({'raw_date': get_date_obj(raw_date), 'date_str': format_date_val(raw_date), 'libelle': lib, 'col_C': 0, 'col_D': 0, 'col_E': c_val, 'col_F': 0})
-
-    # Banque
-    for _, row in suspens_banque.iterrows():
-        d_val = row.get('debit', 0); c_val = row.get('credit', 0)
-        raw_date = row[col_date_b] if col_date_b else None
-        lib = row[col_lib_b] if col_lib_b else ""
-        
-        if d_val > 0:
-            all_ops.append({'raw_date': get_date_obj(raw_date), 'date_str': format_date_val(raw_date), 'libelle': lib, 'col_C': 0, 'col_D': d_val, 'col_E': 0, 'col_F': 0})
-        elif c_val > 0:
-            all_ops.append({'raw_date': get_date_obj(raw_date), 'date_str': format_date_val(raw_date), 'libelle': lib, 'col_C': c_val, 'col_D': 0, 'col_E': 0, 'col_F': 0})
-
-    all_ops.sort(key=lambda x: x['raw_date'])
-
-    current_row = 4
-    if not all_ops: current_row += 1 
-
-    for op in all_ops:
-        ws[f'A{current_row}'] = op['date_str']
-        ws[f'B{current_row}'] = op['libelle']
-        if op['col_C'] > 0: ws[f'C{current_row}'] = op['col_C']
-        if op['col_D'] > 0: ws[f'D{current_row}'] = op['col_D']
-        if op['col_E'] > 0: ws[f'E{current_row}'] = op['col_E']
-        if op['col_F'] > 0: ws[f'F{current_row}'] = op['col_F']
-        
-        for col in range(1, 7):
-            cell = ws.cell(row=current_row, column=col)
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal='left') if col == 2 else center_align
-        current_row += 1
-
-    # Totaux
-    row_total = current_row
-    ws[f'B{current_row}'] = "Totaux"
-    ws[f'B{current_row}'].font = bold_font; ws[f'B{current_row}'].alignment = Alignment(horizontal='center'); ws[f'B{current_row}'].border = thin_border
-    
-    # Calcul des sommes de colonnes (Valeurs numériques pour affichage correct dans l'aperçu)
-    # Attention: ligne 3 contient les soldes initiaux
-    
+    # Table des suspens construite par masques sur les colonnes (débit/crédit -> colonne C/D/E/F)
+    colonnes_ops = ['raw_date', 'date_str', 'libelle', 'col_C', 'col_D', 'col_E', 'col_F']
+
+    def construire_ops(df, col_date, col_lib, col_si_debit, col_si_credit):
+        debits = df['debit'].to_numpy(dtype=float)
+        credits = df['credit'].to_numpy(dtype=float)
+        masque_d = debits > 0
+        masque_c = ~masque_d & (credits > 0)
+        garde = masque_d | masque_c
+
+        dates = df[col_date][garde] if col_date else pd.Series([None] * int(garde.sum()))
+        tri, affichage = dates_tri_et_affichage(dates)
+        ops = pd.DataFrame({
+            'raw_date': tri,
+            'date_str': affichage,
+            'libelle': df[col_lib].to_numpy()[garde] if col_lib else "",
+        }, columns=colonnes_ops)
+        for col in ['col_C', 'col_D', 'col_E', 'col_F']:
+            ops[col] = 0.0
+        ops[col_si_debit] = debits[garde] * masque_d[garde]
+        ops[col_si_credit] = credits[garde] * masque_c[garde]
+        return ops
+
+    ops_etat = pd.DataFrame(suspens_etat_prec, columns=colonnes_ops)
+    if not ops_etat.empty:
+        ops_etat['raw_date'], ops_etat['date_str'] = dates_tri_et_affichage(ops_etat['raw_date'])
+
+    parts_ops = [
+        ops_etat,
+        # Compta : débit -> F, crédit -> E
+        construire_ops(suspens_compta, col_date_c, col_lib_c, 'col_F', 'col_E'),
+        # Banque : débit -> D, crédit -> C
+        construire_ops(suspens_banque, col_date_b, col_lib_b, 'col_D', 'col_C'),
+    ]
+    parts_ops = [p for p in parts_ops if not p.empty]
+    all_ops = pd.concat(parts_ops, ignore_index=True) if parts_ops else pd.DataFrame(columns=colonnes_ops)
+    # Tri stable par date (à date égale : état précédent, puis journal, puis relevé)
+    all_ops = all_ops.sort_values('raw_date', kind='mergesort').reset_index(drop=True)
+
     # Conversion safe
     def to_float(x):
         try: return float(x)
         except: return 0.0
-        
+
     v_solde_compta = to_float(solde_compta)
     v_solde_banque = to_float(solde_banque)
-    
+
     # Somme des opérations (déjà dans all_ops)
-    s_c = sum(to_float(op.get('col_C', 0)) for op in all_ops)
-    s_d = sum(to_float(op.get('col_D', 0)) for op in all_ops)
-    s_e = sum(to_float(op.get('col_E', 0)) for op in all_ops)
-    s_f = sum(to_float(op.get('col_F', 0)) for op in all_ops)
-    
-    # Totaux ligne (Solde Init + Mouvements)
-    # C3 = Solde Compta
-    # F3 = Solde Banque
-    # D3, E3 vides
-    
+    s_c = float(all_ops['col_C'].sum())
+    s_d = float(all_ops['col_D'].sum())
+    s_e = float(all_ops['col_E'].sum())
+    s_f = float(all_ops['col_F'].sum())
+
+    # Totaux ligne (Solde Init + Mouvements) : C3 = Solde Compta, F3 = Solde Banque
     t_c = v_solde_compta + s_c
     t_d = s_d
     t_e = s_e
     t_f = v_solde_banque + s_f
-    
-    ws[f'C{current_row}'] = t_c
-    ws[f'D{current_row}'] = t_d
-    ws[f'E{current_row}'] = t_e
-    ws[f'F{current_row}'] = t_f
-    
-    for col in ['C', 'D', 'E', 'F']:
-        cell = ws[f'{col}{current_row}']
-        cell.font = bold_font; cell.border = thin_border; cell.alignment = center_align
-    ws[f'A{current_row}'].border = thin_border
-    
-    current_row += 1
-    
+
     # Solde rectifié
     label_rectif = "Solde rectifié"
     if date_rapprochement:
         try: dstr = date_rapprochement.strftime('%d/%m/%Y')
         except: dstr = str(date_rapprochement)
         label_rectif = f"Solde rectifié au {dstr}"
-        
-    ws[f'B{current_row}'] = label_rectif
-    ws[f'B{current_row}'].font = bold_font; ws[f'B{current_row}'].alignment = Alignment(horizontal='center'); ws[f'B{current_row}'].border = thin_border
-    
+
     # Calcul logiques rectifiés (D - C, etc)
     # IF(D-C>0, D-C, "")
     v_rect_c = (t_d - t_c) if (t_d - t_c) > 0.001 else 0
     v_rect_d = (t_c - t_d) if (t_c - t_d) > 0.001 else 0
     v_rect_e = (t_f - t_e) if (t_f - t_e) > 0.001 else 0
     v_rect_f = (t_e - t_f) if (t_e - t_f) > 0.001 else 0
-    
-    ws[f'C{current_row}'] = v_rect_c if v_rect_c != 0 else ""
-    ws[f'D{current_row}'] = v_rect_d if v_rect_d != 0 else ""
-    ws[f'E{current_row}'] = v_rect_e if v_rect_e != 0 else ""
-    ws[f'F{current_row}'] = v_rect_f if v_rect_f != 0 else ""
-    
-    for col in ['A','C','D','E','F']:
-        ws[f'{col}{current_row}'].border = thin_border; ws[f'{col}{current_row}'].alignment = center_align; ws[f'{col}{current_row}'].font = bold_font
-    
-    row_rectifie = current_row
-    current_row += 1
-    
-    # Totaux Généraux
-    ws[f'B{current_row}'] = "TOTAUX GENERAUX"
-    ws[f'B{current_row}'].font = bold_font; ws[f'B{current_row}'].alignment = Alignment(horizontal='center'); ws[f'B{current_row}'].border = thin_border
-    
-    ws[f'C{current_row}'] = t_c + v_rect_c
-    ws[f'D{current_row}'] = t_d + v_rect_d
-    ws[f'E{current_row}'] = t_e + v_rect_e
-    ws[f'F{current_row}'] = t_f + v_rect_f
-    
-    for col in ['C', 'D', 'E', 'F']:
-        cell = ws[f'{col}{current_row}']
-        cell.font = bold_font; cell.border = thin_border; cell.alignment = center_align
-    ws[f'A{current_row}'].border = thin_border
-
-    # Format
-    accounting_format = '#,##0'
-    for row in range(3, current_row + 1):
-        for col in ['C', 'D', 'E', 'F']:
-            ws[f'{col}{row}'].number_format = accounting_format
-
-    # Sauvegarde finale en mémoire
-    final_excel = io.BytesIO()
-    wb.save(final_excel)
-    final_excel.seek(0)
-    
+
+    # Feuilles du classeur (suspens puis détails), la feuille RAPPROCHEMENT vient en dernier
+    feuilles = [('RELEVE_NON_POINTEE', suspens_banque_export), ('JOURNAL_NON_POINTEE', suspens_compta_export)]
+    if not ops_annulees_banque_export.empty:
+        feuilles.append(('OPERATIONS_ANNULEES', ops_annulees_banque_export))
+    if pointages_export is not None:
+        feuilles.append(('POINTAGES', pointages_export))
+    if regroupements_export is not None:
+        feuilles.append(('REGROUPEMENTS', regroupements_export))
+
+    rapprochement = {
+        'solde_compta': solde_compta,
+        'solde_banque': solde_banque,
+        'all_ops': all_ops,
+        'totaux': (t_c, t_d, t_e, t_f),
+        'rectifie': (v_rect_c, v_rect_d, v_rect_e, v_rect_f),
+        'label_rectif': label_rectif,
+    }
+
     # --- PDF GENERATION ---
-    t_c = sum(op.get('col_C', 0) for op in all_ops)
-    t_d = sum(op.get('col_D', 0) for op in all_ops)
-    t_e = sum(op.get('col_E', 0) for op in all_ops)
-    t_f = sum(op.get('col_F', 0) for op in all_ops)
+    t_c, t_d, t_e, t_f = s_c, s_d, s_e, s_f
     
     try: val_solde_compta = float(solde_compta) if solde_compta else 0
     except: val_solde_compta = 0
@@ -538,13 +1151,450 @@ def executer_rapprochement(data_banque, data_compta, data_etat_prec=None, date_r
     solde_rectif = {'label': label_rectif, 'C': rect_C, 'D': rect_D, 'E': rect_E, 'F': rect_F}
     grand_totals = {'C': total_C+rect_C, 'D': total_D+rect_D, 'E': total_E+rect_E, 'F': total_F+rect_F}
     
-    ops_for_pdf = [{'date_str':'', 'libelle':'Solde à rectifier', 'col_C':val_solde_compta, 'col_D':0, 'col_E':0, 'col_F':val_solde_banque}] + all_ops
+    ops_for_pdf = [{'date_str':'', 'libelle':'Solde à rectifier', 'col_C':val_solde_compta, 'col_D':0, 'col_E':0, 'col_F':val_solde_banque}] + all_ops.drop(columns=['raw_date']).to_dict('records')
     
-    _, pdf_bytes = pdf_utils.generate_pdf_report(ops_for_pdf, totals, solde_rectif, grand_totals, None, date_arrete=str(date_rapprochement) if date_rapprochement else "")
+    pdf = {
+        'ops_data': ops_for_pdf,
+        'totals': totals,
+        'solde_rectif': solde_rectif,
+        'grand_totals': grand_totals,
+        'date_arrete': str(date_rapprochement) if date_rapprochement else ""
+    }
 
     stats = {
         'suspens_banque': len(suspens_banque),
         'suspens_compta': len(suspens_compta)
     }
+    stats.update(pointage['stats'])
+
+    return ResultatRapprochement(feuilles, rapprochement, pdf, stats)
+
+def executer_rapprochement(data_banque, data_compta, data_etat_prec=None, date_rapprochement=None, tolerance_montant=0.0, fenetre_jours=None,
+                           regroupement_max=0, budget_regroupement=2.0, suspens_prec=None):
+    """
+    Exécute le rapprochement bancaire entièrement en mémoire.
+    
+    Args:
+        data_banque: DataFrame ou file-like object (Excel)
+        data_compta: DataFrame, ou chemin / file-like object (Excel, CSV ou Parquet, cf. charger_journal)
+        data_etat_prec: DataFrame ou file-like object (Excel) (Optionnel)
+        date_rapprochement: Date/Datetime/String
+        tolerance_montant: Écart de montant accepté (0 = égalité stricte)
+        fenetre_jours: Écart maximal en jours entre date de valeur banque et date journal (None = pas de contrôle)
+            Si l'un des deux est renseigné, le pointage approché est utilisé et les pointages
+            (avec leur score) sont exportés dans la feuille POINTAGES.
+        regroupement_max: Nombre maximal de lignes sommées pour expliquer une ligne restante (0/1 = désactivé)
+        budget_regroupement: Temps maximal (secondes) consacré à la recherche des regroupements
+        suspens_prec: Suspens reportés du rapprochement précédent (liste de dicts raw_date/libelle/col_C..col_F,
+            cf. ResultatRapprochement.suspens_ouverts) ; prioritaire sur data_etat_prec, qui n'est alors pas relu
+        
+    Returns:
+        ResultatRapprochement: feuilles de suspens, lignes et totaux de l'état, stats,
+            ainsi que le classeur (excel_bytes) et le rapport PDF (pdf_bytes)
+    """
     
-    return final_excel, pdf_bytes, stats
\ No newline at end of file
+    def load_data(data, header=0):
+        # Pas de copie ici : les DataFrames d'entrée ne sont jamais modifiés (lecture seule)
+        if data is None: return None
+        if isinstance(data, pd.DataFrame):
+            return data
+        return pd.read_excel(data, header=header)
+
+    # Chargement
+    try:
+        df_banque_raw = load_data(data_banque) # Gardé pour recherche solde
+        # Journal lu par le chargeur dédié (colonnes utiles, types explicites) s'il n'est pas déjà chargé
+        df_compta_raw = data_compta if isinstance(data_compta, pd.DataFrame) else charger_journal(data_compta) # Gardé pour recherche solde
+        
+        # Unique copie de travail de chaque source
+        df_banque = df_banque_raw.copy()
+        df_compta = df_compta_raw.copy()
+    except Exception as e:
+        raise ValueError(f"Erreur lors du chargement des données : {e}")
+
+    df_banque = normaliser_releve(df_banque)
+    df_compta = normaliser_journal(df_compta)
+
+    # --- SUSPENS REPORTES (ETAT PRECEDENT) ---
+    # Suspens reportés : fournis tels quels (grand livre des suspens) ou relus dans l'état Excel du mois précédent
+    if suspens_prec is None and data_etat_prec is not None:
+        print(f"Traitement de l'état précédent...")
+        try:
+            suspens_prec = suspens_depuis_etat(load_data(data_etat_prec, header=None))
+        except Exception as e:
+            print(f"Erreur état précédent : {e}")
+
+    pointage = pointer_sources(df_banque, df_compta, suspens_prec, tolerance_montant, fenetre_jours,
+                               regroupement_max, budget_regroupement)
+
+    # CALCUL DES SOLDES
+    solde_banque = dernier_solde(df_banque_raw)
+    solde_compta = dernier_solde(df_compta_raw)
+
+    return construire_resultat(pointage, solde_banque, solde_compta, date_rapprochement)
+
+# ----------------------------------------------------------------------------------
+# RAPPROCHEMENT PARTITIONNE (GROS VOLUMES)
+# Le pointage exact ne rapproche que des montants égaux (annulations du journal et opérations
+# annulées du relevé comprises) : relevé, journal et suspens reportés sont répartis en partitions
+# selon une empreinte du montant arrondi, chaque partition est pointée seule (pointer_sources),
+# puis les suspens sont fusionnés dans l'ordre des fichiers. Les sources sont lues par blocs et
+# les partitions écrites sur disque : seule une partition (plus les suspens) est en mémoire.
+# Limites : pointage exact uniquement (tolérance, fenêtre de dates et regroupements rapprochent
+# des montants différents, donc des partitions différentes) ; une ligne portant à la fois un débit
+# et un crédit est rangée selon son débit.
+# ----------------------------------------------------------------------------------
+COLONNES_SUSPENS = ['col_C', 'col_D', 'col_E', 'col_F']
+
+def partition_montants(debit, credit, nb_partitions):
+    """Partition de chaque ligne : empreinte du montant (débit, à défaut crédit) en valeur absolue arrondi à 4 décimales. Lignes sans montant : partition 0."""
+    debit = pd.to_numeric(pd.Series(debit), errors='coerce').fillna(0).to_numpy(dtype=float)
+    credit = pd.to_numeric(pd.Series(credit), errors='coerce').fillna(0).to_numpy(dtype=float)
+    montants = np.round(np.abs(np.where(debit != 0, debit, credit)), 4)
+    partitions = (pd.util.hash_array(montants) % np.uint64(nb_partitions)).astype(np.int64)
+    partitions[montants == 0] = 0
+    return partitions
+
+def _colonnes_entete(entete):
+    """Noms de colonnes d'une ligne d'en-tête Excel, comme read_excel : 'Unnamed: i' pour les vides, suffixe .1, .2 pour les doublons."""
+    colonnes, vus = [], {}
+    for i, nom in enumerate(entete):
+        nom = f"Unnamed: {i}" if nom is None else nom
+        if nom in vus:
+            vus[nom] += 1
+            nom = f"{nom}.{vus[nom]}"
+        else:
+            vus[nom] = 0
+        colonnes.append(nom)
+    return colonnes
+
+def _lire_xlsx_par_blocs(data, taille_bloc):
+    # Lecture en flux (read_only) de la première feuille : la feuille n'est jamais chargée entière
+    wb = openpyxl.load_workbook(data, read_only=True, data_only=True)
+    try:
+        lignes = wb.worksheets[0].iter_rows(values_only=True)
+        colonnes = _colonnes_entete(next(lignes, ()))
+        largeur = len(colonnes)
+        bloc, vides, emis = [], [], False
+        for ligne in lignes:
+            ligne = tuple(None if v == '' else v for v in ligne[:largeur]) + (None,) * (largeur - len(ligne))
+            # Lignes vides conservées seulement si une ligne renseignée suit (read_excel ignore celles de fin de feuille)
+            if all(v is None for v in ligne):
+                vides.append(ligne)
+                continue
+            bloc.extend(vides)
+            vides = []
+            bloc.append(ligne)
+            if len(bloc) >= taille_bloc:
+                yield pd.DataFrame(bloc, columns=colonnes)
+                bloc, emis = [], True
+        if bloc or not emis:
+            yield pd.DataFrame(bloc, columns=colonnes)
+    finally:
+        wb.close()
+
+def _lire_parquet_par_blocs(data, taille_bloc, usecols):
+    if pq is None:
+        raise ValueError("Lecture des fichiers Parquet indisponible : installez pyarrow.")
+    fichier = pq.ParquetFile(data)
+    colonnes = [c for c in fichier.schema_arrow.names if usecols is None or usecols(c)]
+    emis = False
+    for lot in fichier.iter_batches(batch_size=taille_bloc, columns=colonnes):
+        emis = True
+        yield lot.to_pandas()
+    if not emis: # fichier sans ligne de données
+        yield fichier.schema_arrow.empty_table().select(colonnes).to_pandas()
+
+def lire_par_blocs(data, taille_bloc=config.rapp_chunk_rows, usecols=None, dtype=None):
+    """
+    Itère sur une source (DataFrame, ou chemin / fichier .csv, .parquet, .xls, .xlsx) par DataFrames d'au plus taille_bloc lignes.
+    CSV : séparateur ';' ou ',' détecté sur l'en-tête, encodage utf-8-sig (comme charger_journal).
+    usecols : filtre sur les noms de colonnes (fichiers seulement), dtype : types des colonnes CSV.
+    """
+    if isinstance(data, pd.DataFrame):
+        for debut in range(0, max(len(data), 1), taille_bloc):
+            yield data.iloc[debut:debut + taille_bloc].copy()
+        return
+    nom = (data if isinstance(data, str) else getattr(data, 'name', '') or '').lower()
+    if nom.endswith('.csv'):
+        options = dict(sep=_separateur_csv(data), encoding='utf-8-sig', usecols=usecols, dtype=dtype)
+        emis = False
+        for bloc in pd.read_csv(data, chunksize=taille_bloc, **options):
+            emis = True
+            yield bloc
+        if not emis: # fichier sans ligne de données
+            if hasattr(data, 'seek'): data.seek(0)
+            yield pd.read_csv(data, nrows=0, **options)
+    elif nom.endswith('.parquet'):
+        yield from _lire_parquet_par_blocs(data, taille_bloc, usecols)
+    elif nom.endswith('.xls'):
+        # xlrd ne sait pas lire en flux : lecture complète puis découpage
+        yield from lire_par_blocs(pd.read_excel(data, engine='xlrd', usecols=usecols), taille_bloc)
+    else:
+        for bloc in _lire_xlsx_par_blocs(data, taille_bloc):
+            yield bloc if usecols is None else bloc[[c for c in bloc.columns if usecols(c)]]
+
+def lire_journal_par_blocs(data, taille_bloc=config.rapp_chunk_rows):
+    """Journal par blocs, avec les colonnes et les types de charger_journal (un DataFrame déjà chargé est découpé tel quel)."""
+    if isinstance(data, pd.DataFrame):
+        yield from lire_par_blocs(data, taille_bloc)
+        return
+    position = 0
+    for bloc in lire_par_blocs(data, taille_bloc, usecols=est_colonne_journal, dtype=str):
+        # Index = position dans le fichier (lignes signalées par _en_montants)
+        bloc.index = pd.RangeIndex(position, position + len(bloc))
+        position += len(bloc)
+        yield _typer_journal(bloc)
+
+def _repartir_source(data, lire, normaliser, fichiers, taille_bloc):
+    """
+    Lit une source par blocs (lire : lire_par_blocs ou lire_journal_par_blocs), normalise chaque bloc
+    et écrit ses lignes dans le fichier de leur partition.
+    Les lignes sont indexées par leur position dans la source (ordre de fusion des suspens).
+    Retourne (DataFrame vide aux colonnes normalisées, dernier solde, nombre de lignes lues).
+    """
+    modele, solde, position = None, 0, 0
+    for bloc in lire(data, taille_bloc):
+        bloc.index = pd.RangeIndex(position, position + len(bloc))
+        position += len(bloc)
+        solde = dernier_solde(bloc, solde) # Sur le bloc brut, comme executer_rapprochement
+        bloc = normaliser(bloc)
+        if modele is None: modele = bloc.iloc[:0].copy()
+        for partition, morceau in bloc.groupby(partition_montants(bloc['debit'], bloc['credit'], len(fichiers)), sort=False):
+            pickle.dump(morceau, fichiers[partition], protocol=pickle.HIGHEST_PROTOCOL)
+    return modele, solde, position
+
+def _charger_partition(chemin, modele):
+    morceaux = []
+    with open(chemin, 'rb') as f:
+        while True:
+            try: morceaux.append(pickle.load(f))
+            except EOFError: break
+    return pd.concat(morceaux) if morceaux else modele.copy()
+
+def executer_rapprochement_partitionne(data_banque, data_compta, data_etat_prec=None, date_rapprochement=None, suspens_prec=None,
+                                       nb_partitions=config.rapp_partitions, taille_bloc=config.rapp_chunk_rows, dossier_travail=None):
+    """
+    Rapprochement (pointage exact) à mémoire bornée, pour les journaux de très grande taille.
+    Même résultat qu'executer_rapprochement sans tolérance, fenêtre de dates ni regroupements.
+    
+    Args:
+        data_banque, data_compta: DataFrame, ou chemin / fichier .xlsx (lu en flux), .csv ou .parquet (lus par blocs) ou .xls ;
+            le journal est lu avec les colonnes et les types de charger_journal
+        data_etat_prec, date_rapprochement, suspens_prec: cf. executer_rapprochement
+        nb_partitions: Nombre de partitions par montant (mémoire ~ taille des sources / nb_partitions)
+        taille_bloc: Nombre de lignes lues à la fois
+        dossier_travail: Dossier des fichiers temporaires de partition (défaut : dossier temporaire du système)
+        
+    Returns:
+        ResultatRapprochement
+    """
+    start_time = time.time()
+
+    if suspens_prec is None and data_etat_prec is not None:
+        print(f"Traitement de l'état précédent...")
+        try:
+            df_etat = data_etat_prec if isinstance(data_etat_prec, pd.DataFrame) else pd.read_excel(data_etat_prec, header=None)
+            suspens_prec = suspens_depuis_etat(df_etat)
+        except Exception as e:
+            print(f"Erreur état précédent : {e}")
+
+    # Suspens reportés : un morceau par montant renseigné, dans la partition de ce montant
+    # (_ordre permet de recomposer chaque suspens après pointage)
+    suspens_par_partition = [[] for _ in range(nb_partitions)]
+    for ordre, op in enumerate(suspens_prec or []):
+        for col in COLONNES_SUSPENS:
+            if op[col] > 0:
+                morceau = dict(op, col_C=0, col_D=0, col_E=0, col_F=0, _ordre=ordre)
+                morceau[col] = op[col]
+                suspens_par_partition[partition_montants([op[col]], [0], nb_partitions)[0]].append(morceau)
+
+    with tempfile.TemporaryDirectory(prefix='rapprochement_', dir=dossier_travail) as dossier:
+        chemins = {source: [os.path.join(dossier, f"{source}_{p}.pkl") for p in range(nb_partitions)] for source in ('banque', 'compta')}
+        try:
+            sources = {}
+            for source, data, lire, normaliser in (('banque', data_banque, lire_par_blocs, normaliser_releve),
+                                                   ('compta', data_compta, lire_journal_par_blocs, normaliser_journal)):
+                fichiers = [open(chemin, 'wb') for chemin in chemins[source]]
+                try:
+                    sources[source] = _repartir_source(data, lire, normaliser, fichiers, taille_bloc)
+                finally:
+                    for f in fichiers: f.close()
+        except Exception as e:
+            raise ValueError(f"Erreur lors du chargement des données : {e}")
+
+        (modele_banque, solde_banque, nb_banque), (modele_compta, solde_compta, nb_compta) = sources['banque'], sources['compta']
+        print(f"🧩 Rapprochement partitionné : {nb_banque} lignes relevé, {nb_compta} lignes journal, {nb_partitions} partitions")
+
+        # Pointage partition par partition : seuls les suspens sont conservés
+        resultats = []
+        for p in range(nb_partitions):
+            df_banque = _charger_partition(chemins['banque'][p], modele_banque)
+            df_compta = _charger_partition(chemins['compta'][p], modele_compta)
+            if df_banque.empty and df_compta.empty and not suspens_par_partition[p]:
+                continue
+            pointage = pointer_sources(df_banque, df_compta, suspens_par_partition[p])
+            del df_banque, df_compta
+            resultats.append(pointage)
+
+    # Fusion des suspens dans l'ordre des sources
+    suspens_banque = pd.concat([r['suspens_banque'] for r in resultats] or [modele_banque]).sort_index(kind='mergesort')
+    suspens_compta = pd.concat([r['suspens_compta'] for r in resultats] or [modele_compta]).sort_index(kind='mergesort')
+
+    # Opérations annulées : paires (débit, crédit) dans l'ordre des débits du relevé
+    annulees = [r['ops_annulees_banque'] for r in resultats if not r['ops_annulees_banque'].empty]
+    if annulees:
+        cle = np.concatenate([np.repeat(a.index.to_numpy()[::2], 2) for a in annulees])
+        ops_annulees_banque = pd.concat(annulees).iloc[np.argsort(cle, kind='stable')]
+    else:
+        ops_annulees_banque = pd.DataFrame(columns=suspens_banque.columns)
+
+    # Suspens reportés restés ouverts, recomposés dans leur ordre d'origine
+    restes = {}
+    for r in resultats:
+        for morceau in r['suspens_etat_prec']:
+            op = restes.setdefault(morceau['_ordre'], dict(suspens_prec[morceau['_ordre']], col_C=0, col_D=0, col_E=0, col_F=0))
+            for col in COLONNES_SUSPENS:
+                if morceau[col]: op[col] = morceau[col]
+    suspens_etat_prec = [restes[ordre] for ordre in sorted(restes)]
+
+    pointage = {
+        'suspens_banque': suspens_banque,
+        'suspens_compta': suspens_compta,
+        'ops_annulees_banque': ops_annulees_banque,
+        'suspens_etat_prec': suspens_etat_prec,
+        'pointages_export': None,
+        'regroupements_export': None,
+        'stats': {},
+    }
+    resultat = construire_resultat(pointage, solde_banque, solde_compta, date_rapprochement)
+    print(f"✅ Rapprochement partitionné terminé en {time.time() - start_time:.1f} s")
+    return resultat
+
+# ----------------------------------------------------------------------------------
+# CHARGEMENT DU JOURNAL
+# Seules les colonnes utilisées par le rapprochement sont lues (dates, libellés, débit, crédit, solde),
+# avec des types explicites : montants en float64. Les dates gardent leur valeur d'origine (texte saisi
+# repris tel quel à l'export) ; le pointage les parse à part (normaliser_dates, mémo des textes).
+# XLSX lu en flux (openpyxl read_only), CSV lu en texte par le parseur C, Parquet par colonnes.
+# ----------------------------------------------------------------------------------
+def est_colonne_journal(nom):
+    """Colonne du journal utilisée par le rapprochement (mêmes règles de noms que normaliser_journal et construire_resultat)."""
+    nom = str(nom).lower().replace('é', 'e')
+    return nom in ('debit', 'credit') or nom.strip() == 'solde' or 'date' in nom or 'libell' in nom
+
+ESPACES_MONTANT_RE = re.compile(r"[\s\u00a0\u202f']")
+NOMBRE_RE = re.compile(r'^[+-]?(\d+(\.\d*)?|\.\d+)$')
+VIDE_MONTANT_RE = re.compile(r'^-*$') # Cellule vide ou tiret ("-" : montant nul dans les exports comptables)
+MAX_MONTANTS_SIGNALES = 5
+
+def _texte_en_nombre(texte):
+    """
+    Montant saisi en texte -> float, NaN si illisible (vide : cf. VIDE_MONTANT_RE).
+    Les deux séparateurs présents : le dernier est la décimale ("1.500,50", "1,500.50" -> 1500.5).
+    Un seul séparateur : répété ou suivi d'exactement trois chiffres (partie entière non nulle), il sépare
+    les milliers ("1.500.000", "1,500,000", "1.500" -> 1500) ; sinon c'est la décimale ("1500,5", "0,125").
+    Les groupes de milliers doivent compter trois chiffres ("1.50.0" est illisible).
+    """
+    texte = ESPACES_MONTANT_RE.sub('', texte)
+    milliers = decimale = None
+    if ',' in texte and '.' in texte:
+        decimale = ',' if texte.rfind(',') > texte.rfind('.') else '.'
+        milliers = '.' if decimale == ',' else ','
+    elif ',' in texte or '.' in texte:
+        separateur = ',' if ',' in texte else '.'
+        partie_entiere, _, fin = texte.rpartition(separateur)
+        if texte.count(separateur) > 1 or (len(fin) == 3 and fin.isdigit() and partie_entiere.lstrip('+-').lstrip('0')):
+            milliers = separateur
+        else:
+            decimale = separateur
+    if milliers:
+        entier, _, decimales = texte.partition(decimale) if decimale else (texte, '', '')
+        if not re.match(r'^[+-]?\d{1,3}(' + re.escape(milliers) + r'\d{3})*$', entier): return np.nan
+        texte = entier.replace(milliers, '') + ('.' + decimales if decimale else '')
+    elif decimale:
+        texte = texte.replace(decimale, '.')
+    if not NOMBRE_RE.match(texte): return np.nan
+    return float(texte)
+
+def _en_montants(serie, nom_colonne=None):
+    """
+    Montants en float64 ; les textes sont convertis par _texte_en_nombre.
+    Un montant renseigné mais illisible lève ValueError (lignes et valeurs signalées) : il ne doit pas devenir 0.
+    """
+    if serie.dtype == object or pd.api.types.is_string_dtype(serie):
+        serie = serie.astype(object)
+        textes = serie.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+        if textes.any():
+            serie = serie.copy()
+            originaux = serie[textes]
+            convertis = originaux.map(_texte_en_nombre)
+            illisibles = convertis.isna() & ~originaux.map(lambda t: VIDE_MONTANT_RE.match(ESPACES_MONTANT_RE.sub('', t)) is not None)
+            if illisibles.any():
+                # Ligne du fichier : index de la ligne (position dans la source) + 2 (ligne d'en-tête)
+                exemples = ", ".join(f"ligne {i + 2 if isinstance(i, (int, np.integer)) else i} : '{v}'"
+                                     for i, v in originaux[illisibles].head(MAX_MONTANTS_SIGNALES).items())
+                suite = " ..." if illisibles.sum() > MAX_MONTANTS_SIGNALES else ""
+                raise ValueError(f"Journal : {int(illisibles.sum())} montant(s) illisible(s) dans la colonne '{nom_colonne or serie.name}' ({exemples}{suite}).")
+            serie[textes] = convertis
+    return pd.to_numeric(serie, errors='coerce').astype('float64')
+
+def _typer_journal(df):
+    """Montants en float64 ; les autres colonnes (dates comprises) sont laissées telles que lues."""
+    for col in df.columns:
+        nom = str(col).lower().replace('é', 'e')
+        if nom in ('debit', 'credit') or nom.strip() == 'solde':
+            df[col] = _en_montants(df[col], col)
+    return df
+
+def _lire_journal_xlsx(data):
+    wb = openpyxl.load_workbook(data, read_only=True, data_only=True)
+    try:
+        lignes = wb.worksheets[0].iter_rows(values_only=True)
+        gardees = [(i, nom) for i, nom in enumerate(_colonnes_entete(next(lignes, ()))) if est_colonne_journal(nom)]
+        valeurs = [[] for _ in gardees]
+        nb_lignes = 0 # jusqu'à la dernière ligne renseignée (read_excel ignore les lignes vides de fin de feuille)
+        for n, ligne in enumerate(lignes, 1):
+            renseignee = False
+            for colonne, (i, _) in zip(valeurs, gardees):
+                v = ligne[i] if i < len(ligne) else None
+                if v == '': v = None
+                if v is not None: renseignee = True
+                colonne.append(v)
+            if renseignee: nb_lignes = n
+    finally:
+        wb.close()
+    # Inférence par colonne : dates Excel -> datetime64, nombres -> float64, le reste en objets
+    return pd.DataFrame({nom: pd.Series(colonne[:nb_lignes], dtype=None if colonne else object) for colonne, (_, nom) in zip(valeurs, gardees)})
+
+def _separateur_csv(data):
+    """';' (export Excel FR) ou ',' selon la ligne d'en-tête."""
+    if hasattr(data, 'read'):
+        entete = data.readline()
+        data.seek(0)
+    else:
+        with open(data, 'rb') as f:
+            entete = f.readline()
+    if isinstance(entete, bytes): entete = entete.decode('utf-8', errors='ignore')
+    return ';' if entete.count(';') > entete.count(',') else ','
+
+def charger_journal(data):
+    """
+    Charge un journal (chemin ou fichier .xlsx, .xls, .csv, .parquet) avec ses seules colonnes utiles,
+    typées explicitement. Même résultat que read_excel pour le rapprochement, sans les colonnes inutiles.
+    """
+    nom = (data if isinstance(data, str) else getattr(data, 'name', '') or '').lower()
+    if nom.endswith('.csv'):
+        # Tout en texte (pas d'inférence de types), conversion explicite ensuite
+        df = pd.read_csv(data, sep=_separateur_csv(data), usecols=est_colonne_journal, dtype=str, encoding='utf-8-sig')
+    elif nom.endswith('.parquet'):
+        if pq is None:
+            raise ValueError("Lecture des journaux Parquet indisponible : installez pyarrow.")
+        colonnes = [c for c in pq.ParquetFile(data).schema_arrow.names if est_colonne_journal(c)]
+        if hasattr(data, 'seek'): data.seek(0)
+        df = pd.read_parquet(data, columns=colonnes)
+    elif nom.endswith('.xls'):
+        df = pd.read_excel(data, engine='xlrd', usecols=est_colonne_journal)
+    else:
+        df = _lire_journal_xlsx(data)
+    return _typer_journal(df)
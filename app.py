@@ -3,8 +3,10 @@ import os
 import _02_rapp as rapp  # Import du module de traitement
 import _05_style as style # Import du fichier de style
 import base64
+import hashlib
 import _03_auth_manager as auth_manager # Gestionnaire d'authentification
 import main as pdf_extractor # Pipeline d extraction
+import suspens_ledger # Grand livre des suspens (report d'un mois sur l'autre)
 
 import pandas as pd
 import datetime
@@ -37,6 +39,32 @@ def logout():
     st.session_state.authenticated = False
     st.session_state.user_email = ""
 
+def enregistrer_resultat(user_id, data):
+    """
+    Produit l'E.R (Excel + PDF) d'un rapprochement, l'envoie dans le Storage et l'ajoute à l'historique.
+    Appelé seulement quand l'utilisateur demande les fichiers : un simple aperçu ne paie ni openpyxl ni FPDF.
+    Les fichiers restent en mémoire (resultat) pour les boutons de téléchargement de la session.
+    """
+    resultat = data['resultat']
+    url_excel = auth_manager.upload_to_storage(
+        resultat.excel_bytes,
+        data['nom_fichier_sortie'],
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+    url_pdf = None
+    if resultat.pdf_bytes:
+        url_pdf = auth_manager.upload_to_storage(resultat.pdf_bytes, data['pdf_filename'], content_type="application/pdf")
+
+    # Note: Si l'upload échoue (url=None), on aura None en base, ce qui est acceptable pour l'instant.
+    auth_manager.add_history_remote(user_id, {
+        'url_excel': url_excel,
+        'url_pdf': url_pdf,
+        'banque': data['choix_banque'],
+        'date_gen': data['date_gen'],
+        'mois': data['mois']
+    })
+    data['fichiers_generes'] = True
+
 
 # Gestion du logout via URL (pour le bouton dans le header)
 if "logout" in st.query_params:
@@ -617,6 +645,10 @@ else:
 
     with cols_sel[2]:
         date_arrete = st.date_input("Date de rapprochement", key=f"date_{st.session_state.reset_key}")
+
+    with cols_sel[3]:
+        # Le grand livre des suspens est tenu par compte (une même banque peut porter plusieurs comptes)
+        numero_compte = st.text_input("N° de compte", key=f"compte_{st.session_state.reset_key}")
     
     st.markdown("---")
     
@@ -633,8 +665,22 @@ else:
     
     with col3:
         st.subheader("3. Journal Banque")
-        journal_file = st.file_uploader("Ajoutez votre journal banque", type=['xlsx', 'xls'], key=f"journal_{st.session_state.reset_key}")
+        journal_file = st.file_uploader("Ajoutez votre journal banque", type=['xlsx', 'xls', 'csv', 'parquet'], key=f"journal_{st.session_state.reset_key}")
     
+    # Options de pointage approché (désactivé par défaut : égalité stricte des montants)
+    with st.expander("Options de pointage"):
+        cols_opt = st.columns(3)
+        with cols_opt[0]:
+            tolerance_montant = st.number_input("Tolérance sur les montants", min_value=0.0, value=0.0, step=1.0, key=f"tolerance_{st.session_state.reset_key}")
+        with cols_opt[1]:
+            fenetre_jours = st.number_input("Fenêtre de dates (jours, 0 = désactivée)", min_value=0, value=0, step=1, key=f"fenetre_{st.session_state.reset_key}")
+        with cols_opt[2]:
+            regroupement_max = st.number_input("Regroupements : nb max de lignes (0 = désactivé)", min_value=0, max_value=6, value=0, step=1, key=f"regroupement_{st.session_state.reset_key}")
+
+    # Report des suspens du grand livre : uniquement sur demande, sans E.R précédent (l'état chargé prime)
+    reprendre_suspens = st.checkbox("Reprendre les suspens du précédent rapprochement de ce compte (grand livre), sans E.R précédent",
+                                    value=False, key=f"reprise_{st.session_state.reset_key}")
+
     st.markdown("---")
     
     # Bouton de validation
@@ -651,6 +697,8 @@ else:
         
         if missing_files:
             st.error(f"Veuillez charger les fichiers manquants : {', '.join(missing_files)}")
+        elif reprendre_suspens and not numero_compte.strip():
+            st.error("Indiquez le N° de compte pour reprendre les suspens du grand livre.")
         else:
             start_time = time.time()
             with st.spinner('Traitement en cours...'):
@@ -666,6 +714,16 @@ else:
                             # Default to openpyxl for xlsx or others
                             return pd.read_excel(file_upload, engine='openpyxl')
 
+                    def load_journal(file_upload):
+                        # Journal parsé une seule fois par session (clé = empreinte du fichier) : relancer
+                        # le rapprochement avec le même journal (autre relevé, autres options) ne le relit pas
+                        cle = hashlib.sha256(file_upload.getvalue()).hexdigest()
+                        cache = st.session_state.setdefault('journaux_charges', {})
+                        if cle not in cache:
+                            if len(cache) >= 3: cache.pop(next(iter(cache))) # Les plus anciens sortent en premier
+                            cache[cle] = rapp.charger_journal(file_upload)
+                        return cache[cle]
+
                     # Gestion du Relevé Bancaire (PDF OBLIGATOIRE selon la demande, mais on gère si jamais)
                     df_releve = None
                     file_upload = releve_file
@@ -675,16 +733,9 @@ else:
                         status_text = st.empty()
                         status_text.info("Etat de Rapprochement en cours de traitement... (Veuillez patienter quelques secondes)")
                         
-                        # Création d'un fichier temporaire pour le PDF
+                        # Extraction directement depuis les octets uploadés (aucun fichier temporaire)
                         try:
-                            # Dossier temporaire pour les uploads
-                            os.makedirs("temp_uploads", exist_ok=True)
-                            temp_pdf_path = os.path.join("temp_uploads", file_upload.name)
-                            
-                            with open(temp_pdf_path, "wb") as f:
-                                f.write(file_upload.getbuffer())
-                                
-                        # Lancement du pipeline d'extraction via main.py / run_extraction_pipeline
+                        # Lancement du pipeline d'extraction en mémoire via main.py / run_extraction_in_memory
                             with st.status("Traitement en cours...", expanded=True) as status:
                                 # st.write("Préparation de l'environnement...")
                                 
@@ -693,18 +744,10 @@ else:
                                     if not msg.startswith("OCR page") and not msg.startswith("Traitement OCR"):
                                         status.update(label=msg)
                                 
-                                extracted_excel_path = pdf_extractor.run_extraction_pipeline(temp_pdf_path, bank_name=choix_banque, status_callback=update_status)                            
+                                df_releve = pdf_extractor.run_extraction_in_memory(file_upload.getvalue(), bank_name=choix_banque, status_callback=update_status, source_name=file_upload.name)
                                 
-                                if extracted_excel_path and os.path.exists(extracted_excel_path):
+                                if df_releve is not None and not df_releve.empty:
                                     status.update(label="Extraction terminée !", state="complete", expanded=False)
-                                    
-                                    df_releve = pd.read_excel(extracted_excel_path, engine='openpyxl')
-                                    
-                                    # Chargement des données pour le bouton de téléchargement (hors du bloc status pour visibilité)
-                                    with open(extracted_excel_path, "rb") as f:
-                                        excel_data = f.read()
-                                    excel_name = os.path.basename(extracted_excel_path)
-                                    
                                     time.sleep(1) 
                                 else:
                                     status.update(label="Échec de l'extraction", state="error")
@@ -732,7 +775,7 @@ else:
                         # Si l'utilisateur force un Excel (non recommandé vu la consigne, mais robuste)
                         df_releve = load_input(releve_file)
 
-                    df_journal = load_input(journal_file)
+                    df_journal = load_journal(journal_file)
                     
                     df_etat = None
                     if etat_prec_file:
@@ -740,6 +783,25 @@ else:
                         ext_etat = etat_prec_file.name.split('.')[-1].lower()
                         engine_etat = 'xlrd' if ext_etat == 'xls' else 'openpyxl'
                         df_etat = pd.read_excel(etat_prec_file, header=None, engine=engine_etat)
+
+                    # Sur demande et sans état précédent chargé, les suspens sont repris du grand livre
+                    # (dernier arrêté du compte antérieur à la date de rapprochement)
+                    suspens_prec = None
+                    if reprendre_suspens:
+                        if df_etat is not None:
+                            st.warning("E.R précédent chargé : ses suspens sont utilisés, le grand livre n'est pas repris.")
+                        else:
+                            instantane = None
+                            try:
+                                instantane = suspens_ledger.charger_suspens(user_id, numero_compte, date_arrete)
+                            except Exception as e:
+                                print(f"⚠️ Lecture du grand livre des suspens impossible : {e}")
+                            if instantane is None:
+                                st.warning(f"Aucun rapprochement antérieur enregistré pour le compte {numero_compte} : aucun suspens reporté.")
+                            else:
+                                arrete_repris, suspens_prec = instantane
+                                arrete_repris = datetime.date.fromisoformat(arrete_repris).strftime('%d/%m/%Y')
+                                st.info(f"{len(suspens_prec)} suspens reportés depuis l'arrêté du {arrete_repris} (compte {numero_compte}).")
     
                     # Définition du nom de fichier de sortie
                     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -747,60 +809,40 @@ else:
                     
                     # Exécution du rapprochement en mémoire
                     # IMPORTANT : df_releve contient maintenant les données extraites
-                    excel_buffer, pdf_bytes, stats = rapp.executer_rapprochement(df_releve, df_journal, df_etat, date_rapprochement=date_arrete)
-
-                    # Sauvegarde des RÉSULTATS dans Supabase Storage (Cloud)
-                    url_excel = auth_manager.upload_to_storage(
-                        excel_buffer.getvalue(), 
-                        nom_fichier_sortie, 
-                        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    resultat = rapp.executer_rapprochement(
+                        df_releve, df_journal, df_etat, date_rapprochement=date_arrete,
+                        tolerance_montant=tolerance_montant,
+                        fenetre_jours=int(fenetre_jours) if fenetre_jours else None,
+                        regroupement_max=int(regroupement_max),
+                        suspens_prec=suspens_prec
                     )
-                    
-                    url_pdf = None
-                    if pdf_bytes:
-                         pdf_filename = nom_fichier_sortie.replace('.xlsx', '.pdf')
-                         url_pdf = auth_manager.upload_to_storage(
-                             pdf_bytes,
-                             pdf_filename,
-                             content_type="application/pdf"
-                         )
-
-                    # Mise à jour Crédits et Historique
-                    auth_manager.decrement_credits(user_id)
-                    
-                    date_display = datetime.datetime.now().strftime("%d/%m/%Y %H:%M")
-                    
-                    # On sauvegarde les URLs publiques dans l'historique
-                    # Note: Si l'upload échoue (url=None), on aura None en base, ce qui est acceptable pour l'instant.
-                    auth_manager.add_history_remote(user_id, {
-                        'url_excel': url_excel,
-                        'url_pdf': url_pdf,
-                        'banque': choix_banque,
-                        'date_gen': date_display,
-                        'mois': mois_rapprochement
-                    })
 
+                    # Mise à jour du grand livre (compte indiqué) : les suspens encore ouverts pourront être reportés au mois suivant
+                    if numero_compte.strip():
+                        try:
+                            suspens_ledger.enregistrer_suspens(user_id, numero_compte, date_arrete, resultat.suspens_ouverts())
+                        except Exception as e:
+                            print(f"⚠️ Grand livre des suspens non mis à jour : {e}")
+
+                    # Mise à jour Crédits ; les fichiers (Excel, PDF) et l'historique ne sont produits qu'à la demande
+                    auth_manager.decrement_credits(user_id)
+                    pdf_filename = nom_fichier_sortie.replace('.xlsx', '.pdf')
 
                     # Invalidation explicite du cache historique
                     # auth_manager.get_history.clear()
 
-                    # NETTOYAGE DES FICHIERS TEMPORAIRES ET SOURCE
-                    # Uniquement si un PDF a été traité (temp_pdf_path défini)
-                    if 'temp_pdf_path' in locals() and temp_pdf_path:
-                        # On appelle la fonction de nettoyage du module main (alias pdf_extractor)
-                        pdf_extractor.cleanup_extraction_artifacts(temp_pdf_path)
-
                     end_time = time.time()
                     duration = end_time - start_time
 
                     # Stockage des résultats dans la session pour persistance
                     st.session_state['processed_data'] = {
-                        'excel_bytes': excel_buffer.getvalue(),
-                        'pdf_bytes': pdf_bytes,
-                        'stats': stats,
+                        'resultat': resultat,
                         'nom_fichier_sortie': nom_fichier_sortie,
                         'pdf_filename': pdf_filename,
                         'choix_banque': choix_banque,
+                        'mois': mois_rapprochement,
+                        'date_gen': datetime.datetime.now().strftime("%d/%m/%Y %H:%M"),
+                        'fichiers_generes': False,
                         'duration': duration
                     }
                     
@@ -811,76 +853,84 @@ else:
     if 'processed_data' in st.session_state:
         data = st.session_state['processed_data']
         
-        # Reconstruction du buffer Excel
-        import io
-        excel_buffer = io.BytesIO(data['excel_bytes'])
-        pdf_bytes = data['pdf_bytes']
-        stats = data['stats']
+        resultat = data['resultat']
+        stats = resultat.stats
         nom_fichier_sortie = data['nom_fichier_sortie']
         pdf_filename = data['pdf_filename']
         duration = data.get('duration', 0)
         st.success(f"Rapprochement terminé pour {choix_banque} ! (durée de traitement : {duration:.2f} s)")
         if stats:
              st.info(f"Suspendus : Banque ({stats.get('suspens_banque', 0)}), Compta ({stats.get('suspens_compta', 0)})")
+             if stats.get('score_moyen') is not None:
+                 st.info(f"Pointages approchés : {stats.get('pointages_approches', 0)} (score moyen {stats['score_moyen']:.2f}, détail dans la feuille POINTAGES)")
+             if stats.get('regroupements'):
+                 st.info(f"Regroupements pointés : {stats['regroupements']} (détail dans la feuille REGROUPEMENTS)")
         
         # Zone Output
         st.markdown("### Résultat")
         
-        col_d1, col_d2 = st.columns(2)
-        with col_d1:
-            st.download_button(
-                label="Télécharger E.R Excel",
-                data=excel_buffer,
-                file_name=nom_fichier_sortie,
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-        with col_d2:
-            if pdf_bytes:
+        # Fichiers de l'E.R produits à la demande (puis enregistrés dans l'historique) : l'aperçu seul ne les génère pas
+        if not data.get('fichiers_generes'):
+            if st.button("Générer l'E.R (Excel + PDF)"):
+                with st.spinner("Génération des fichiers..."):
+                    enregistrer_resultat(user_id, data)
+
+        if data.get('fichiers_generes'):
+            col_d1, col_d2 = st.columns(2)
+            with col_d1:
                 st.download_button(
-                    label="Télécharger E.R PDF",
-                    data=pdf_bytes,
-                    file_name=pdf_filename,
-                    mime="application/pdf"
+                    label="Télécharger E.R Excel",
+                    data=resultat.excel_bytes,
+                    file_name=nom_fichier_sortie,
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
+            with col_d2:
+                if resultat.pdf_bytes:
+                    st.download_button(
+                        label="Télécharger E.R PDF",
+                        data=resultat.pdf_bytes,
+                        file_name=pdf_filename,
+                        mime="application/pdf"
+                    )
             
         st.markdown("### Aperçu des résultats")
         
         try:
-            # Lecture pour affichage depuis le buffer
-            excel_buffer.seek(0)
-            df_rapp = pd.read_excel(excel_buffer, sheet_name='RAPPROCHEMENT', header=None).fillna("")
-            
+            # Aperçu construit directement depuis le résultat (pas de relecture du classeur généré)
             # Reformater les chiffres pour l'affichage (Séparateur millier, 0 décimale)
             def format_accounting(val):
+                if val is None or val == "": return ""
                 try:
                     f = float(val)
+                    if f != f: return ""
                     # Format: espace pour milliers, 0 décimales
                     return "{:,.0f}".format(f).replace(",", " ")
                 except:
                     return str(val)
 
-            # On applique le formatage sur tout le dataframe (car structure mixte)
-            # On ne touche pas aux dates/libellés qui ne sont pas des floats convertibles (ou alors on checke l'erreur)
-            # L'astuce est d'appliquer uniquement si c'est convertible
-            
-            df_rapp = df_rapp.applymap(lambda x: format_accounting(x))
+            def format_suspens(df):
+                # Colonnes montants formatées, le reste en texte (évite les erreurs PyArrow sur les types mixtes)
+                df = df.copy()
+                for col in df.columns:
+                    if any(m in str(col).lower() for m in ('debit', 'credit', 'montant')):
+                        df[col] = df[col].map(format_accounting)
+                    else:
+                        df[col] = df[col].map(lambda x: "" if pd.isna(x) else str(x))
+                return df
+
+            df_rapp = resultat.tableau_rapprochement()
+            for col in df_rapp.columns:
+                df_rapp[col] = df_rapp[col].map(format_accounting)
 
-            # Force string type for all columns to avoid PyArrow mixed type errors (int vs str)
-            # Déjà fait par le formatage qui retourne des strings
-            
             st.subheader("Tableau de Rapprochement")
             st.dataframe(df_rapp, width=None, use_container_width=True, hide_index=True)
             
             with st.expander("Voir les détails des suspens"):
-                excel_buffer.seek(0)
                 st.write("#### Opérations Non Pointées - Journal")
-                df_jn = pd.read_excel(excel_buffer, sheet_name='JOURNAL_NON_POINTEE', dtype=str).fillna("")
-                st.dataframe(df_jn, use_container_width=True)
+                st.dataframe(format_suspens(resultat.suspens_compta), use_container_width=True)
 
-                excel_buffer.seek(0)
                 st.write("#### Opérations Non Pointées - Relevé")
-                df_rn = pd.read_excel(excel_buffer, sheet_name='RELEVE_NON_POINTEE', dtype=str).fillna("")
-                st.dataframe(df_rn, use_container_width=True)
+                st.dataframe(format_suspens(resultat.suspens_banque), use_container_width=True)
                 
         except Exception as e:
             st.warning(f"Impossible d'afficher l'aperçu complet : {e}")
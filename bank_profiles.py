@@ -0,0 +1,205 @@
+"""
+Profils de mise en page des relevés bancaires : un profil par banque.
+Un profil regroupe tout ce qui dépend du modèle de relevé : bornes des colonnes, lignes à ignorer
+(en-têtes, pieds de page, mentions légales, totaux), formats de date et grammaire des montants.
+Les motifs de chaque profil sont compilés une seule fois, à l'import du module.
+
+Le profil d'un relevé est choisi sur une empreinte de sa première page (marqueurs propres à la banque,
+ex: "www.orabank.net"), en un seul balayage pour toutes les banques ; le nom de banque saisi par
+l'utilisateur ne sert que si aucun marqueur n'est trouvé. Les lignes du relevé ne sont ensuite
+comparées qu'aux motifs du profil retenu.
+
+Les bornes de colonnes d'un profil ne servent que de repli : celles de chaque relevé sont déduites
+de ses premières pages (cf. layout_inference). Une banque sans profil passe par le profil générique
+lorsque ses colonnes sont reconnues.
+
+Ajouter une banque : créer son BankProfile et l'enregistrer avec register_profile (en fin de module),
+puis incrémenter EXTRACTOR_VERSION (extract_table.py) si la détection d'un relevé existant change.
+"""
+
+import re
+import copy
+import numpy as np
+from functools import lru_cache
+
+# Types de lignes ignorées (cf. extract_table.classify_line)
+LINE_HEADER = "header"          # En-tête de tableau / en-têtes parasites
+LINE_FOOTER = "footer"          # Pied de page, mentions légales
+LINE_TOTAL = "total"            # Ligne de total seule : ferme la transaction courante
+
+# Bornes des colonnes, dans l'ordre du tableau (Date | Libellé | Valeur | Débit | Crédit | Solde)
+COLUMN_KEYS = ("date_limit", "libelle_limit", "valeur_limit", "debit_limit", "credit_limit")
+
+# Lignes communes aux relevés au format "EXTRAIT DE COMPTE" : motif -> type de ligne
+COMMON_SKIP_PATTERNS = {
+    "Libellé": LINE_HEADER, "Valeur": LINE_HEADER, "Débit": LINE_HEADER, "Crédit": LINE_HEADER, "Solde": LINE_HEADER, # En-tête tableau (couvre aussi "Solde précédent")
+    "Total général": LINE_TOTAL, "Total des mouvements": LINE_TOTAL, # Totaux
+    "RELEVE D'IDENTITE BANCAIRE": LINE_HEADER, "EXTRAIT DE COMPTE": LINE_HEADER # En-têtes parasites
+}
+
+MAX_CACHE_TOKENS = 65536
+
+
+def column_edges(bounds: dict) -> np.ndarray:
+    """Bornes croissantes des colonnes, utilisables directement par np.digitize."""
+    return np.array([bounds[k] for k in COLUMN_KEYS], dtype=float)
+
+class BankProfile:
+    """
+    Modèle de relevé d'une banque.
+    - markers : textes propres à la banque, recherchés sur la première page (empreinte)
+    - aliases : noms de banque acceptés (sélection manuelle, manifeste du mode lot)
+    - column_bounds : bornes x des colonnes (cf. COLUMN_KEYS)
+    - skip_patterns : lignes à ignorer propres à la banque (ajoutées à COMMON_SKIP_PATTERNS)
+    - date_pattern / date_formats : reconnaissance d'une date en première colonne / formats de lecture
+    - amount_max_digits : un mot de montant plus long est du libellé débordant (RIB, référence)
+    - decimal_separator : None si les montants sont entiers (FCFA)
+    - solde_label / solde_min_x : libellé de la ligne du solde précédent et position minimale de son montant
+    """
+
+    def __init__(self, name, aliases=(), markers=(), column_bounds=None, skip_patterns=None,
+                 date_pattern=r"^\d{1,2}/\d{1,2}/\d{2,4}$", date_formats=("%d/%m/%Y",),
+                 total_footer=r"totalgeneral|totalmouvements|totaldesmouvements|totaldeb|totalcred",
+                 amount_max_digits=10, decimal_separator=None, solde_label="précédent", solde_min_x=300):
+        self.name = name
+        self.aliases = tuple(a.strip().lower() for a in (name,) + tuple(aliases))
+        self.markers = tuple(markers)
+        self._set_bounds(column_bounds)
+        self.date_formats = tuple(date_formats)
+        self.amount_max_digits = amount_max_digits
+        self.decimal_separator = decimal_separator
+        self.solde_label = solde_label
+        self.solde_min_x = solde_min_x
+
+        # Motifs compilés une seule fois
+        self.skip_patterns = dict(COMMON_SKIP_PATTERNS, **(skip_patterns or {}))
+        # Un seul balayage par ligne (alternative unique, motifs les plus longs en premier)
+        self.skip_re = re.compile("|".join(re.escape(p) for p in sorted(self.skip_patterns, key=len, reverse=True)))
+        self.total_footer_re = re.compile(total_footer)
+        self.date_re = re.compile(date_pattern)
+        self.text_char_re = re.compile(r"[a-zA-Z/]")
+        self.non_digit_re = re.compile(r"[^\d]")
+
+        # Caches propres au profil (les mêmes mots reviennent d'une ligne et d'une page à l'autre)
+        self.is_date_token = lru_cache(maxsize=MAX_CACHE_TOKENS)(self._is_date_token)
+        self.is_amount_like = lru_cache(maxsize=MAX_CACHE_TOKENS)(self._is_amount_like)
+
+    def __repr__(self):
+        return f"BankProfile({self.name!r})"
+
+    def _set_bounds(self, column_bounds):
+        self.column_bounds = dict(column_bounds)
+        self.edges = column_edges(self.column_bounds)
+        self.date_limit = self.column_bounds["date_limit"]
+
+    def with_bounds(self, column_bounds):
+        """Profil identique avec les bornes de colonnes d'un document (motifs compilés et caches partagés)."""
+        derived = copy.copy(self)
+        derived._set_bounds(column_bounds)
+        return derived
+
+    def _is_date_token(self, text: str) -> bool:
+        return self.date_re.match(text) is not None
+
+    def _is_amount_like(self, text: str) -> bool:
+        """
+        Un mot contenant des lettres ou des '/' (dates) est du libellé débordant, de même qu'un mot
+        trop long pour une partie de montant (RIB, identifiant). Les montants sont découpés en groupes
+        de chiffres séparés par des espaces (ex: "3 298 028").
+        """
+        return self.text_char_re.search(text) is None and len(self.non_digit_re.sub('', text)) < self.amount_max_digits
+
+    def parse_amount(self, text) -> float:
+        """Montant lu (groupes de chiffres concaténés) -> float. Non-texte retourné tel quel."""
+        if not isinstance(text, str): return text
+        if self.decimal_separator and self.decimal_separator in text:
+            entier, _, decimales = text.rpartition(self.decimal_separator)
+            entier, decimales = self.non_digit_re.sub('', entier), self.non_digit_re.sub('', decimales)
+            if not entier and not decimales: return 0.0
+            return float(f"{entier or 0}.{decimales or 0}")
+        c = self.non_digit_re.sub('', text)
+        if not c: return 0.0
+        return float(c)
+
+
+# -------------------------------------------------------------------------------------------------
+# REGISTRE DES PROFILS
+# -------------------------------------------------------------------------------------------------
+PROFILES = {}       # nom -> profil, dans l'ordre d'enregistrement
+_BY_ALIAS = {}
+_MARKERS = {}       # marqueur (minuscules) -> profil
+_MARKERS_RE = None  # Alternative unique sur les marqueurs de toutes les banques
+
+def register_profile(profile: BankProfile) -> BankProfile:
+    """Enregistre (ou remplace) un profil et recompile l'empreinte commune des marqueurs."""
+    global _MARKERS_RE
+    PROFILES[profile.name] = profile
+    for alias in profile.aliases:
+        _BY_ALIAS[alias] = profile
+    for marker in profile.markers:
+        _MARKERS[marker.lower()] = profile
+    _MARKERS_RE = re.compile("|".join(re.escape(m) for m in sorted(_MARKERS, key=len, reverse=True)), re.I) if _MARKERS else None
+    return profile
+
+def get_profile(name):
+    """Profil d'après un nom de banque ou un alias (insensible à la casse), None si inconnu."""
+    if isinstance(name, BankProfile): return name
+    if not name: return None
+    return _BY_ALIAS.get(str(name).strip().lower())
+
+def fingerprint_profile(first_page_text: str):
+    """Profil dont un marqueur apparaît sur la première page (premier marqueur rencontré), None sinon."""
+    if _MARKERS_RE is None or not first_page_text: return None
+    match = _MARKERS_RE.search(first_page_text)
+    return _MARKERS[match.group(0).lower()] if match else None
+
+def profile_for_task(name, column_bounds=None) -> BankProfile:
+    """Profil reconstruit dans un processus fils à partir de son nom et des bornes de colonnes du document."""
+    profile = get_profile(name) or DEFAULT_PROFILE
+    return profile.with_bounds(column_bounds) if column_bounds else profile
+
+def select_profile(first_page_text: str, bank_name=None) -> BankProfile:
+    """
+    Profil d'un relevé : empreinte de la première page d'abord, puis nom de banque indiqué.
+    Sans empreinte ni nom de banque, le profil par défaut est utilisé.
+    Lève ValueError si la banque indiquée n'a pas de profil et que la page n'en désigne aucun.
+    """
+    detected = fingerprint_profile(first_page_text)
+    hint = get_profile(bank_name)
+    if detected is not None:
+        if bank_name and hint is not detected:
+            print(f"⚠️ Banque indiquée : {bank_name}, relevé reconnu : {detected.name} (profil {detected.name} utilisé)")
+        return detected
+    if hint is not None:
+        return hint
+    if bank_name:
+        raise ValueError(f"Désolé, cette banque ({bank_name}) n'a pas encore été paramétrée.")
+    return DEFAULT_PROFILE
+
+
+# -------------------------------------------------------------------------------------------------
+# PROFILS
+# -------------------------------------------------------------------------------------------------
+# Orabank : bornes de colonnes estimées d'après l'analyse des relevés
+# Date < 90 | Libellé: 90 - 260 | Valeur: 260 - 350 | Débit: 350 - 430 | Crédit: 430 - 515 | Solde: > 515
+ORABANK = register_profile(BankProfile(
+    "Orabank",
+    markers=("www.orabank.net", "ORABANK"),
+    column_bounds={
+        "date_limit": 90,
+        "libelle_limit": 260,
+        "valeur_limit": 350,
+        "debit_limit": 430,
+        "credit_limit": 515
+    },
+    skip_patterns={
+        "Edité le": LINE_FOOTER, "www.orabank.net": LINE_FOOTER, "ORABANK": LINE_FOOTER, "Capital de": LINE_FOOTER, "RCCM": LINE_FOOTER, # Pied de page
+        "Veuillez noter que vous disposez": LINE_FOOTER, "Place de l'indépendance": LINE_FOOTER, "Tél. :": LINE_FOOTER, # Mentions légales
+    },
+))
+
+DEFAULT_PROFILE = ORABANK
+
+# Banque sans profil : lignes communes seulement, utilisable si les colonnes du relevé sont reconnues
+# (cf. layout_inference ; les bornes ci-dessous ne servent que de valeur par défaut)
+GENERIC = register_profile(BankProfile("Générique", column_bounds=ORABANK.column_bounds))
@@ -0,0 +1,230 @@
+import os
+import sys
+import time
+import json
+import argparse
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import config
+import _02_rapp as rapp
+from main import run_extraction_in_memory
+
+# =================================================================================================
+# RAPPROCHEMENTS EN LOT (SANS INTERFACE)
+# =================================================================================================
+# Exécute une série de rapprochements décrits dans un manifeste (CSV ou JSON), une ligne par
+# compte et par mois : relevé (PDF ou Excel), journal, état précédent (optionnel), date d'arrêté.
+# - Les comptes sont traités en parallèle (un processus par compte).
+# - Les mois d'un même compte sont enchaînés dans l'ordre des dates : les suspens restés ouverts
+#   sont reportés tels quels sur le mois suivant (sauf si le manifeste fournit un état précédent).
+# - Les rapports (Excel + PDF) sont écrits dans dossier_sortie/<compte>/, et un index récapitulatif
+#   (index.csv) est écrit à la racine du dossier de sortie.
+#
+# - --partitions N : rapprochement partitionné à mémoire bornée (journaux de plusieurs millions de
+#   lignes) ; le journal et le relevé Excel/CSV sont lus en flux au lieu d'être chargés entiers.
+#
+# Usage : python batch.py manifeste.csv [--sortie rapports_batch] [--workers 4] [--partitions 16]
+# Colonnes du manifeste : compte, releve, journal, date, etat_prec (optionnel), banque (optionnel)
+# =================================================================================================
+
+COLONNES_MANIFESTE = ['compte', 'releve', 'journal', 'date']
+COLONNES_INDEX = ['compte', 'date', 'statut', 'suspens_banque', 'suspens_compta', 'fichier_excel', 'fichier_pdf', 'duree', 'erreur']
+
+def charger_manifeste(chemin):
+    """
+    Lit le manifeste (CSV séparé par ';' ou ',' ou JSON : liste d'objets) et retourne la liste des tâches,
+    triées par compte puis par date. Les chemins relatifs sont résolus depuis le dossier du manifeste.
+    """
+    if chemin.lower().endswith('.json'):
+        with open(chemin, encoding='utf-8') as f:
+            df = pd.DataFrame(json.load(f))
+    else:
+        df = pd.read_csv(chemin, sep=None, engine='python', dtype=str, encoding='utf-8-sig')
+
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    manquantes = [c for c in COLONNES_MANIFESTE if c not in df.columns]
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes dans le manifeste : {', '.join(manquantes)}")
+
+    dates, _ = rapp.normaliser_dates(df['date'])
+    if dates.isna().any():
+        invalides = df.loc[dates.isna().to_numpy(), 'date'].tolist()
+        raise ValueError(f"Dates d'arrêté illisibles dans le manifeste : {invalides}")
+
+    base = os.path.dirname(os.path.abspath(chemin))
+    def resoudre(val):
+        if not isinstance(val, str) or not val.strip(): return None
+        return val.strip() if os.path.isabs(val.strip()) else os.path.join(base, val.strip())
+
+    taches = []
+    for i, row in enumerate(df.to_dict('records')):
+        banque = row.get('banque')
+        taches.append({
+            'compte': str(row['compte']).strip(),
+            'releve': resoudre(row['releve']),
+            'journal': resoudre(row['journal']),
+            'etat_prec': resoudre(row.get('etat_prec')),
+            'banque': banque.strip() if isinstance(banque, str) and banque.strip() else 'orabank',
+            'date': dates.iloc[i].date(),
+        })
+    taches.sort(key=lambda t: (t['compte'], t['date']))
+    return taches
+
+def charger_tableau(chemin, header=0):
+    """Charge un fichier Excel (.xls / .xlsx) ou CSV en DataFrame (mêmes règles que l'application)."""
+    ext = chemin.split('.')[-1].lower()
+    if ext == 'csv':
+        return pd.read_csv(chemin, header=header)
+    if ext == 'xls':
+        return pd.read_excel(chemin, engine='xlrd', header=header)
+    return pd.read_excel(chemin, engine='openpyxl', header=header)
+
+def charger_etat(chemin):
+    """État précédent brut (header=None) : feuille RAPPROCHEMENT si le classeur vient de l'outil, sinon première feuille."""
+    if chemin.lower().endswith(('.xlsx', '.xls')):
+        feuilles = pd.ExcelFile(chemin).sheet_names
+        if 'RAPPROCHEMENT' in feuilles:
+            return pd.read_excel(chemin, sheet_name='RAPPROCHEMENT', header=None)
+    return charger_tableau(chemin, header=None)
+
+def charger_releve(chemin, banque):
+    """Relevé PDF : extraction en mémoire (séquentielle, on est déjà dans un processus dédié). Sinon lecture du tableau."""
+    if chemin.lower().endswith('.pdf'):
+        with open(chemin, 'rb') as f:
+            df = run_extraction_in_memory(f.read(), bank_name=banque, source_name=os.path.basename(chemin), max_workers=1)
+        if df is None or df.empty:
+            raise RuntimeError(f"Aucune transaction extraite du relevé {chemin}")
+        return df
+    return charger_tableau(chemin)
+
+def nom_compte_sur(compte):
+    return "".join([c for c in compte if c.isalnum() or c in ('-', '_')]).strip() or "compte"
+
+def traiter_compte(taches, dossier_sortie, nb_partitions=None):
+    """
+    Traite les mois d'un compte dans l'ordre, en reportant l'état de chaque mois sur le suivant.
+    Retourne une ligne d'index par mois. Un mois en échec interrompt le report : les mois suivants
+    sans état précédent explicite sont marqués 'ignoré'. nb_partitions : mode partitionné (pointage exact).
+    """
+    lignes = []
+    suspens_report = None
+    chaine_rompue = False
+    dossier = os.path.join(dossier_sortie, nom_compte_sur(taches[0]['compte']))
+    os.makedirs(dossier, exist_ok=True)
+
+    for tache in taches:
+        ligne = {'compte': tache['compte'], 'date': tache['date'].strftime('%d/%m/%Y')}
+        debut = time.time()
+
+        if chaine_rompue and not tache['etat_prec']:
+            ligne.update({'statut': 'ignoré', 'erreur': "État du mois précédent indisponible (échec du mois précédent)"})
+            lignes.append(ligne)
+            continue
+
+        try:
+            # Un état précédent fourni par le manifeste est prioritaire sur le report du mois d'avant
+            etat_prec = charger_etat(tache['etat_prec']) if tache['etat_prec'] else None
+            suspens_prec = None if tache['etat_prec'] else suspens_report
+            if nb_partitions:
+                # Sources lues en flux par le rapprochement (seul un relevé PDF est extrait en mémoire)
+                releve = charger_releve(tache['releve'], tache['banque']) if tache['releve'].lower().endswith('.pdf') else tache['releve']
+                resultat = rapp.executer_rapprochement_partitionne(releve, tache['journal'], etat_prec, date_rapprochement=tache['date'],
+                                                                   suspens_prec=suspens_prec, nb_partitions=nb_partitions)
+            else:
+                df_releve = charger_releve(tache['releve'], tache['banque'])
+                df_journal = rapp.charger_journal(tache['journal'])
+                resultat = rapp.executer_rapprochement(df_releve, df_journal, etat_prec, date_rapprochement=tache['date'], suspens_prec=suspens_prec)
+
+            base_nom = f"Etat_Rapprochement_{nom_compte_sur(tache['compte'])}_{tache['date'].strftime('%Y%m%d')}"
+            fichier_excel = os.path.join(dossier, base_nom + '.xlsx')
+            with open(fichier_excel, 'wb') as f:
+                f.write(resultat.excel_bytes)
+            fichier_pdf = None
+            if resultat.pdf_bytes:
+                fichier_pdf = os.path.join(dossier, base_nom + '.pdf')
+                with open(fichier_pdf, 'wb') as f:
+                    f.write(resultat.pdf_bytes)
+
+            suspens_report = resultat.suspens_ouverts()
+            chaine_rompue = False
+            ligne.update({
+                'statut': 'ok',
+                'suspens_banque': resultat.stats.get('suspens_banque'),
+                'suspens_compta': resultat.stats.get('suspens_compta'),
+                'fichier_excel': fichier_excel,
+                'fichier_pdf': fichier_pdf,
+            })
+        except Exception as e:
+            print(f"❌ {tache['compte']} {ligne['date']} : {e}")
+            suspens_report = None
+            chaine_rompue = True
+            ligne.update({'statut': 'erreur', 'erreur': str(e)})
+
+        ligne['duree'] = round(time.time() - debut, 2)
+        lignes.append(ligne)
+    return lignes
+
+def executer_lot(taches, dossier_sortie=config.batch_output_dir, max_workers=None, nb_partitions=None):
+    """
+    Exécute toutes les tâches (un processus par compte, max_workers=1 : séquentiel dans ce processus)
+    et écrit l'index récapitulatif. Retourne l'index sous forme de DataFrame.
+    """
+    os.makedirs(dossier_sortie, exist_ok=True)
+    par_compte = {}
+    for tache in taches:
+        par_compte.setdefault(tache['compte'], []).append(tache)
+
+    start_time = time.time()
+    print(f"🚀 Rapprochements en lot : {len(taches)} mois, {len(par_compte)} comptes")
+
+    lignes = []
+    if max_workers == 1 or len(par_compte) == 1:
+        for chaine in par_compte.values():
+            lignes.extend(traiter_compte(chaine, dossier_sortie, nb_partitions))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(traiter_compte, chaine, dossier_sortie, nb_partitions): compte for compte, chaine in par_compte.items()}
+            for future in as_completed(futures):
+                compte = futures[future]
+                try:
+                    lignes.extend(future.result())
+                except Exception as e:
+                    print(f"❌ Compte {compte} : {e}")
+                    lignes.extend({'compte': compte, 'date': t['date'].strftime('%d/%m/%Y'), 'statut': 'erreur', 'erreur': str(e)}
+                                  for t in par_compte[compte])
+                print(f"✅ Compte {compte} terminé ({len(lignes)}/{len(taches)} mois)")
+
+    index = pd.DataFrame(lignes, columns=COLONNES_INDEX)
+    index['_tri'] = pd.to_datetime(index['date'], format='%d/%m/%Y')
+    index = index.sort_values(['compte', '_tri'], kind='mergesort').drop(columns=['_tri']).reset_index(drop=True)
+    chemin_index = os.path.join(dossier_sortie, 'index.csv')
+    index.to_csv(chemin_index, index=False, sep=';', encoding='utf-8-sig') # Point-virgule pour Excel FR
+
+    nb_ok = int((index['statut'] == 'ok').sum())
+    print(f"✨ Lot terminé en {time.time() - start_time:.1f} s : {nb_ok}/{len(index)} rapprochements réussis")
+    print(f"📄 Index : {chemin_index}")
+    return index
+
+def main():
+    parser = argparse.ArgumentParser(description="Rapprochements bancaires en lot à partir d'un manifeste (CSV ou JSON).")
+    parser.add_argument('manifeste', help="Fichier manifeste : compte, releve, journal, date, etat_prec (optionnel), banque (optionnel)")
+    parser.add_argument('--sortie', default=config.batch_output_dir, help="Dossier des rapports et de l'index")
+    parser.add_argument('--workers', type=int, default=None, help="Nombre de processus (défaut : nombre de CPU, 1 = séquentiel)")
+    parser.add_argument('--partitions', type=int, default=None,
+                        help=f"Rapprochement partitionné à mémoire bornée, pointage exact (ex : {config.rapp_partitions})")
+    args = parser.parse_args()
+
+    taches = charger_manifeste(args.manifeste)
+    index = executer_lot(taches, args.sortie, max_workers=args.workers, nb_partitions=args.partitions)
+    if (index['statut'] != 'ok').any():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n🛑 Interruption par l'utilisateur.")
+    except Exception as e:
+        print(f"\n❌ Une erreur inattendue est survenue : {e}")
+        sys.exit(1)
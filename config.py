@@ -1,4 +1,23 @@
 # ici ce sont mes variables par défaut quand je n'execute pas dans le streamlit
 input_dir = "ocr_split_pages"
 input_pdf = "relevé.pdf"
-output_dir = "extraction_files"
\ No newline at end of file
+output_dir = "extraction_files"
+
+# cache des relevés extraits (clé = empreinte du PDF)
+cache_dir = "extraction_cache"
+cache_max_bytes = 200 * 1024 * 1024 # budget commun aux relevés et aux pages en cache
+
+# dossier de sortie des rapprochements en lot (batch.py)
+batch_output_dir = "rapports_batch"
+
+# grand livre local des suspens ouverts (report d'un mois sur l'autre)
+ledger_path = "suspens_ledger/suspens.sqlite"
+
+# rapprochement partitionné (gros journaux) : nombre de partitions par montant et lignes lues par bloc
+rapp_partitions = 16
+rapp_chunk_rows = 50000
+
+# inférence des colonnes des relevés : pages analysées, lignes de tableau minimales, largeur minimale d'une gouttière (pt)
+layout_sample_pages = 3
+layout_min_rows = 5
+layout_min_gutter = 4.0
@@ -0,0 +1,115 @@
+"""
+Réparation des montants mal lus (OCR / découpage des colonnes).
+Un montant lu est comparé au montant attendu par la chaîne des soldes sur leurs chiffres :
+- chiffres collés (montant attendu précédé ou suivi de chiffres parasites, ex: colonne voisine),
+- distance d'édition bornée (Damerau-Levenshtein : chiffre en trop, manquant, mal lu ou inversé),
+  abandonnée dès que la borne est dépassée.
+Les verdicts (lu, attendu) sont mémorisés (LRU) : un relevé long répète souvent les mêmes montants.
+rank_corrections propose, pour une ligne incohérente, les corrections possibles du solde, du débit
+et du crédit, classées de la plus probable (moins de chiffres à changer) à la moins probable.
+"""
+
+from functools import lru_cache
+
+MAX_CACHE_VERDICTS = 65536
+
+# Ordre de préférence à coût égal (même ordre que les contrôles historiques)
+PRIORITE = {'solde': 0, 'spillover': 1, 'plausible': 2, 'colonne': 3}
+
+
+def digits(val) -> str:
+    """Chiffres de la partie entière d'un montant (signe compris)."""
+    return str(int(val))
+
+def max_edits(length: int) -> int:
+    """Nombre de chiffres à corriger toléré selon la longueur du montant attendu."""
+    if length < 4: return 0
+    if length < 14: return 1
+    return 2
+
+@lru_cache(maxsize=MAX_CACHE_VERDICTS)
+def digit_distance(a: str, b: str, bound: int) -> int:
+    """
+    Distance de Damerau-Levenshtein (transpositions adjacentes) entre deux chaînes de chiffres.
+    Plafonnée à bound + 1 : le calcul s'arrête dès qu'une ligne de la matrice dépasse la borne.
+    """
+    if abs(len(a) - len(b)) > bound: return bound + 1
+    if len(a) < len(b): a, b = b, a
+    avant, precedente = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        courante = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            v = min(precedente[j] + 1, courante[j - 1] + 1, precedente[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                v = min(v, avant[j - 2] + 1)
+            courante[j] = v
+        if min(courante) > bound: return bound + 1
+        avant, precedente = precedente, courante
+    return min(precedente[-1], bound + 1)
+
+@lru_cache(maxsize=MAX_CACHE_VERDICTS)
+def correction_verdict(read: str, expected: str):
+    """(plausible, coût) : le montant attendu est-il une correction crédible du montant lu ? coût = chiffres à changer."""
+    if read == expected: return True, 0
+    # Chiffres collés (ex: "29979725" -> "2979725" ou "32980282224" -> "329802822")
+    if len(read) > len(expected) and (read.startswith(expected) or read.endswith(expected)):
+        return True, len(read) - len(expected)
+    bound = max_edits(len(expected))
+    if len(read) == len(expected) + 1: bound = max(bound, 1) # Un chiffre parasite, quelle que soit la longueur
+    distance = digit_distance(read, expected, bound)
+    return distance <= bound, distance
+
+def is_plausible(read_val: float, expected_val: float) -> bool:
+    """Le montant attendu est une 'correction crédible' du montant lu (ne valide PAS une valeur totalement différente)."""
+    return correction_verdict(digits(read_val), digits(expected_val))[0]
+
+def _candidate(kind, read_val, expected_val, **values):
+    plausible, cost = correction_verdict(digits(read_val), digits(expected_val))
+    if not plausible: return None
+    return dict(values, type=kind, cost=cost)
+
+def chains(solde_prec: float, debit: float, credit: float, solde: float) -> bool:
+    """La ligne (débit, crédit, solde) s'enchaîne-t-elle avec le solde précédent (à 1 près) ?"""
+    return abs(solde_prec + credit - debit - solde) <= 1.0
+
+def rank_corrections(debit: float, credit: float, solde: float, solde_prec: float, libelle_amount=None, next_row=None) -> list:
+    """
+    Corrections possibles d'une ligne dont débit, crédit et solde ne s'enchaînent pas avec solde_prec,
+    de la plus probable à la moins probable. Chaque candidat donne le type de correction
+    ('solde', 'spillover' : montant resté dans le libellé, 'plausible' : montant mal lu,
+    'colonne' : montant dans la mauvaise colonne), le coût, et les nouvelles valeurs (solde / debit / credit).
+    libelle_amount : montant lu en tête du libellé (None si le libellé ne commence pas par un montant).
+    next_row : (débit, crédit, solde) lus sur la ligne suivante. À coût égal, on préfère la correction
+    dont le solde retenu s'enchaîne avec elle (ex: un chiffre mal lu dans le débit se corrige dans le
+    débit, pas en recalculant le solde, ce qui casserait la ligne suivante).
+    """
+    candidates = []
+
+    # Solde mal lu : le solde recalculé à partir des mouvements lus en est une version "propre"
+    solde_theo = solde_prec + credit - debit
+    if abs(solde - solde_theo) > 1.0:
+        candidates.append(_candidate('solde', solde, solde_theo, solde=solde_theo))
+
+    # Mouvement mal lu : la variation du solde lu donne le montant attendu et son sens
+    net = solde - solde_prec
+    if net > 0 and abs(credit - net) > 1.0:
+        if credit == 0 and libelle_amount == net:
+            candidates.append({'type': 'spillover', 'cost': 0, 'credit': net})
+        if credit > 0:
+            candidates.append(_candidate('plausible', credit, net, credit=net, debit=0.0))
+        if debit > 0:
+            candidates.append(_candidate('colonne', debit, net, credit=net, debit=0.0))
+    elif net < 0 and abs(debit - abs(net)) > 1.0:
+        if debit == 0 and libelle_amount == abs(net):
+            candidates.append({'type': 'spillover', 'cost': 0, 'debit': abs(net)})
+        if debit > 0:
+            candidates.append(_candidate('plausible', debit, abs(net), debit=abs(net), credit=0.0))
+        if credit > 0:
+            candidates.append(_candidate('colonne', credit, abs(net), debit=abs(net), credit=0.0))
+
+    candidates = [c for c in candidates if c is not None]
+    def casse_suivante(c):
+        if next_row is None: return False
+        return not chains(c.get('solde', solde), *next_row)
+    candidates.sort(key=lambda c: (c['cost'], casse_suivante(c), PRIORITE[c['type']]))
+    return candidates
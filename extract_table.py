@@ -1,14 +1,23 @@
 """
-Script d'extraction des transactions bancaires sur le relevé Orabank à partir d'un PDF.
+Script d'extraction des transactions bancaires à partir d'un relevé PDF.
 Utilise PyMuPDF (fitz) et l'analyse de layout (coordonnées) pour une extraction précise.
+La mise en page propre à chaque banque (colonnes, lignes à ignorer, dates, montants) est décrite
+par son profil (cf. bank_profiles.py), choisi sur l'empreinte de la première page du relevé.
 """
 
 import pandas as pd
+import numpy as np
 import re
 import os
 import shutil
-import difflib
+import hashlib
 import config
+import digit_repair
+import bank_profiles
+import layout_inference
+from bank_profiles import LINE_HEADER, LINE_FOOTER, LINE_TOTAL
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 
 try:
@@ -16,22 +25,9 @@ try:
 except ImportError:
     fitz = None
 
-# Définition des bornes de colonnes (estimées d'après l'analyse)
-# Date < 90
-# Libellé: 90 - 280
-# Valeur: 280 - 350
-# Débit: 350 - 430
-# Crédit: 430 - 515
-# Solde: > 515
-
-
-COLUMN_BOUNDS = {
-    "date_limit": 90,
-    "libelle_limit": 260, 
-    "valeur_limit": 350,
-    "debit_limit": 430,
-    "credit_limit": 515
-}
+# Version de l'extracteur : à incrémenter à chaque changement du résultat de l'extraction
+# (elle fait partie de la clé du cache des relevés, cf. extraction_cache.py)
+EXTRACTOR_VERSION = "3"
 
 def clean_amount(text: str) -> float:
     """Nettoie une chaîne de montant et la convertit en float."""
@@ -45,15 +41,25 @@ def clean_amount(text: str) -> float:
     except ValueError:
         return 0.0
 
-def extract_transactions_from_pdf(pdf_path: str) -> pd.DataFrame:
+def extract_transactions_from_pdf(pdf_path: str, opening: dict = None, profile=None, bank_name=None) -> pd.DataFrame:
     """
     Extrait les transactions en utilisant les coordonnées des mots.
+    opening : reçoit le solde précédent lu sur la première page (cf. parse_page_words) et le profil retenu ('profile').
+    profile : profil de mise en page (None : choisi sur la première page du fichier, bank_name si elle n'est pas reconnue).
     """
     if not fitz:
         raise ImportError("Le module 'PyMuPDF' n'est pas installé. pip install PyMuPDF")
 
     print(f"📄 Analyse précise (layout) du fichier PDF: {pdf_path}")
     doc = fitz.open(pdf_path)
+    if profile is None:
+        try:
+            profile = profile_for_document(doc, bank_name)
+        except ValueError:
+            doc.close()
+            raise
+    if opening is not None:
+        opening['profile'] = profile
     
     transactions = []
     
@@ -64,188 +70,231 @@ def extract_transactions_from_pdf(pdf_path: str) -> pd.DataFrame:
         words = page.get_text("words")
         if not words:
             continue
+        current_tx = parse_page_words(words, transactions, current_tx, opening if page_num == 0 else None, profile)
 
-        # Reconstruire les lignes en se basant sur la coordonnée verticale (y)
-        # Ceci est plus robuste que de se fier aux numéros de ligne/bloc de PyMuPDF
-        lines = {}
-        for w in words:
-            # Regrouper les mots par leur coordonnée y1 (partie entière)
-            y1 = int(w[3]) 
-            if y1 not in lines:
-                lines[y1] = []
-            lines[y1].append(w)
+    # Add last
+    if current_tx:
+        transactions.append(current_tx)
         
-        # Trier les lignes par leur position verticale
-        sorted_lines = sorted(lines.items())
+    doc.close()
+    
+    return build_transactions_dataframe(transactions)
 
-        for y, line_words in sorted_lines:
-            line_words.sort(key=lambda x: x[0]) # Trier les mots par leur position x
-            
-            if not line_words:
-                continue
-            
-            # --- TRONCATURE DES TOTAUX FUSIONNÉS ---
-            # Si "Total général" est détecté, on coupe la ligne à cet endroit
-            # pour ne garder que la transaction qui précède.
-            trunc_index = -1
-            matches_total_footer = False
-            
-            for i, w in enumerate(line_words):
-                # Check simple "Total" (insensible à la casse)
-                if "total" in w[4].lower():
-                    # Vérifier le contexte
-                    snippet = "".join([wx[4] for wx in line_words[i:i+8]]).replace(" ", "").lower()
-                    
-
-
-                    # Normalisation stricte pour détection
-                    clean_snippet = snippet.replace("é", "e").replace("è", "e")
-                    
-                    if ("totalgeneral" in clean_snippet or 
-                        "totalmouvements" in clean_snippet or 
-                        "totaldesmouvements" in clean_snippet or 
-                        "totaldeb" in clean_snippet or
-                        "totalcred" in clean_snippet):
-                         trunc_index = i
-                         matches_total_footer = True
-                         break
-                    
-                    # Check direct variations in the word itself or next word
-                    if "totalgénéral" in w[4].replace(" ", "").lower():
-
-                         trunc_index = i
-                         matches_total_footer = True
-                         break
-            
-            if trunc_index != -1:
-                line_words = line_words[:trunc_index]
+#-------------------------------------------------------------------------------------------------
+# Choix du profil de mise en page (empreinte de la première page, cf. bank_profiles)
+# et des bornes de colonnes du document (déduites de ses premières pages, cf. layout_inference)
+#-------------------------------------------------------------------------------------------------
+def profile_for_document(doc, bank_name=None):
+    """
+    Profil d'un document déjà ouvert : marqueurs de sa première page, sinon nom de banque indiqué,
+    avec les bornes de colonnes déduites des premières pages (bornes du profil si le tableau n'est pas reconnu).
+    Une banque sans profil passe par le profil générique si les colonnes de son relevé sont reconnues.
+    """
+    pages = [doc[i].get_text("words") for i in range(min(doc.page_count, config.layout_sample_pages))]
+    try:
+        profile = bank_profiles.select_profile(" ".join(w[4] for w in pages[0]) if pages else "", bank_name)
+    except ValueError as e:
+        profile, erreur = bank_profiles.GENERIC, e
+    else:
+        erreur = None
+
+    bounds = layout_inference.infer_column_bounds(pages, profile)
+    if bounds is None:
+        if erreur is not None:
+            raise erreur
+        print(f"🏦 Profil de mise en page : {profile.name} (colonnes du profil)")
+        return profile
+    print(f"🏦 Profil de mise en page : {profile.name} (colonnes du relevé : {' | '.join(f'{b:.0f}' for b in bounds.values())})")
+    return profile.with_bounds(bounds)
+
+def detect_profile(pdf, bank_name=None):
+    """
+    Profil d'un relevé (chemin, octets du PDF ou document fitz déjà ouvert), lu sur ses premières pages.
+    Un document déjà ouvert est laissé ouvert ; les extractions choisissent leur profil sur leur propre
+    document (paramètre bank_name), sans passer par ici.
+    Lève ValueError si la banque indiquée n'est pas paramétrée et que le relevé n'est pas reconnu.
+    """
+    if not fitz:
+        raise ImportError("Le module 'PyMuPDF' n'est pas installé. pip install PyMuPDF")
+    if isinstance(pdf, fitz.Document):
+        return profile_for_document(pdf, bank_name)
+    doc = fitz.open(stream=pdf, filetype="pdf") if isinstance(pdf, (bytes, bytearray)) else fitz.open(pdf)
+    try:
+        return profile_for_document(doc, bank_name)
+    finally:
+        doc.close()
 
-                
-                # Si c'était un footer "Total", on doit clôre la transaction courante
-                # car les lignes suivantes risquent d'être les montants de ce total
-                if matches_total_footer:
-                    # Cas 1: La ligne ne contenait QUE le total (donc line_words est vide maintenant)
-                    # On ferme tout de suite.
-                    if not line_words:
-                        if current_tx:
-                            transactions.append(current_tx)
-                            current_tx = {}
-                        continue # On passe la ligne
-                
-                if not line_words: continue # Si la ligne ne contenait que le total (cas non total_general aussi), on passe
-            
-            # Filter Header/Footer based on content
+#-------------------------------------------------------------------------------------------------
+# Classification des lignes (motifs du profil, compilés une seule fois à l'import)
+#-------------------------------------------------------------------------------------------------
+# LINE_HEADER, LINE_FOOTER, LINE_TOTAL : lignes ignorées (cf. bank_profiles)
+LINE_NEW_TX = "new_transaction" # Date en première colonne
+LINE_CONTINUATION = "continuation"
+
+TOTAL_WORD_RE = re.compile(r"total", re.I)
+
+def _find_total_footer(line_words, profile) -> int:
+    """Index du mot qui ouvre un total ("Total général", "Total des mouvements"...), -1 sinon."""
+    for i, w in enumerate(line_words):
+        # Check simple "Total" (insensible à la casse)
+        if TOTAL_WORD_RE.search(w[4]):
+            # Vérifier le contexte (normalisation stricte pour détection)
+            snippet = "".join([wx[4] for wx in line_words[i:i+8]]).replace(" ", "").lower()
+            clean_snippet = snippet.replace("é", "e").replace("è", "e")
+            if profile.total_footer_re.search(clean_snippet):
+                return i
+    return -1
+
+def classify_line(line_words, profile=None):
+    """
+    Détermine le type d'une ligne reconstruite (mots triés par x), selon le profil de la banque.
+    Retourne (type, mots conservés, fermer_apres) : si un total est fusionné en fin de ligne,
+    les mots sont tronqués et fermer_apres indique qu'il faut clore la transaction après la ligne.
+    """
+    profile = profile or bank_profiles.DEFAULT_PROFILE
+    full_line_text = " ".join([w[4] for w in line_words])
+    closes_after = False
+
+    # --- TRONCATURE DES TOTAUX FUSIONNÉS ---
+    # Si "Total général" est détecté, on coupe la ligne à cet endroit
+    # pour ne garder que la transaction qui précède.
+    if TOTAL_WORD_RE.search(full_line_text):
+        trunc_index = _find_total_footer(line_words, profile)
+        if trunc_index != -1:
+            line_words = line_words[:trunc_index]
+            # La ligne ne contenait QUE le total : on ferme tout de suite.
+            if not line_words:
+                return LINE_TOTAL, line_words, False
+            closes_after = True
             full_line_text = " ".join([w[4] for w in line_words])
-            
-            # Suppression des lignes inutiles (En-têtes, Pieds de page, Mentions légales)
-            ignore_patterns = [
-                "Date", "Libellé", "Valeur", "Débit", "Crédit", "Solde", # En-tête tableau
-                "Solde précédent", # Ligne de solde initial
-                "Page", "Edité le", "www.orabank.net", "ORABANK", "Capital de", "RCCM", # Pied de page
-                "Veuillez noter que vous disposez", "Place de l'indépendance", "Tél. :", # Mentions légales
-                "Total général", "Total des mouvements", # Totaux
-                "RELEVE D'IDENTITE BANCAIRE", "EXTRAIT DE COMPTE" # En-têtes parasites
-            ]
-            
-            should_skip = False
-            for pattern in ignore_patterns:
-                if pattern in full_line_text:
-                    if pattern == "Date" and not ("Date" in full_line_text and "Libellé" in full_line_text):
-                        # Attention à ne pas filtrer une ligne qui contiendrait juste le mot "Date" par hasard dans le libellé ?
-                        # Mais ici on filtre l'en-tête, qui contient "Date" ET "Libellé"
-                         pass
-                    elif pattern == "Page":
-                         if "/" in full_line_text: should_skip = True
-                    else:
-                        should_skip = True
-            
-            # Raffinement pour l'en-tête exact
-            if "Date" in full_line_text and "Libellé" in full_line_text:
-                should_skip = True
-                
-            if should_skip:
-                continue
 
-            first_word_x = line_words[0][0]
-            first_word_text = line_words[0][4]
-            
-            # Check for New Transaction (Date in first column)
-            if first_word_x < COLUMN_BOUNDS["date_limit"] and re.match(r"^\d{1,2}/\d{1,2}/\d{2,4}$", first_word_text):
-                # Save previous
-                if current_tx:
-                    transactions.append(current_tx)
-                
-                # New Tx
-                current_tx = {
-                    "Date": "",
-                    "Date Valeur": "",
-                    "Libellé": "",
-                    "Débit": "",
-                    "Crédit": "",
-                    "Solde": ""
-                }
-            
-            # Si pas de transaction active, on ignore (ex: texte avant le tableau)
-            if not current_tx:
-                continue
+    # Filter Header/Footer based on content
+    match = profile.skip_re.search(full_line_text)
+    if match:
+        return profile.skip_patterns[match.group(0)], line_words, False
+    if "Page" in full_line_text and "/" in full_line_text:
+        return LINE_FOOTER, line_words, False
 
-            # Distribute words to columns
-            for w in line_words:
-                x, text = w[0], w[4]
-                
+    # Check for New Transaction (Date in first column)
+    first_word = line_words[0]
+    if first_word[0] < profile.date_limit and profile.is_date_token(first_word[4]):
+        return LINE_NEW_TX, line_words, closes_after
+    return LINE_CONTINUATION, line_words, closes_after
 
-                if x < COLUMN_BOUNDS["date_limit"]:
+# Ordre des colonnes tel que renvoyé par np.digitize sur les bornes du profil (cf. bank_profiles.COLUMN_KEYS)
+COL_DATE, COL_LIBELLE, COL_VALEUR, COL_DEBIT, COL_CREDIT, COL_SOLDE = range(6)
+AMOUNT_COLUMNS = {COL_DEBIT: "Débit", COL_CREDIT: "Crédit", COL_SOLDE: "Solde"}
 
-                    if not current_tx["Date"]:
-                         current_tx["Date"] = text
+def layout_page_words(words, edges: np.ndarray = None):
+    """
+    Place les mots d'une page dans la grille (lignes, colonnes) en une passe vectorisée.
+    Retourne (mots triés par ligne puis x, colonne de chaque mot, indices de début/fin de chaque ligne).
+    """
+    if edges is None:
+        edges = bank_profiles.DEFAULT_PROFILE.edges
+    n = len(words)
+    x0 = np.fromiter((w[0] for w in words), dtype=float, count=n)
+    # Regrouper les mots par leur coordonnée y1 (partie entière)
+    y1 = np.fromiter((w[3] for w in words), dtype=float, count=n).astype(np.int64)
+
+    # Tri stable : ligne (y1) puis position x
+    order = np.lexsort((x0, y1))
+    sorted_words = [words[i] for i in order]
+    columns = np.digitize(x0[order], edges).tolist()
+
+    _, starts = np.unique(y1[order], return_index=True)
+    line_bounds = np.append(starts, n).tolist()
+    return sorted_words, columns, line_bounds
+
+def parse_page_words(words, transactions: list, current_tx: dict, opening: dict = None, profile=None) -> dict:
+    """
+    Analyse les mots d'une page (sortie de page.get_text("words")) et alimente la liste des transactions.
+    La transaction en cours (current_tx) est transmise d'une page à l'autre : elle est retournée
+    pour que l'appelant la repasse à la page suivante.
+    opening : si fourni (première page), reçoit le solde de la ligne "Solde précédent" sous la clé
+    'solde_precedent', relevé au passage (la ligne est de toute façon écartée comme en-tête).
+    profile : profil de mise en page de la banque (None : profil par défaut).
+    """
+    profile = profile or bank_profiles.DEFAULT_PROFILE
+    # Reconstruire les lignes en se basant sur la coordonnée verticale (y)
+    # Ceci est plus robuste que de se fier aux numéros de ligne/bloc de PyMuPDF
+    sorted_words, columns, line_bounds = layout_page_words(words, profile.edges)
 
-                    
-                elif x < COLUMN_BOUNDS["libelle_limit"]:
-                    current_tx["Libellé"] += text + " "
-                
-                elif x < COLUMN_BOUNDS["valeur_limit"]:
-                    # Date Valeur - keep as is, usually dates
-                    current_tx["Date Valeur"] += text
-                    
-                else:
-                    # Débit (350-430), Crédit (430-515), Solde (>515)
-                    # Heuristic: If the word contains letters or slashes (dates), it's likely a Libellé spillover.
-                    # Also check length: A single word representing an amount part shouldn't be excessively long (e.g. RIB/ID).
-                    # Valid amounts in this PDF are space-separated (e.g. "3 298 028"), so words are length 1-3.
-                    # We allow up to 6 to support "100000" but reject "0110124" (7 digits) or RIB (11+).
-                    
-                    cleaned_digits = re.sub(r'[^\d]', '', text)
-                    is_amount_like = (
-                        not re.search(r'[a-zA-Z/]', text) and 
-                        len(cleaned_digits) < 10
-                    )
-                    
-                    target_col = ""
-                    if x < COLUMN_BOUNDS["debit_limit"]:
-                        target_col = "Débit"
-                    elif x < COLUMN_BOUNDS["credit_limit"]:
-                        target_col = "Crédit"
-                    else:
-                        target_col = "Solde"
-                    
-                    if is_amount_like:
-                        current_tx[target_col] += text
-                    else:
-                        # It's spillover text, put it back in Libellé
-                        current_tx["Libellé"] += text + " "
+    for start, end in zip(line_bounds[:-1], line_bounds[1:]):
+        line_words = sorted_words[start:end]
+        
+        if not line_words:
+            continue
+
+        if opening is not None and 'solde_precedent' not in opening:
+            label = next((w for w in line_words if profile.solde_label in w[4]), None)
+            if label is not None:
+                opening['solde_precedent'] = solde_precedent_from_words(words, label[1], profile)
+
+        kind, line_words, closes_after = classify_line(line_words, profile)
+
+        if kind == LINE_TOTAL and not line_words:
+            # Footer "Total" seul : on clôt la transaction courante
+            # car les lignes suivantes risquent d'être les montants de ce total
+            if current_tx:
+                transactions.append(current_tx)
+                current_tx = {}
+            continue
+
+        if kind in (LINE_HEADER, LINE_FOOTER, LINE_TOTAL):
+            continue
+
+        if kind == LINE_NEW_TX:
+            # Save previous
+            if current_tx:
+                transactions.append(current_tx)
             
-            # Si c'était la ligne de total (cas mixte), on ferme la transaction maintenant
-            if matches_total_footer:
-                if current_tx:
-                    transactions.append(current_tx)
-                    current_tx = {}
+            # New Tx
+            current_tx = {
+                "Date": "",
+                "Date Valeur": "",
+                "Libellé": "",
+                "Débit": "",
+                "Crédit": "",
+                "Solde": ""
+            }
+        
+        # Si pas de transaction active, on ignore (ex: texte avant le tableau)
+        if not current_tx:
+            continue
 
-    # Add last
-    if current_tx:
-        transactions.append(current_tx)
+        # Distribute words to columns (colonnes déjà calculées par layout_page_words)
+        for w, col in zip(line_words, columns[start:end]):
+            text = w[4]
+
+            if col == COL_DATE:
+                if not current_tx["Date"]:
+                     current_tx["Date"] = text
+                
+            elif col == COL_LIBELLE:
+                current_tx["Libellé"] += text + " "
+            
+            elif col == COL_VALEUR:
+                # Date Valeur - keep as is, usually dates
+                current_tx["Date Valeur"] += text
+                
+            elif profile.is_amount_like(text):
+                # Débit (350-430), Crédit (430-515), Solde (>515)
+                current_tx[AMOUNT_COLUMNS[col]] += text
+            else:
+                # It's spillover text, put it back in Libellé
+                current_tx["Libellé"] += text + " "
         
-    doc.close()
-    
+        # Si c'était la ligne de total (cas mixte), on ferme la transaction maintenant
+        if closes_after:
+            if current_tx:
+                transactions.append(current_tx)
+                current_tx = {}
+
+    return current_tx
+
+def build_transactions_dataframe(transactions: list) -> pd.DataFrame:
+    """Construit le DataFrame brut (colonnes normalisées) à partir des transactions extraites."""
     if not transactions:
         return pd.DataFrame()
         
@@ -267,84 +316,72 @@ def extract_transactions_from_pdf(pdf_path: str) -> pd.DataFrame:
     
     return df
 
-def get_solde_precedent(pdf_path: str) -> float:
-    """Extrait le solde précédent en utilisant les coordonnées (plus sûr)."""
-    if not fitz: return 0.0
-    
-    try:
-        doc = fitz.open(pdf_path)
-        # On ne regarde que la première page généralement pour le solde précédent
-        page = doc[0] 
-        words = page.get_text("words")
-        doc.close()
-        
-        # Trouver la ligne "Solde précédent"
-        # On cherche les mots "Solde" et "précédent" qui sont proches
-        solde_label_y = -1
-        
+def solde_precedent_from_words(words, solde_label_y: float = -1, profile=None) -> float:
+    """
+    Recherche le montant de la ligne "Solde précédent" dans les mots d'une page déjà lue.
+    solde_label_y : position (y0) du libellé si elle est déjà connue (cf. parse_page_words).
+    """
+    profile = profile or bank_profiles.DEFAULT_PROFILE
+    # Trouver la ligne "Solde précédent"
+    # On cherche les mots "Solde" et "précédent" qui sont proches
+    if solde_label_y == -1:
         for w in words:
-            if "précédent" in w[4] and solde_label_y == -1:
+            if profile.solde_label in w[4]:
                 # Vérifier si "Solde" est juste avant ou sur la même ligne
                 # Pour simplifier, on suppose que si on trouve "précédent" isolé ou "Solde précédent", c'est bon.
                 # Dans le debug, "Solde" (187) et "précédent" (216) sont sur la même "line" (item 94, 95).
                 solde_label_y = w[1] # y0 coord
                 break
+    
+    if solde_label_y != -1:
+        # Chercher des montants sur la même ligne (avec une marge d'erreur Y)
+        # Le montant est normalement dans la colonne Solde
+        montant_parts = []
         
-        if solde_label_y != -1:
-            # Chercher des montants sur la même ligne (avec une marge d'erreur Y)
-            # Le montant est normalement dans la colonne Solde (> 515)
-            montant_parts = []
-            
-            for w in words:
-                # Marge d'erreur de +/- 5 pixels sur Y
-                if abs(w[1] - solde_label_y) < 5:
-                    text = w[4]
-                    x = w[0]
-                    
-                    # On veut les chiffres qui sont à droite du label (disons > 300)
-                    if x > 300 and re.match(r'^[\d.,]+$', text):
-                         montant_parts.append(text)
-            
-            if montant_parts:
-                full_str = "".join(montant_parts)
-                # Nettoyer
-                try:
-                    return float(full_str.replace('.', '').replace(',', ''))
-                except:
-                    # Retry light clean
-                     return float(re.sub(r'[^\d]', '', full_str))
-                     
-    except Exception as e:
-        print(f"⚠️ Erreur extraction solde précédent: {e}")
+        for w in words:
+            # Marge d'erreur de +/- 5 pixels sur Y
+            if abs(w[1] - solde_label_y) < 5:
+                text = w[4]
+                x = w[0]
+                
+                # On veut les chiffres qui sont à droite du label (x > solde_min_x du profil)
+                if x > profile.solde_min_x and re.match(r'^[\d.,]+$', text):
+                     montant_parts.append(text)
         
+        if montant_parts:
+            full_str = "".join(montant_parts)
+            # Nettoyer
+            try:
+                return float(full_str.replace('.', '').replace(',', ''))
+            except:
+                # Retry light clean
+                 return float(re.sub(r'[^\d]', '', full_str))
+                 
     return 0.0
 
 
-def clean_and_format_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-    """Nettoie et formate le DataFrame (Adapté)."""
+def clean_and_format_dataframe(df: pd.DataFrame, profile=None) -> pd.DataFrame:
+    """Nettoie et formate le DataFrame (grammaire des montants et formats de date du profil)."""
+    profile = profile or bank_profiles.DEFAULT_PROFILE
     
     # Nettoyage des montants
     for col in ['debit', 'credit', 'solde']:
         if col in df.columns:
-            # Fonction locale de nettoyage
-            def clean_val(x):
-                if not isinstance(x, str): return x
-                # Garder chiffres
-                c = re.sub(r'[^\d]', '', x)
-                if not c: return 0.0
-                return float(c)
-            
-            df[col] = df[col].apply(clean_val)
+            df[col] = df[col].apply(profile.parse_amount)
     
-    # Dates
+    # Dates : formats du profil, dans l'ordre (le suivant ne complète que les dates non reconnues)
     for col in ['date', 'date_valeur']:
         if col in df.columns:
-            df[col] = pd.to_datetime(df[col], format='%d/%m/%Y', errors='coerce').dt.date
+            dates = pd.to_datetime(df[col], format=profile.date_formats[0], errors='coerce')
+            for fmt in profile.date_formats[1:]:
+                dates = dates.fillna(pd.to_datetime(df[col], format=fmt, errors='coerce'))
+            df[col] = dates.dt.date
 
     # Filtrer les lignes vides (si date invalide)
     if 'date' in df.columns:
         df = df.dropna(subset=['date'])
-        df = df.sort_values('date').reset_index(drop=True)
+        # Tri stable : les opérations d'une même date gardent l'ordre du relevé (enchaînement des soldes)
+        df = df.sort_values('date', kind='mergesort').reset_index(drop=True)
         
     return df
 
@@ -356,144 +393,79 @@ def check_and_correct_balances(df: pd.DataFrame, start_solde: float) -> pd.DataF
     if df.empty or 'solde' not in df.columns:
         return df
 
-    # Le solde calculé précédent (n-1) commence au solde initial
-    solde_precedent_calcule = start_solde
     corrected_count = 0
     
     print(f"\n🔧 Vérification et correction des soldes (Départ: {start_solde:,.0f})")
 
-    def is_plausible(original_val: float, suggested_val: float) -> bool:
-        """
-        Vérifie si la valeur suggérée est une 'correction crédible' de la valeur originale
-        (ex: erreur OCR, chiffre en trop, faute de frappe).
-        Ne valide PAS une valeur totalement différente.
-        """
-        s_orig = str(int(original_val))
-        s_sugg = str(int(suggested_val))
-        
-
-
-        # 1. Identité (pas de changement)
-        if s_orig == s_sugg: return True
-        
-        # 2. Spillover / Préfixe en trop (ex: "29979725" -> "2979725")
-        # ou Suffixe en trop (ex: "32980282224" -> "329802822")
-        # Si le suggéré est contenu dans l'original
-        if (s_orig.endswith(s_sugg) or s_orig.startswith(s_sugg)) and len(s_orig) > len(s_sugg):
-            return True
-        
-        # 3. Fuzzy match (Insertion d'un chiffre parasite au milieu ex: 29979 vs 2979)
-        # Ratio de similitude > 0.85
-        ratio = difflib.SequenceMatcher(None, s_orig, s_sugg).ratio()
-        if ratio > 0.85:
-            return True
-            
-        # 4. Un chiffre en trop (Noise) n'importe où
-        # Si en retirant 1 char de s_orig on tombe sur s_sugg
-        if len(s_orig) == len(s_sugg) + 1:
-            for k in range(len(s_orig)):
-                temp = s_orig[:k] + s_orig[k+1:]
-                if temp == s_sugg:
-                    return True
-        
-        return False
-
-    for i, row in df.iterrows():
-        # 1. Récupération des données lues
-        solde_lu_n = row.get('solde', 0.0)
-        debit_lu_n = row.get('debit', 0.0)
-        credit_lu_n = row.get('credit', 0.0)
-        
-        # 0. Pré-vérification du Solde Lu
-        # Si le Solde Lu est corrompu (ex: "3298...24" au lieu de "3298..."), on le corrige d'abord
-        # en se basant sur le Solde Précédent + Mouvements Lus (si ceux-ci semblent corrects/petits par rapport à la corruption)
-        solde_theo_transactions = solde_precedent_calcule + credit_lu_n - debit_lu_n
-        
-        if abs(solde_lu_n - solde_theo_transactions) > 1.0:
-             # Si le solde théorique (calculé) est une version "propre" du solde lu
-             if is_plausible(solde_lu_n, solde_theo_transactions):
-                 print(f"  ✅ Correction Solde Ligne {i+1}: {solde_lu_n:,.0f} -> {solde_theo_transactions:,.0f}")
-                 df.at[i, 'solde'] = solde_theo_transactions
-                 solde_lu_n = solde_theo_transactions # Mise à jour locale pour la suite
-        
-        # 2. Calcul du mouvement théorique (Net)
-        # Net = Solde(n) - Solde(n-1)
-        # Si positif => Crédit. Si négatif => Débit.
-        mouvement_net_theorique = solde_lu_n - solde_precedent_calcule
-        
-        applied_correction = False
-        
-        # Cas A: On s'attend à un CRÉDIT (Solde augmente)
-        if mouvement_net_theorique > 0:
-            theorique_credit = mouvement_net_theorique
-            
-            # Si on a extrait un débit par erreur, ou un crédit faux
-            if abs(credit_lu_n - theorique_credit) > 1.0:
-                 libelle_val = str(row.get('libelle', '')).strip()
-                 first_word = libelle_val.split(' ')[0] if ' ' in libelle_val else libelle_val
-                 
-                 # Scénario 0: Le montant est dans le Libellé (spillover gauche)
-                 # Ex: Libellé = "2812950 ESPECE..." et Credit = 0
-                 if credit_lu_n == 0 and clean_amount(first_word) == theorique_credit:
-                     print(f"  ✅ Correction Spillover Ligne {i+1} (Libellé->Crédit): {first_word} -> {theorique_credit:,.0f}")
-                     df.at[i, 'credit'] = theorique_credit
-                     # Nettoyer le libellé
-                     new_lib = libelle_val[len(first_word):].strip()
-                     df.at[i, 'libelle'] = new_lib
-                     applied_correction = True
-                 
-                 # Scénario 1 : Le montant est dans Crédit mais mal lu (ex: 29M vs 2M)
-                 elif credit_lu_n > 0 and is_plausible(credit_lu_n, theorique_credit):
-                     print(f"  ✅ Correction Plausible Ligne {i+1} (Crédit): {credit_lu_n:,.0f} -> {theorique_credit:,.0f}")
-                     df.at[i, 'credit'] = theorique_credit
-                     df.at[i, 'debit'] = 0.0
-                     applied_correction = True
-                 
-                 # Scénario 2 : Le montant a été mis dans Débit par erreur ? (Peu probable ici mais possible)
-                 elif debit_lu_n > 0 and is_plausible(debit_lu_n, theorique_credit):
-                     print(f"  ✅ Correction Colonne Ligne {i+1} (Débit->Crédit): {debit_lu_n:,.0f} -> {theorique_credit:,.0f}")
-                     df.at[i, 'credit'] = theorique_credit
-                     df.at[i, 'debit'] = 0.0
-                     applied_correction = True
-        
-        # Cas B: On s'attend à un DÉBIT (Solde diminue)     
-        elif mouvement_net_theorique < 0:
-            theorique_debit = abs(mouvement_net_theorique)
-            
-            if abs(debit_lu_n - theorique_debit) > 1.0:
-                 libelle_val = str(row.get('libelle', '')).strip()
-                 first_word = libelle_val.split(' ')[0] if ' ' in libelle_val else libelle_val
-                 
-                 # Scénario 0: Spillover Libellé
-                 if debit_lu_n == 0 and clean_amount(first_word) == theorique_debit:
-                     print(f"  ✅ Correction Spillover Ligne {i+1} (Libellé->Débit): {first_word} -> {theorique_debit:,.0f}")
-                     df.at[i, 'debit'] = theorique_debit
-                     # Nettoyer libellé
-                     new_lib = libelle_val[len(first_word):].strip()
-                     df.at[i, 'libelle'] = new_lib
-                     applied_correction = True
-
-                 elif debit_lu_n > 0 and is_plausible(debit_lu_n, theorique_debit):
-                     print(f"  ✅ Correction Plausible Ligne {i+1} (Débit): {debit_lu_n:,.0f} -> {theorique_debit:,.0f}")
-                     df.at[i, 'debit'] = theorique_debit
-                     df.at[i, 'credit'] = 0.0
-                     applied_correction = True
-                      
-                 elif credit_lu_n > 0 and is_plausible(credit_lu_n, theorique_debit):
-                     print(f"  ✅ Correction Colonne Ligne {i+1} (Crédit->Débit): {credit_lu_n:,.0f} -> {theorique_debit:,.0f}")
-                     df.at[i, 'debit'] = theorique_debit
-                     df.at[i, 'credit'] = 0.0
-                     applied_correction = True
-        
+    def corriger_ligne(pos, solde_precedent_calcule):
+        """Correction d'une ligne signalée. Retourne (solde retenu pour la ligne suivante, correction de mouvement appliquée)."""
+        i = df.index[pos]
+        solde_lu_n, debit_lu_n, credit_lu_n = soldes[pos], debits[pos], credits[pos]
+
+        libelle_val = str(df.at[i, 'libelle'] if 'libelle' in df.columns else '').strip()
+        first_word = libelle_val.split(' ')[0] if ' ' in libelle_val else libelle_val
+
+        # Candidats (solde, débit, crédit) classés par nombre de chiffres à corriger : on applique le meilleur
+        suivante = (debits[pos + 1], credits[pos + 1], soldes[pos + 1]) if pos + 1 < len(df) else None
+        candidats = digit_repair.rank_corrections(debit_lu_n, credit_lu_n, solde_lu_n, solde_precedent_calcule, clean_amount(first_word), suivante)
+        if not candidats:
+            return solde_lu_n, False
+        correction = candidats[0]
+
+        if correction['type'] == 'solde':
+            # Le solde recalculé à partir des mouvements lus est une version "propre" du solde lu
+            print(f"  ✅ Correction Solde Ligne {i+1}: {solde_lu_n:,.0f} -> {correction['solde']:,.0f}")
+            df.at[i, 'solde'] = correction['solde']
+            return correction['solde'], False
+
+        sens = 'Crédit' if 'credit' in correction and correction['credit'] else 'Débit'
+        montant = correction['credit'] if sens == 'Crédit' else correction['debit']
+        if correction['type'] == 'spillover':
+            # Le montant est resté en tête du libellé (spillover gauche), ex: Libellé = "2812950 ESPECE..."
+            print(f"  ✅ Correction Spillover Ligne {i+1} (Libellé->{sens}): {first_word} -> {montant:,.0f}")
+            df.at[i, 'libelle'] = libelle_val[len(first_word):].strip()
+        elif correction['type'] == 'plausible':
+            lu = credit_lu_n if sens == 'Crédit' else debit_lu_n
+            print(f"  ✅ Correction Plausible Ligne {i+1} ({sens}): {lu:,.0f} -> {montant:,.0f}")
+        else:
+            lu = debit_lu_n if sens == 'Crédit' else credit_lu_n
+            autre = 'Débit' if sens == 'Crédit' else 'Crédit'
+            print(f"  ✅ Correction Colonne Ligne {i+1} ({autre}->{sens}): {lu:,.0f} -> {montant:,.0f}")
+        for col in ('debit', 'credit'):
+            if col in correction: df.at[i, col] = correction[col]
+
+        # Le solde LU reste la référence de la ligne suivante (souvent OCRisé plus proprement que les mouvements)
+        return solde_lu_n, True
+
+    def colonne(col):
+        if col not in df.columns: return np.zeros(len(df))
+        return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float, copy=True)
+
+    soldes, debits, credits = colonne('solde'), colonne('debit'), colonne('credit')
+
+    # Phase 1 (vectorisée) : résidus de la chaîne des soldes sur tout le relevé. Une ligne n'est
+    # signalée que si la boucle de correction pourrait y agir : solde incohérent avec le solde
+    # précédent et les mouvements lus, ou mouvement lu différent de la variation du solde.
+    precedents = np.concatenate(([start_solde], soldes[:-1]))
+    with np.errstate(invalid='ignore'):
+        ecart_solde = np.abs(soldes - (precedents + credits - debits)) > 1.0
+        variation = soldes - precedents
+        ecart_credit = (variation > 0) & (np.abs(credits - variation) > 1.0)
+        ecart_debit = (variation < 0) & (np.abs(debits - np.abs(variation)) > 1.0)
+    a_verifier = deque(np.flatnonzero(ecart_solde | ecart_credit | ecart_debit).tolist())
+
+    # Phase 2 : correction (plausibilité, coûteuse) des seules lignes signalées, dans l'ordre du relevé
+    while a_verifier:
+        pos = a_verifier.popleft()
+        solde_retenu, applied_correction = corriger_ligne(pos, start_solde if pos == 0 else soldes[pos - 1])
         if applied_correction:
             corrected_count += 1
-            
-        # 6. Mise à jour pour la boucle suivante
-        # IMPORTANT : On prend le solde LU comme référence, SAUF si le user veut qu'on recalcule tout.
-        # Mais pour de la correction OCR, faire confiance au Solde écrit (souvent OCRisé plus proprement ou check digits) est mieux.
-        # Toutefois, si le Solde lui-même est faux, tout s'écroule.
-        solde_precedent_calcule = solde_lu_n 
-    
+        if solde_retenu != soldes[pos]:
+            soldes[pos] = solde_retenu
+            # Le solde corrigé devient la référence de la ligne suivante : elle est (re)vérifiée
+            if pos + 1 < len(df) and (not a_verifier or a_verifier[0] != pos + 1):
+                a_verifier.appendleft(pos + 1)
+
     if corrected_count > 0:
         print(f"✨ {corrected_count} corrections plausibles appliquées.")
     else:
@@ -549,9 +521,11 @@ def analyze_and_export(df: pd.DataFrame, output_prefix: str = "transactions", so
 
 
 
-def batch_process_pdf_folder(source_dir=config.input_dir, output_dir=config.output_dir):
+def batch_process_pdf_folder(source_dir=config.input_dir, output_dir=config.output_dir, profile=None, bank_name=None):
     """
     Parcourt tous les fichiers PDF du dossier source et lance l'extraction pour chacun.
+    Retourne le solde précédent lu sur le premier fichier (solde initial du relevé), None si aucun fichier.
+    profile : profil de mise en page (None : choisi à la lecture du premier fichier, bank_name s'il n'est pas reconnu, puis conservé).
     """
     if not os.path.exists(source_dir):
         print(f"❌ Le dossier {source_dir} n'existe pas.")
@@ -582,21 +556,24 @@ def batch_process_pdf_folder(source_dir=config.input_dir, output_dir=config.outp
     print(f"\n🚀 Démarrage du traitement par lot dans: {source_dir}")
     print(f"📂 {len(files)} fichiers trouvés.\n")
     
+    start_solde = None
     for filename in files:
         pdf_path = os.path.join(source_dir, filename)
         print(f"👉 Traitement de {filename}...")
         
         try:
-            # 1. Solde
-            solde_prec = get_solde_precedent(pdf_path)
-            
-            # 2. Extraction
-            df = extract_transactions_from_pdf(pdf_path)
+            # 1. Extraction (le solde précédent est relevé pendant la même lecture des mots)
+            opening = {}
+            df = extract_transactions_from_pdf(pdf_path, opening, profile, bank_name)
+            profile = opening['profile']
+            solde_prec = opening.get('solde_precedent', 0.0)
+            if start_solde is None:
+                start_solde = solde_prec
             
             # 3. Export
             if not df.empty:
                 print(f"   ✅ {len(df)} transactions.")
-                df_clean = clean_and_format_dataframe(df)
+                df_clean = clean_and_format_dataframe(df, profile)
                 
                 # Correction d'erreurs OCR via le solde
                 df_clean = check_and_correct_balances(df_clean, solde_prec)
@@ -612,6 +589,8 @@ def batch_process_pdf_folder(source_dir=config.input_dir, output_dir=config.outp
         
         print("-" * 50)
 
+    return start_solde
+
 
 #-------------------------------------------------------------------------------------------------
 # Fonction pour parcourir le dossier de sauvegarde et recréér le dataframe complet
@@ -696,3 +675,253 @@ def process_all_pdf_files(output_dir, final_output_name, start_solde=None):
     return full_df
 
 
+
+
+#-------------------------------------------------------------------------------------------------
+# Extraction en mémoire : une seule ouverture du PDF, aucun fichier intermédiaire
+#-------------------------------------------------------------------------------------------------
+def finalize_statement_dataframe(df: pd.DataFrame, start_solde: float = 0.0, profile=None) -> pd.DataFrame:
+    """
+    Transforme le DataFrame brut d'un relevé complet en DataFrame consolidé,
+    identique à celui produit par process_all_pdf_files (solde précédent en tête, dates formatées, N° d'ordre).
+    """
+    if df.empty:
+        return pd.DataFrame()
+
+    df_clean = clean_and_format_dataframe(df, profile)
+    if df_clean.empty:
+        return pd.DataFrame()
+
+    # Correction d'erreurs OCR via le solde
+    try:
+        df_clean = check_and_correct_balances(df_clean, start_solde)
+    except Exception as e:
+        print(f"⚠️ Erreur lors de la correction des soldes : {e}")
+
+    # Ligne de départ "SOLDE PRECEDENT" (même convention que analyze_and_export)
+    if start_solde != 0.0:
+        first_date = df_clean['date'].iloc[0] if 'date' in df_clean.columns else None
+        row_solde = {
+            "date": first_date,
+            "date_valeur": first_date,
+            "libelle": "SOLDE PRECEDENT",
+            "debit": 0.0,
+            "credit": 0.0,
+            "solde": start_solde
+        }
+        full_df = pd.concat([pd.DataFrame([row_solde]), df_clean], ignore_index=True)
+    else:
+        full_df = df_clean.reset_index(drop=True)
+
+    # Format dates identique à l'export CSV
+    for col in ['date', 'date_valeur']:
+        if col in full_df.columns:
+            full_df[col] = pd.to_datetime(full_df[col]).dt.strftime('%d/%m/%Y')
+
+    # Ajout de la colonne N° d'ordre en première position
+    full_df.insert(0, "N° d'ordre", range(1, len(full_df) + 1))
+    return full_df
+
+def extract_statement_from_bytes(pdf_bytes: bytes, status_callback=None, max_workers=None, profile=None, bank_name=None) -> pd.DataFrame:
+    """
+    Extrait un relevé complet directement depuis les octets du PDF (fitz.open(stream=...)).
+    Le document est ouvert une seule fois, les pages sont parcourues dans l'ordre et le
+    DataFrame consolidé est retourné sans découpage ni CSV/XLSX intermédiaires.
+    
+    max_workers : None = automatique (parallèle à partir de PARALLEL_MIN_PAGES pages), 1 = séquentiel.
+    profile : profil de mise en page (None : choisi sur les premières pages du document ouvert ici,
+              bank_name si le relevé n'est pas reconnu, cf. profile_for_document ; ValueError si la banque n'est pas paramétrée).
+    """
+    if not fitz:
+        raise ImportError("Le module 'PyMuPDF' n'est pas installé. pip install PyMuPDF")
+
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    total_pages = doc.page_count
+    if profile is None:
+        try:
+            profile = profile_for_document(doc, bank_name)
+        except ValueError:
+            doc.close()
+            raise
+
+    if max_workers is None:
+        max_workers = (os.cpu_count() or 1) if total_pages >= PARALLEL_MIN_PAGES else 1
+    if max_workers > 1 and total_pages > 1:
+        doc.close()
+        return extract_statement_parallel(pdf_bytes, max_workers=max_workers, status_callback=status_callback, profile=profile)
+
+    print(f"📄 Analyse en mémoire du relevé ({total_pages} pages, profil {profile.name})")
+
+    transactions = []
+    current_tx = {}
+    opening = {}
+
+    try:
+        for page_num, page in enumerate(doc):
+            if status_callback: status_callback(f"Extraction : Page {page_num+1} sur {total_pages}...")
+
+            words = page.get_text("words")
+            if not words:
+                continue
+
+            current_tx = parse_page_words(words, transactions, current_tx, opening if page_num == 0 else None, profile)
+    finally:
+        doc.close()
+
+    if current_tx:
+        transactions.append(current_tx)
+    start_solde = opening.get('solde_precedent', 0.0)
+
+    print(f"💰 Solde initial trouvé : {start_solde:,.0f}")
+    return finalize_statement_dataframe(build_transactions_dataframe(transactions), start_solde, profile)
+
+
+#-------------------------------------------------------------------------------------------------
+# Extraction parallèle : découpage en plages de pages traitées par un ProcessPoolExecutor
+#-------------------------------------------------------------------------------------------------
+# En dessous de ce nombre de pages, le coût de démarrage des processus dépasse le gain.
+PARALLEL_MIN_PAGES = 40
+
+# Marqueur de la transaction "orpheline" ouverte en début de plage : elle recueille les lignes
+# de suite (sans date) qui appartiennent à la dernière transaction de la plage précédente.
+CONTINUATION_KEY = "_suite"
+
+def _new_continuation_tx() -> dict:
+    return {
+        "Date": "",
+        "Date Valeur": "",
+        "Libellé": "",
+        "Débit": "",
+        "Crédit": "",
+        "Solde": "",
+        CONTINUATION_KEY: True
+    }
+
+def _merge_continuation(open_tx: dict, suite: dict):
+    """Ajoute à open_tx le contenu collecté par la transaction orpheline (même ordre que le parcours séquentiel)."""
+    for key, value in suite.items():
+        if key == CONTINUATION_KEY:
+            continue
+        if key == "Date":
+            if not open_tx.get("Date"):
+                open_tx["Date"] = value
+        else:
+            open_tx[key] = open_tx.get(key, "") + value
+
+def parse_page_standalone(words, page_num: int, profile=None):
+    """
+    Analyse une page indépendamment des précédentes : la page démarre sur une transaction orpheline
+    qui recueille ses lignes de suite. Le résultat ne dépend donc que du contenu de la page
+    (recollage par stitch_page_ranges), ce qui permet de le paralléliser ou de le mettre en cache.
+    Retourne (transactions fermées, transaction ouverte en fin de page, solde précédent si page 0).
+    """
+    transactions = []
+    current_tx = _new_continuation_tx()
+    opening = {}
+    if words:
+        current_tx = parse_page_words(words, transactions, current_tx, opening if page_num == 0 else None, profile)
+    return transactions, current_tx, opening.get('solde_precedent', 0.0)
+
+def page_fingerprint(words, page_num: int, profile=None) -> str:
+    """
+    Empreinte du contenu d'une page (mots et positions), de la version de l'extracteur, du profil et de ses bornes de colonnes.
+    Deux pages de même empreinte produisent exactement le même résultat de parse_page_standalone.
+    """
+    profile = profile or bank_profiles.DEFAULT_PROFILE
+    h = hashlib.sha256()
+    h.update(f"{EXTRACTOR_VERSION}|{page_num == 0}|{profile.name}|{profile.edges.tolist()}".encode("utf-8"))
+    for w in words:
+        h.update(f"{w[0]:.2f},{w[1]:.2f},{w[3]:.2f},{w[4]}\n".encode("utf-8"))
+    return h.hexdigest()
+
+def _extract_page_range(pdf_bytes: bytes, first_page: int, last_page: int, profile_name=None, column_bounds=None):
+    """
+    Tâche exécutée dans un processus fils : analyse les pages [first_page, last_page[.
+    Le profil est transmis par son nom et les bornes de colonnes du document (cf. bank_profiles.profile_for_task).
+    Retourne (transactions fermées, transaction ouverte en fin de plage, solde précédent si page 0).
+    """
+    profile = bank_profiles.profile_for_task(profile_name, column_bounds)
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    transactions = []
+    current_tx = _new_continuation_tx()
+    opening = {}
+    try:
+        for page_num in range(first_page, last_page):
+            words = doc[page_num].get_text("words")
+            if not words:
+                continue
+            current_tx = parse_page_words(words, transactions, current_tx, opening if page_num == 0 else None, profile)
+    finally:
+        doc.close()
+    return transactions, current_tx, opening.get('solde_precedent', 0.0)
+
+def stitch_page_ranges(partials) -> list:
+    """
+    Recolle, dans l'ordre des pages, les résultats partiels de _extract_page_range.
+    Les lignes de suite en tête d'une plage sont rattachées à la transaction restée ouverte
+    à la fin de la plage précédente, exactement comme le ferait l'automate séquentiel.
+    """
+    transactions = []
+    open_tx = {}
+    for shard_transactions, shard_open, _ in partials:
+        shard_transactions = list(shard_transactions)
+        if shard_transactions and shard_transactions[0].get(CONTINUATION_KEY):
+            # La suite a été fermée dans la plage (nouvelle date ou ligne de total)
+            suite = shard_transactions.pop(0)
+            if open_tx:
+                _merge_continuation(open_tx, suite)
+                transactions.append(open_tx)
+            open_tx = {}
+        elif shard_open.get(CONTINUATION_KEY):
+            # Aucune nouvelle transaction dans la plage : tout prolonge la transaction ouverte
+            if open_tx:
+                _merge_continuation(open_tx, shard_open)
+            continue
+
+        transactions.extend(shard_transactions)
+        open_tx = shard_open
+
+    if open_tx:
+        transactions.append(open_tx)
+    return transactions
+
+def extract_statement_parallel(pdf_bytes: bytes, max_workers=None, pages_per_shard=None, status_callback=None, profile=None, bank_name=None) -> pd.DataFrame:
+    """
+    Extraction parallèle d'un relevé : les plages de pages sont réparties sur un ProcessPoolExecutor,
+    puis les transactions partielles sont recollées dans l'ordre des pages.
+    profile : profil de mise en page (None : choisi sur les premières pages du document ouvert ici,
+              bank_name si le relevé n'est pas reconnu, cf. profile_for_document ; ValueError si la banque n'est pas paramétrée).
+    """
+    if not fitz:
+        raise ImportError("Le module 'PyMuPDF' n'est pas installé. pip install PyMuPDF")
+
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    total_pages = doc.page_count
+    try:
+        if profile is None:
+            profile = profile_for_document(doc, bank_name)
+    finally:
+        doc.close()
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if not pages_per_shard:
+        # Quelques plages par processus pour lisser les pages plus ou moins chargées
+        pages_per_shard = max(1, -(-total_pages // (max_workers * 4)))
+
+    ranges = [(p, min(p + pages_per_shard, total_pages)) for p in range(0, total_pages, pages_per_shard)]
+    print(f"📄 Analyse parallèle du relevé ({total_pages} pages, {len(ranges)} plages, {max_workers} processus)")
+
+    partials = [None] * len(ranges)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_extract_page_range, pdf_bytes, first, last, profile.name, profile.column_bounds): i for i, (first, last) in enumerate(ranges)}
+        done = 0
+        for future in as_completed(futures):
+            partials[futures[future]] = future.result()
+            done += 1
+            if status_callback: status_callback(f"Extraction : plage {done} sur {len(ranges)}...")
+
+    start_solde = partials[0][2] if partials else 0.0
+    transactions = stitch_page_ranges(partials)
+
+    print(f"💰 Solde initial trouvé : {start_solde:,.0f}")
+    return finalize_statement_dataframe(build_transactions_dataframe(transactions), start_solde, profile)
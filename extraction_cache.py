@@ -0,0 +1,220 @@
+"""
+Cache persistant des relevés extraits.
+La clé est une empreinte SHA-256 des octets du PDF, du nom de la banque et de la version de l'extracteur :
+un relevé déjà traité (ex: ré-upload après correction du journal) est relu en quelques millisecondes
+au lieu de relancer tout le pipeline d'extraction.
+Stockage : un fichier Parquet par relevé, éviction LRU (date de dernier accès) au-delà d'une taille maximale.
+
+Un second niveau de cache, par page, mémorise le résultat de l'analyse de chaque page sous l'empreinte
+de son contenu : un relevé ré-émis dont seules les dernières pages changent (ex: correction de fin de mois)
+ne ré-analyse que les pages modifiées.
+
+Les deux niveaux partagent un seul budget disque (config.cache_max_bytes) : l'éviction LRU porte sur
+l'ensemble des relevés et des pages.
+"""
+
+import hashlib
+import json
+import os
+import time
+import pandas as pd
+import config
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import pyarrow  # Moteur Parquet de pandas
+except ImportError:
+    pyarrow = None
+
+import bank_profiles
+import extract_table
+from extract_table import EXTRACTOR_VERSION
+
+
+def statement_cache_key(pdf_bytes: bytes, bank_name=None) -> str:
+    """Empreinte du relevé : SHA-256(octets du PDF) + banque + version de l'extracteur."""
+    digest = hashlib.sha256(pdf_bytes).hexdigest()
+    bank = (bank_name or "").strip().lower()
+    return hashlib.sha256(f"{digest}|{bank}|{EXTRACTOR_VERSION}".encode("utf-8")).hexdigest()
+
+def _cache_path(key: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, f"{key}.parquet")
+
+def load_cached_statement(key: str, cache_dir: str = config.cache_dir):
+    """Retourne le DataFrame en cache pour cette clé, ou None (absent, illisible ou Parquet indisponible)."""
+    if pyarrow is None:
+        return None
+
+    path = _cache_path(key, cache_dir)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        df = pd.read_parquet(path)
+        # Mise à jour de la date d'accès pour la politique LRU
+        os.utime(path, None)
+        return df
+    except Exception as e:
+        print(f"⚠️ Cache illisible ({path}) : {e}")
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+
+def store_statement(key: str, df: pd.DataFrame, cache_dir: str = config.cache_dir, max_bytes: int = config.cache_max_bytes):
+    """Enregistre le DataFrame extrait puis applique l'éviction LRU."""
+    if pyarrow is None or df is None or df.empty:
+        return
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        path = _cache_path(key, cache_dir)
+        # Écriture atomique : un lecteur concurrent ne voit jamais un fichier partiel
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"⚠️ Impossible d'enregistrer le relevé en cache : {e}")
+        return
+
+    evict_lru(cache_dir, max_bytes)
+
+def _cache_entries(cache_dir: str) -> list:
+    """(date d'accès, taille, chemin) des entrées des deux niveaux : relevés (Parquet) et pages (JSON)."""
+    entries = []
+    for directory, suffix in ((cache_dir, ".parquet"), (_page_cache_dir(cache_dir), ".json")):
+        try:
+            filenames = os.listdir(directory)
+        except OSError:
+            continue
+        for filename in filenames:
+            if not filename.endswith(suffix):
+                continue
+            path = os.path.join(directory, filename)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # Supprimé entre-temps (éviction concurrente)
+            entries.append((st.st_mtime, st.st_size, path))
+    return entries
+
+def evict_lru(cache_dir: str = config.cache_dir, max_bytes: int = config.cache_max_bytes):
+    """Supprime les entrées (relevés et pages) les moins récemment utilisées jusqu'à repasser sous max_bytes."""
+    entries = _cache_entries(cache_dir)
+
+    total = sum(size for _, size, _ in entries)
+    if total <= max_bytes:
+        return
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            print(f"🧹 Cache : éviction de {os.path.basename(path)}")
+        except OSError:
+            pass
+
+
+#-------------------------------------------------------------------------------------------------
+# Cache par page (empreinte du contenu de la page -> résultat de parse_page_standalone)
+#-------------------------------------------------------------------------------------------------
+def _page_cache_dir(cache_dir: str) -> str:
+    return os.path.join(cache_dir, "pages")
+
+def load_page_result(fingerprint: str, cache_dir: str = config.cache_dir):
+    """Retourne (transactions, transaction ouverte, solde précédent) pour cette empreinte, ou None."""
+    path = os.path.join(_page_cache_dir(cache_dir), f"{fingerprint}.json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        os.utime(path, None)
+        return data["transactions"], data["open_tx"], data["start_solde"]
+    except Exception as e:
+        print(f"⚠️ Cache page illisible ({path}) : {e}")
+        return None
+
+def store_page_result(fingerprint: str, result, cache_dir: str = config.cache_dir):
+    """Enregistre le résultat d'une page (écriture atomique)."""
+    transactions, open_tx, start_solde = result
+    pages_dir = _page_cache_dir(cache_dir)
+    try:
+        os.makedirs(pages_dir, exist_ok=True)
+        path = os.path.join(pages_dir, f"{fingerprint}.json")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"transactions": transactions, "open_tx": open_tx, "start_solde": start_solde}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"⚠️ Impossible d'enregistrer la page en cache : {e}")
+
+def _parse_page_task(pdf_bytes: bytes, page_num: int, profile_name=None, column_bounds=None):
+    """Tâche exécutée dans un processus fils : analyse autonome d'une page (profil transmis par son nom et ses bornes)."""
+    doc = extract_table.fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        words = doc[page_num].get_text("words")
+    finally:
+        doc.close()
+    return extract_table.parse_page_standalone(words, page_num, bank_profiles.profile_for_task(profile_name, column_bounds))
+
+def extract_statement_incremental(pdf_bytes: bytes, status_callback=None, max_workers=None, cache_dir: str = config.cache_dir, max_bytes: int = config.cache_max_bytes, profile=None, bank_name=None) -> pd.DataFrame:
+    """
+    Extraction page par page avec cache : chaque page est identifiée par l'empreinte de ses mots (et du profil),
+    seules les pages inconnues sont analysées (en parallèle si elles sont nombreuses),
+    puis toutes les pages sont recollées dans l'ordre.
+    profile : profil de mise en page (None : choisi sur les premières pages du document ouvert ici,
+              bank_name si le relevé n'est pas reconnu, cf. extract_table.profile_for_document).
+    """
+    if not extract_table.fitz:
+        raise ImportError("Le module 'PyMuPDF' n'est pas installé. pip install PyMuPDF")
+
+    start_time = time.time()
+    doc = extract_table.fitz.open(stream=pdf_bytes, filetype="pdf")
+    total_pages = doc.page_count
+
+    partials = [None] * total_pages
+    fingerprints = [None] * total_pages
+    missing = {}
+    try:
+        if profile is None:
+            profile = extract_table.profile_for_document(doc, bank_name)
+        for page_num, page in enumerate(doc):
+            words = page.get_text("words")
+            fingerprints[page_num] = extract_table.page_fingerprint(words, page_num, profile)
+            cached = load_page_result(fingerprints[page_num], cache_dir)
+            if cached is not None:
+                partials[page_num] = cached
+            else:
+                missing[page_num] = words
+    finally:
+        doc.close()
+
+    print(f"📄 Analyse incrémentale du relevé : {total_pages - len(missing)} pages en cache, {len(missing)} à analyser")
+
+    if max_workers is None:
+        max_workers = (os.cpu_count() or 1) if len(missing) >= extract_table.PARALLEL_MIN_PAGES else 1
+
+    if max_workers > 1 and len(missing) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            pages = sorted(missing)
+            for page_num, result in zip(pages, executor.map(_parse_page_task, [pdf_bytes] * len(pages), pages, [profile.name] * len(pages), [profile.column_bounds] * len(pages))):
+                partials[page_num] = result
+    else:
+        for done, (page_num, words) in enumerate(sorted(missing.items()), 1):
+            if status_callback: status_callback(f"Extraction : Page {page_num+1} ({done} sur {len(missing)} à analyser)...")
+            partials[page_num] = extract_table.parse_page_standalone(words, page_num, profile)
+
+    for page_num in missing:
+        store_page_result(fingerprints[page_num], partials[page_num], cache_dir)
+    if missing:
+        evict_lru(cache_dir, max_bytes)
+
+    start_solde = partials[0][2] if partials else 0.0
+    transactions = extract_table.stitch_page_ranges(partials)
+    print(f"💰 Solde initial trouvé : {start_solde:,.0f} ({time.time() - start_time:.2f} s)")
+    return extract_table.finalize_statement_dataframe(extract_table.build_transactions_dataframe(transactions), start_solde, profile)
@@ -0,0 +1,183 @@
+"""
+Inférence des bornes de colonnes d'un relevé à partir de ses premières pages.
+Les bornes fixes d'un profil (estimées sur un modèle de relevé) envoient les montants dans la mauvaise
+colonne dès que le modèle bouge de quelques points, et c'est alors check_and_correct_balances qui doit
+réparer les montants collés. Ici, les bornes sont lues sur le document lui-même :
+- seules les lignes du tableau sont retenues (premier mot = date, hors lignes ignorées du profil),
+- l'occupation horizontale de leurs mots (intervalles x0-x1) est cumulée dans un histogramme NumPy
+  au point près ; les gouttières sont les plages (quasi) vides entre les blocs occupés,
+- chaque bloc est qualifié par ses mots (dates, montants, texte) et les blocs sont rapprochés du
+  schéma Date | Libellé | Valeur | Débit | Crédit | Solde,
+- chaque borne est placée dans sa gouttière selon l'alignement des colonnes voisines : une colonne
+  alignée à gauche (libellé) s'allonge vers la droite sur les pages suivantes, la borne qui la suit
+  est donc repoussée contre la colonne d'après ; symétriquement pour une colonne alignée à droite.
+Si le schéma n'est pas reconnu (trop peu de lignes, colonne vide sur les pages lues...), None est
+retourné et les bornes du profil s'appliquent. Les bornes déduites sont mémorisées sous l'empreinte
+des pages analysées.
+"""
+
+import hashlib
+import numpy as np
+from collections import Counter
+import config
+from bank_profiles import COLUMN_KEYS
+
+MAX_CACHE_DOCUMENTS = 256
+
+# Part des lignes du tableau qu'un mot débordant peut occuper dans une gouttière sans la boucher
+GUTTER_TOLERANCE = 0.02
+
+# Écart (points) entre les dispersions des bords gauche et droit d'une colonne pour la dire alignée
+ALIGNMENT_TOLERANCE = 0.5
+
+KIND_DATE, KIND_AMOUNT, KIND_TEXT = "date", "montant", "texte"
+
+_BOUNDS_CACHE = {} # empreinte des pages -> bornes (ou None), les plus anciennes sortent en premier
+
+
+def document_fingerprint(pages_words, profile) -> str:
+    """Empreinte des pages analysées (mots et positions) et du profil."""
+    h = hashlib.sha256(profile.name.encode("utf-8"))
+    for words in pages_words:
+        h.update(b"\f")
+        for w in words:
+            h.update(f"{w[0]:.2f},{w[2]:.2f},{w[3]:.2f},{w[4]}\n".encode("utf-8"))
+    return h.hexdigest()
+
+def table_rows(words, profile) -> list:
+    """Lignes du tableau d'une page (mots regroupés par y1 comme dans layout_page_words) dont le premier mot est une date."""
+    lines = {}
+    for w in words:
+        lines.setdefault(int(w[3]), []).append(w)
+    rows = []
+    for line in lines.values():
+        line.sort(key=lambda w: w[0])
+        if not profile.is_date_token(line[0][4]):
+            continue
+        if profile.skip_re.search(" ".join(w[4] for w in line)):
+            continue
+        rows.append(line)
+    return rows
+
+def _word_kind(text, profile) -> str:
+    if profile.is_date_token(text): return KIND_DATE
+    if profile.is_amount_like(text) and any(c.isdigit() for c in text): return KIND_AMOUNT
+    return KIND_TEXT
+
+def occupied_blocks(x0: np.ndarray, x1: np.ndarray, nb_rows: int, min_gutter: float) -> list:
+    """
+    Blocs occupés [début, fin[ (en points) de l'histogramme d'occupation des mots.
+    Deux blocs séparés par moins de min_gutter points n'en font qu'un (espace entre deux mots d'une même colonne).
+    """
+    start = np.floor(x0).astype(np.int64)
+    end = np.maximum(np.ceil(x1).astype(np.int64), start + 1)
+    width = int(end.max()) + 1
+    # Histogramme par différences : +1 au début de chaque mot, -1 à sa fin, puis somme cumulée
+    diff = np.bincount(start, minlength=width + 1) - np.bincount(end, minlength=width + 1)
+    occupied = np.cumsum(diff)[:width] > nb_rows * GUTTER_TOLERANCE
+
+    # Fronts montants / descendants de l'occupation
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], occupied, [False])).astype(np.int8)))
+    blocks = []
+    for b_start, b_end in zip(edges[::2].tolist(), edges[1::2].tolist()):
+        if blocks and b_start - blocks[-1][1] < min_gutter:
+            blocks[-1][1] = b_end
+        else:
+            blocks.append([b_start, b_end])
+    return blocks
+
+def column_growth(cell_start: np.ndarray, cell_end: np.ndarray):
+    """
+    Sens d'allongement d'une colonne d'après les bords de ses cellules (une par ligne du tableau) :
+    +1 vers la droite (alignée à gauche), -1 vers la gauche (alignée à droite), 0 largeur fixe.
+    """
+    filled = np.isfinite(cell_start)
+    if filled.sum() < 2: return 0
+    spread = np.std(cell_end[filled]) - np.std(cell_start[filled])
+    if spread > ALIGNMENT_TOLERANCE: return 1
+    if spread < -ALIGNMENT_TOLERANCE: return -1
+    return 0
+
+def gutter_bound(left_block, right_block, left_growth, right_growth, margin) -> float:
+    """Borne dans la gouttière entre deux blocs : au milieu, ou contre le bord fixe de la colonne qui ne s'allonge pas vers elle."""
+    gap_start, gap_end = left_block[1], right_block[0]
+    margin = min(margin, (gap_end - gap_start) / 2)
+    if left_growth > 0 and right_growth >= 0: return gap_end - margin
+    if right_growth < 0 and left_growth <= 0: return gap_start + margin
+    return (gap_start + gap_end) / 2
+
+def _match_columns(blocks, kinds):
+    """
+    Rapproche les blocs qualifiés du schéma Date | Libellé | Valeur | Débit | Crédit | Solde.
+    Retourne les indices des blocs qui ferment chaque colonne (hors Solde), None si le schéma ne colle pas.
+    """
+    if len(blocks) < 6 or kinds[0] != KIND_DATE:
+        return None
+    # Date de valeur : le premier bloc de dates après le libellé (qui peut lui-même compter plusieurs blocs)
+    valeur = next((i for i in range(2, len(blocks)) if kinds[i] == KIND_DATE), None)
+    if valeur is None or len(blocks) - valeur != 4:
+        return None
+    if any(k != KIND_AMOUNT for k in kinds[valeur + 1:]):
+        return None
+    return [0, valeur - 1, valeur, valeur + 1, valeur + 2]
+
+def _infer(pages_words, profile, min_rows, min_gutter):
+    rows = [row for words in pages_words for row in table_rows(words, profile)]
+    if len(rows) < min_rows:
+        return None
+
+    words = [w for row in rows for w in row]
+    x0 = np.fromiter((w[0] for w in words), dtype=float, count=len(words))
+    x1 = np.fromiter((w[2] for w in words), dtype=float, count=len(words))
+    blocks = occupied_blocks(x0, x1, len(rows), min_gutter)
+    if len(blocks) < 6:
+        return None
+
+    # Nature de chaque bloc : celle de la majorité des mots dont le centre y tombe
+    starts = np.array([b[0] for b in blocks], dtype=float)
+    block_of_word = np.maximum(np.searchsorted(starts, (x0 + x1) / 2, side="right") - 1, 0)
+    counts = [Counter() for _ in blocks]
+    for i, w in zip(block_of_word.tolist(), words):
+        counts[i][_word_kind(w[4], profile)] += 1
+    kinds = [c.most_common(1)[0][0] if c else KIND_TEXT for c in counts]
+
+    closing = _match_columns(blocks, kinds)
+    if closing is None:
+        return None
+
+    # Bords de chaque cellule (ligne, bloc) : min x0 / max x1 de ses mots
+    row_of_word = np.repeat(np.arange(len(rows)), [len(row) for row in rows])
+    cell = row_of_word * len(blocks) + block_of_word
+    cell_start = np.full(len(rows) * len(blocks), np.inf)
+    cell_end = np.full(len(rows) * len(blocks), -np.inf)
+    np.minimum.at(cell_start, cell, x0)
+    np.maximum.at(cell_end, cell, x1)
+    cell_start = cell_start.reshape(len(rows), len(blocks))
+    cell_end = cell_end.reshape(len(rows), len(blocks))
+
+    # Une colonne = un ou plusieurs blocs (libellé) ; la borne suit le dernier bloc de la colonne
+    first_blocks = [0] + [i + 1 for i in closing]
+    bounds = {}
+    for n, (key, i) in enumerate(zip(COLUMN_KEYS, closing)):
+        left = slice(first_blocks[n], i + 1)
+        left_growth = column_growth(cell_start[:, left].min(axis=1), cell_end[:, left].max(axis=1))
+        right_growth = column_growth(cell_start[:, i + 1], cell_end[:, i + 1])
+        # Le texte (libellé) est aligné à gauche, même si les pages lues n'ont que des libellés de même longueur
+        if KIND_TEXT in kinds[left]: left_growth = 1
+        if kinds[i + 1] == KIND_TEXT: right_growth = 1
+        bounds[key] = gutter_bound(blocks[i], blocks[i + 1], left_growth, right_growth, min_gutter)
+    return bounds
+
+def infer_column_bounds(pages_words, profile, min_rows=config.layout_min_rows, min_gutter=config.layout_min_gutter):
+    """
+    Bornes de colonnes (dict, cf. bank_profiles.COLUMN_KEYS) déduites des mots des premières pages
+    (listes de page.get_text("words")), None si le tableau n'est pas reconnu.
+    Le résultat est mémorisé sous l'empreinte des pages analysées.
+    """
+    key = (document_fingerprint(pages_words, profile), min_rows, min_gutter)
+    if key in _BOUNDS_CACHE:
+        return _BOUNDS_CACHE[key]
+    bounds = _infer(pages_words, profile, min_rows, min_gutter)
+    if len(_BOUNDS_CACHE) >= MAX_CACHE_DOCUMENTS: _BOUNDS_CACHE.pop(next(iter(_BOUNDS_CACHE)))
+    _BOUNDS_CACHE[key] = bounds
+    return bounds
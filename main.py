@@ -4,7 +4,8 @@ import sys
 import time
 import config
 from split_pdf import generate_ocr_split
-from extract_table import batch_process_pdf_folder, process_all_pdf_files, get_solde_precedent
+from extract_table import batch_process_pdf_folder, process_all_pdf_files, extract_statement_from_bytes, detect_profile
+import extraction_cache
 
 # =================================================================================================
 # SCRIPT PRINCIPAL : ORCHESTRATION DU FLUX DE TRAVAIL (PIPELINE)
@@ -18,13 +19,10 @@ from extract_table import batch_process_pdf_folder, process_all_pdf_files, get_s
 def run_extraction_pipeline(input_pdf_path, bank_name=None, status_callback=None):
     """
     Exécute le pipeline complet d'extraction pour un fichier PDF donné.
-    Retourne le chemin du fichier Excel consolidé généré.
+    Le profil de mise en page est choisi sur la première page du relevé (bank_name : banque indiquée,
+    utilisée si le relevé n'est pas reconnu). Retourne le chemin du fichier Excel consolidé généré.
     """
     
-    # Vérification de la banque supportée
-    if bank_name and bank_name.strip().lower() != "orabank":
-        raise ValueError(f"Désolé, cette banque ({bank_name}) n'a pas encore été paramétrée.")
-    
     # -------------------------------------------------------------------------
     # ÉTAPE 0 : PRÉPARATION
     # -------------------------------------------------------------------------
@@ -35,6 +33,9 @@ def run_extraction_pipeline(input_pdf_path, bank_name=None, status_callback=None
     if not os.path.exists(input_pdf_path):
         raise FileNotFoundError(f"Le fichier source '{input_pdf_path}' est introuvable.")
 
+    # Profil de la banque (ValueError si la banque n'est pas paramétrée)
+    profile = detect_profile(input_pdf_path, bank_name)
+
     start_time = time.time()
     
     # Dossiers temporaires spécifiques à ce run (basés sur le nom du fichier pour éviter conflits ?)
@@ -77,9 +78,9 @@ def run_extraction_pipeline(input_pdf_path, bank_name=None, status_callback=None
     print("📍 ÉTAPE 2 : Extraction des transactions bancaires")
     print("-"*50)
 
-    # Extraction vers CSV intermédiaires
+    # Extraction vers CSV intermédiaires (le solde initial est relevé pendant la lecture de la première page)
     if status_callback: status_callback("Extraction des tableaux (Parsing)...")
-    batch_process_pdf_folder(ocr_result_dir, output_dir=csv_output_dir)
+    start_solde = batch_process_pdf_folder(ocr_result_dir, output_dir=csv_output_dir, profile=profile)
     
     print("✅ Étape 2 terminée. Fichiers intermédiaires générés.")
 
@@ -91,22 +92,8 @@ def run_extraction_pipeline(input_pdf_path, bank_name=None, status_callback=None
     print("-"*50)
 
     # Fusion
-    import re
-    
-    start_solde = None
-    try:
-        # Identifier la première page (page_1.pdf) pour extraire le solde initial
-        pdf_files = [f for f in os.listdir(ocr_result_dir) if f.lower().endswith(".pdf")]
-        if pdf_files:
-            # Tri intelligent (page_1 avant page_10)
-            pdf_files.sort(key=lambda f: int(re.search(r'\d+', f).group()) if re.search(r'\d+', f) else 999)
-            first_page_path = os.path.join(ocr_result_dir, pdf_files[0])
-            
-            print(f"💰 Recherche du solde initial dans : {first_page_path}")
-            start_solde = get_solde_precedent(first_page_path)
-            print(f"   => Solde initial trouvé : {start_solde:,.0f}")
-    except Exception as e:
-        print(f"⚠️ Erreur lors de la détection du solde initial : {e}")
+    if start_solde is not None:
+        print(f"💰 Solde initial trouvé : {start_solde:,.0f}")
 
     final_df = process_all_pdf_files(csv_output_dir, base_name, start_solde=start_solde)
 
@@ -134,6 +121,55 @@ def run_extraction_pipeline(input_pdf_path, bank_name=None, status_callback=None
         print("\n⚠️  Attention : Le fichier final semble vide ou n'a pas été généré.")
         return None
 
+def run_extraction_in_memory(pdf_bytes, bank_name=None, status_callback=None, source_name="relevé", max_workers=None, use_cache=True):
+    """
+    Variante en flux du pipeline : le PDF est lu directement depuis ses octets (une seule ouverture),
+    sans découpage par page ni fichiers CSV/XLSX intermédiaires.
+    Les gros relevés sont répartis sur plusieurs processus (max_workers=None : automatique, 1 : séquentiel).
+    Un relevé déjà extrait (mêmes octets, même banque, même version d'extracteur) est relu depuis le cache,
+    et pour un relevé ré-émis seules les pages modifiées sont ré-analysées.
+    Le profil de mise en page est choisi sur le document déjà ouvert pour l'extraction (bank_name : utilisé si le
+    relevé n'est pas reconnu ; ValueError si la banque n'est pas paramétrée).
+    Retourne le DataFrame consolidé (même structure que le fichier Excel du pipeline classique).
+    """
+
+    print("\n" + "="*80)
+    print(f"🚀 DÉMARRAGE DU TRAITEMENT EN MÉMOIRE : {source_name}")
+    print("="*80)
+
+    start_time = time.time()
+
+    cache_key = None
+    if use_cache:
+        cache_key = extraction_cache.statement_cache_key(pdf_bytes, bank_name)
+        cached_df = extraction_cache.load_cached_statement(cache_key)
+        if cached_df is not None:
+            print(f"⚡ Relevé déjà extrait, lecture du cache ({len(cached_df)} lignes, {time.time() - start_time:.3f} s)")
+            return cached_df
+
+    if status_callback: status_callback("Extraction des tableaux (Parsing)...")
+    if use_cache:
+        # Relevé inconnu : seules les pages jamais vues sont analysées (relevé ré-émis)
+        final_df = extraction_cache.extract_statement_incremental(pdf_bytes, status_callback=status_callback, max_workers=max_workers, bank_name=bank_name)
+    else:
+        final_df = extract_statement_from_bytes(pdf_bytes, status_callback=status_callback, max_workers=max_workers, bank_name=bank_name)
+
+    if final_df.empty:
+        print("\n⚠️  Attention : Aucune transaction n'a été extraite du relevé.")
+        return None
+
+    if cache_key:
+        extraction_cache.store_statement(cache_key, final_df)
+
+    elapsed_time = time.time() - start_time
+    print("\n" + "="*80)
+    print("✨ TRAITEMENT TERMINÉ AVEC SUCCÈS")
+    print(f"⏱️  Durée totale : {elapsed_time:.1f} secondes")
+    print(f"📊 Total transactions extraites : {len(final_df)}")
+    print("="*80)
+
+    return final_df
+
 def cleanup_extraction_artifacts(input_pdf_path):
     """
     Nettoie les fichiers temporaires générés lors de l'extraction.
@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import datetime
+from contextlib import closing
+import config
+
+# ----------------------------------------------------------------------------------
+# GRAND LIVRE DES SUSPENS
+# Suspens restant ouverts à chaque arrêté, par utilisateur et par compte bancaire (numéro de compte,
+# pas la banque : deux comptes d'une même banque ont chacun leurs suspens). Le rapprochement
+# du mois suivant repart de ces lignes (report exact) au lieu de relire l'état Excel exporté.
+# Stockage local SQLite, même schéma que la table Supabase public.suspens_ouverts (suspens_setup.sql) :
+# un instantané complet par (utilisateur, compte, date d'arrêté), remplacé si le mois est refait.
+# ----------------------------------------------------------------------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS suspens_ouverts (
+    user_id TEXT NOT NULL,
+    compte TEXT NOT NULL,
+    date_arrete TEXT NOT NULL,
+    ordre INTEGER NOT NULL,
+    date_op TEXT,
+    libelle TEXT,
+    col_C REAL NOT NULL DEFAULT 0,
+    col_D REAL NOT NULL DEFAULT 0,
+    col_E REAL NOT NULL DEFAULT 0,
+    col_F REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, compte, date_arrete, ordre)
+)
+"""
+
+def _connexion(db_path):
+    dossier = os.path.dirname(db_path)
+    if dossier: os.makedirs(dossier, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute(SCHEMA)
+    return conn
+
+def _date_iso(date_arrete):
+    """Date d'arrêté (date, datetime, Timestamp ou texte jj/mm/aaaa / aaaa-mm-jj) -> 'aaaa-mm-jj' (tri lexical = tri chronologique)."""
+    if isinstance(date_arrete, datetime.datetime): return date_arrete.date().isoformat()
+    if isinstance(date_arrete, datetime.date): return date_arrete.isoformat()
+    texte = str(date_arrete).strip()
+    for fmt in ('%Y-%m-%d', '%d/%m/%Y'):
+        try: return datetime.datetime.strptime(texte[:10], fmt).date().isoformat()
+        except ValueError: pass
+    raise ValueError(f"Date d'arrêté invalide : {date_arrete}")
+
+def normaliser_compte(compte):
+    """Identifiant de compte (numéro saisi ou lu sur le relevé) sans espaces, en majuscules ; ValueError si vide."""
+    texte = "".join(str(compte or "").split()).upper()
+    if not texte: raise ValueError("Numéro de compte manquant : le grand livre des suspens est tenu par compte.")
+    return texte
+
+def _texte(val):
+    if val is None or isinstance(val, (str, int, float)): return val
+    return str(val)
+
+def charger_suspens(user_id, compte, date_arrete=None, db_path=config.ledger_path):
+    """
+    Suspens ouverts du dernier arrêté strictement antérieur à date_arrete (le dernier arrêté si None).
+    Retourne (date de l'arrêté repris 'aaaa-mm-jj', suspens au format attendu par executer_rapprochement(suspens_prec=...)),
+    ou None si aucun arrêté n'est enregistré (à distinguer d'une liste vide : arrêté sans suspens).
+    """
+    compte = normaliser_compte(compte)
+    if not os.path.exists(db_path): return None
+    with closing(_connexion(db_path)) as conn:
+        if date_arrete is None:
+            ligne = conn.execute("SELECT MAX(date_arrete) FROM suspens_ouverts WHERE user_id = ? AND compte = ?",
+                                 (str(user_id), compte)).fetchone()
+        else:
+            ligne = conn.execute("SELECT MAX(date_arrete) FROM suspens_ouverts WHERE user_id = ? AND compte = ? AND date_arrete < ?",
+                                 (str(user_id), compte, _date_iso(date_arrete))).fetchone()
+        if not ligne or ligne[0] is None: return None
+
+        lignes = conn.execute(
+            "SELECT date_op, libelle, col_C, col_D, col_E, col_F FROM suspens_ouverts "
+            "WHERE user_id = ? AND compte = ? AND date_arrete = ? AND ordre >= 0 ORDER BY ordre",
+            (str(user_id), compte, ligne[0])).fetchall()
+
+    return ligne[0], [{'raw_date': d, 'libelle': l, 'col_C': c, 'col_D': dd, 'col_E': e, 'col_F': f} for d, l, c, dd, e, f in lignes]
+
+def enregistrer_suspens(user_id, compte, date_arrete, suspens, db_path=config.ledger_path):
+    """
+    Enregistre les suspens ouverts à date_arrete (ResultatRapprochement.suspens_ouverts()),
+    en remplaçant l'instantané existant pour ce mois. Un arrêté sans suspens est conservé
+    par une ligne marqueur (ordre = -1) pour que le mois suivant sache qu'il n'y a rien à reporter.
+    """
+    compte = normaliser_compte(compte)
+    date_iso = _date_iso(date_arrete)
+    lignes = [(str(user_id), compte, date_iso, ordre, _texte(op['raw_date']), _texte(op['libelle']),
+               op['col_C'], op['col_D'], op['col_E'], op['col_F']) for ordre, op in enumerate(suspens)]
+    if not lignes:
+        lignes = [(str(user_id), compte, date_iso, -1, None, None, 0, 0, 0, 0)]
+
+    with closing(_connexion(db_path)) as conn:
+        with conn: # transaction : l'instantané est remplacé d'un bloc
+            conn.execute("DELETE FROM suspens_ouverts WHERE user_id = ? AND compte = ? AND date_arrete = ?",
+                         (str(user_id), compte, date_iso))
+            conn.executemany("INSERT INTO suspens_ouverts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", lignes)
+    print(f"📒 Grand livre des suspens : {len(suspens)} suspens ouverts au {date_iso} ({compte})")
@@ -0,0 +1,34 @@
+-- ==============================================================================
+-- GRAND LIVRE DES SUSPENS (A exécuter dans l'éditeur SQL de Supabase)
+-- Suspens restant ouverts à chaque arrêté, par utilisateur et par compte.
+-- Même schéma que le stockage local SQLite (suspens_ledger.py).
+-- ==============================================================================
+
+create table public.suspens_ouverts (
+  user_id uuid references auth.users not null,
+  compte text not null, -- numéro de compte bancaire (sans espaces, majuscules), pas le nom de la banque
+  date_arrete date not null,
+  ordre int not null, -- -1 : arrêté sans suspens (ligne marqueur)
+  date_op text,
+  libelle text,
+  col_C numeric not null default 0,
+  col_D numeric not null default 0,
+  col_E numeric not null default 0,
+  col_F numeric not null default 0,
+  primary key (user_id, compte, date_arrete, ordre)
+);
+
+-- Active la sécurité
+alter table public.suspens_ouverts enable row level security;
+
+-- Politique: Voir ses suspens
+create policy "Users can view own suspens" on public.suspens_ouverts
+  for select using (auth.uid() = user_id);
+
+-- Politique: Enregistrer ses suspens
+create policy "Users can insert own suspens" on public.suspens_ouverts
+  for insert with check (auth.uid() = user_id);
+
+-- Politique: Remplacer l'instantané d'un mois refait
+create policy "Users can delete own suspens" on public.suspens_ouverts
+  for delete using (auth.uid() = user_id);
@@ -0,0 +1,98 @@
+"""Relevés PDF de test (modèle Orabank) : transactions connues, plusieurs par date, sur plusieurs pages."""
+
+import random
+
+fitz = None
+try:
+    import fitz
+except ImportError:
+    pass
+
+
+def montant(v):
+    return f"{int(v):,}".replace(",", " ")
+
+def releve_orabank(pages=3, par_page=20, par_date=5, seed=0, solde_initial=500_000_000):
+    """
+    Octets d'un relevé au modèle Orabank et transactions attendues [(débit, crédit, solde)] dans l'ordre du relevé.
+    par_date transactions consécutives partagent la même date (y compris d'une page à la suivante).
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    solde, attendues = solde_initial, []
+    for p in range(pages):
+        page = doc.new_page(width=595, height=842)
+        y = 60
+        page.insert_text((200, 40), "EXTRAIT DE COMPTE", fontsize=9)
+        for x, texte in [(40, "Date"), (100, "Libellé"), (290, "Valeur"), (370, "Débit"), (450, "Crédit"), (530, "Solde")]:
+            page.insert_text((x, y), texte, fontsize=8)
+        y += 14
+        if p == 0:
+            page.insert_text((100, y), "Solde précédent", fontsize=8)
+            page.insert_text((530, y), montant(solde_initial), fontsize=8)
+            y += 14
+        for i in range(par_page):
+            n = p * par_page + i
+            valeur, debit = rng.randint(1, 500) * 1000, rng.random() < 0.6
+            solde += -valeur if debit else valeur
+            date = f"{1 + n // par_date:02d}/03/2024"
+            page.insert_text((40, y), date, fontsize=8)
+            page.insert_text((100, y), f"CHQ {1000000 + n} LIB", fontsize=8)
+            page.insert_text((290, y), date, fontsize=8)
+            page.insert_text((370 if debit else 450, y), montant(valeur), fontsize=8)
+            page.insert_text((530, y), montant(solde), fontsize=8)
+            attendues.append((float(valeur) if debit else 0.0, 0.0 if debit else float(valeur), float(solde)))
+            y += 12
+        page.insert_text((250, 800), f"Page {p + 1}/{pages}", fontsize=8)
+        page.insert_text((150, 815), "www.orabank.net RCCM", fontsize=8)
+    octets = doc.tobytes()
+    doc.close()
+    return octets, attendues
+
+def mouvements(df):
+    """(débit, crédit, solde) des transactions extraites, sans la ligne de solde précédent."""
+    df = df[df['libelle'] != 'SOLDE PRECEDENT']
+    return [tuple(map(float, ligne)) for ligne in df[['debit', 'credit', 'solde']].itertuples(index=False)]
+
+def releve_decale(pages=6, par_page=25, seed=1, solde_initial=500_000_000, marqueur="BANQUE EXEMPLE SA"):
+    """
+    Relevé d'une banque sans profil, au tableau décalé par rapport aux bornes Orabank
+    (montants alignés à droite, libellés de longueur variable), 4 opérations par date.
+    """
+    rng = random.Random(seed)
+    police = fitz.Font("helv")
+    doc = fitz.open()
+    solde, attendues = solde_initial, []
+
+    def a_droite(page, x, y, texte):
+        page.insert_text((x - police.text_length(texte, 8), y), texte, fontsize=8)
+
+    for p in range(pages):
+        page = doc.new_page(width=595, height=842)
+        y = 60
+        page.insert_text((200, 40), "EXTRAIT DE COMPTE", fontsize=9)
+        for x, texte in [(25, "Date"), (80, "Libellé"), (315, "Valeur"), (400, "Débit"), (480, "Crédit"), (555, "Solde")]:
+            page.insert_text((x, y), texte, fontsize=8)
+        y += 14
+        if p == 0:
+            page.insert_text((80, y), "Solde précédent", fontsize=8)
+            a_droite(page, 590, y, montant(solde_initial))
+            y += 14
+        for i in range(par_page):
+            valeur, debit = rng.randint(1, 5000) * 1000, rng.random() < 0.6
+            solde += -valeur if debit else valeur
+            date = f"{min(28, 1 + (p * par_page + i) // 4):02d}/03/2024"
+            libelle = " ".join(rng.choice(["VIR", "PRLV", "CHQ", "FACTURE", "SALAIRE", "FRAIS TENUE", "COMMISSION"])
+                               for _ in range(rng.randint(1, 5)))
+            page.insert_text((25, y), date, fontsize=8)
+            page.insert_text((80, y), libelle, fontsize=8)
+            page.insert_text((315, y), date, fontsize=8)
+            a_droite(page, 445 if debit else 530, y, montant(valeur))
+            a_droite(page, 590, y, montant(solde))
+            attendues.append((float(valeur) if debit else 0.0, 0.0 if debit else float(valeur), float(solde)))
+            y += 12
+        page.insert_text((250, 800), f"Page {p + 1}/{pages}", fontsize=8)
+        page.insert_text((150, 815), marqueur, fontsize=8)
+    octets = doc.tobytes()
+    doc.close()
+    return octets, attendues
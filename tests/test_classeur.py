@@ -0,0 +1,35 @@
+import openpyxl
+import pandas as pd
+
+import _02_rapp
+
+
+def _classeur():
+    ops = pd.DataFrame({'raw_date': [pd.Timestamp(2024, 3, 5)], 'date_str': ["05/03/2024"], 'libelle': ["CHQ 1"],
+                        'col_C': [0.0], 'col_D': [1500.0], 'col_E': [0.0], 'col_F': [0.0]})
+    feuilles = [('RELEVE_NON_POINTEE', pd.DataFrame({'date': ["05/03/2024"], 'debit': [1500.0]}))]
+    rapprochement = dict(solde_compta=1000.0, solde_banque=2500.0, all_ops=ops, totaux=(1000.0, 1500.0, 0.0, 2500.0),
+                         rectifie=(1500.0, 0.0, 0.0, 0.0), label_rectif="Solde rectifié")
+    return openpyxl.load_workbook(_02_rapp.ecrire_classeur(feuilles, rapprochement))
+
+def test_entetes_fusionnes_apres_enregistrement():
+    ws = _classeur()['RAPPROCHEMENT']
+    assert sorted(str(p) for p in ws.merged_cells.ranges) == ['A1:A2', 'B1:B2', 'C1:D1', 'E1:F1']
+    assert [c.value for c in ws[1]] == ["Date", "Libellés", "Compte courant", None, "Relevé bancaire", None]
+    assert [c.value for c in ws[4]][:2] == ["05/03/2024", "CHQ 1"]
+    assert ws['D4'].number_format == '#,##0'
+
+def test_feuilles_dans_l_ordre():
+    assert _classeur().sheetnames == ['RELEVE_NON_POINTEE', 'RAPPROCHEMENT']
+
+def test_fichiers_produits_a_la_demande(monkeypatch):
+    appels = []
+    monkeypatch.setattr(_02_rapp, "ecrire_classeur", lambda *a: appels.append("excel") or __import__("io").BytesIO(b"xlsx"))
+    releve = pd.DataFrame({"date": ["05/03/2024"], "libelle": ["VIR"], "debit": [100.0], "credit": [0.0], "solde": [900.0]})
+    journal = pd.DataFrame({"Date": ["05/03/2024"], "Libellé": ["VIR"], "Débit": [None], "Crédit": [100.0], "Solde": [0.0]})
+    resultat = _02_rapp.executer_rapprochement(releve, journal, date_rapprochement=pd.Timestamp(2024, 3, 31).date())
+    # Aperçu : aucune sérialisation
+    resultat.tableau_rapprochement()
+    assert resultat.suspens_compta is not None and appels == []
+    assert resultat.excel_bytes == b"xlsx" and resultat.excel_bytes == b"xlsx"
+    assert appels == ["excel"]
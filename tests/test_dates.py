@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import _02_rapp
+
+
+def test_formats_et_valeurs_invalides():
+    dates, vides = _02_rapp.normaliser_dates(["05/03/2024", "2024-03-06", None, "pas une date", pd.Timestamp(2024, 3, 7)])
+    assert list(vides) == [False, False, True, False, False]
+    assert dates[0] == pd.Timestamp(2024, 3, 5) and dates[1] == pd.Timestamp(2024, 3, 6) and dates[4] == pd.Timestamp(2024, 3, 7)
+    assert pd.isna(dates[2]) and pd.isna(dates[3])
+
+def test_cache_borne_et_conversions_concurrentes(monkeypatch):
+    # Cache minuscule : chaque appel évince les dates des autres fils pendant leur conversion
+    monkeypatch.setattr(_02_rapp, "MAX_CACHE_DATES", 50)
+    monkeypatch.setattr(_02_rapp, "_cache_dates", {})
+
+    def convertir(n):
+        textes = [f"{1 + (n + i) % 28:02d}/{1 + i % 12:02d}/20{10 + n % 15}" for i in range(200)]
+        dates, _ = _02_rapp.normaliser_dates(textes)
+        return list(dates) == [pd.Timestamp(pd.to_datetime(t, format="%d/%m/%Y")) for t in textes]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert all(executor.map(convertir, range(16)))
+    assert len(_02_rapp._cache_dates) <= 50
+
+def test_valeurs_non_textes_converties_en_un_appel(monkeypatch):
+    import datetime
+
+    def interdit(val):
+        raise AssertionError(f"conversion valeur par valeur : {val!r}")
+
+    monkeypatch.setattr(_02_rapp, "_parser_date_libre", interdit)
+    valeurs = [pd.Timestamp(2024, 3, 6), datetime.date(2024, 3, 7), datetime.datetime(2024, 3, 8, 10), "09/03/2024", None]
+    dates, vides = _02_rapp.normaliser_dates(valeurs)
+    assert list(dates[:4]) == [pd.Timestamp(2024, 3, 6), pd.Timestamp(2024, 3, 7), pd.Timestamp(2024, 3, 8, 10), pd.Timestamp(2024, 3, 9)]
+    assert list(vides) == [False, False, False, False, True]
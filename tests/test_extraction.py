@@ -0,0 +1,40 @@
+import pytest
+
+from releves import fitz, releve_orabank, mouvements
+
+pytestmark = pytest.mark.skipif(fitz is None, reason="PyMuPDF non installé")
+
+import extract_table
+
+
+def test_ordre_des_operations_de_meme_date(capsys):
+    # 7 opérations par date sur des pages de 10 : des dates à cheval sur deux pages
+    octets, attendues = releve_orabank(pages=3, par_page=10, par_date=7)
+    df = extract_table.extract_statement_from_bytes(octets, max_workers=1)
+    assert mouvements(df) == attendues
+    # Ordre conservé : aucun solde "corrigé" à tort
+    assert "Correction" not in capsys.readouterr().out
+
+def test_ordre_identique_en_parallele():
+    octets, attendues = releve_orabank(pages=4, par_page=20, par_date=6, seed=3)
+    df = extract_table.extract_statement_parallel(octets, max_workers=2, pages_per_shard=1)
+    assert mouvements(df) == attendues
+
+def test_releve_ouvert_une_seule_fois(monkeypatch):
+    import main
+    octets, attendues = releve_orabank(pages=2)
+    ouvertures = []
+    ouvrir = fitz.open
+    monkeypatch.setattr(fitz, "open", lambda *a, **k: ouvertures.append(1) or ouvrir(*a, **k))
+    df = main.run_extraction_in_memory(octets, bank_name="Orabank", use_cache=False, max_workers=1)
+    assert mouvements(df) == attendues
+    assert len(ouvertures) == 1
+
+def test_banque_non_parametree():
+    import main
+    # Relevé sans marqueur reconnaissable ni tableau : la banque indiquée doit être paramétrée
+    vide = fitz.open()
+    vide.new_page()
+    octets_vides = vide.tobytes()
+    with pytest.raises(ValueError, match="paramétrée"):
+        main.run_extraction_in_memory(octets_vides, bank_name="Banque Inconnue", use_cache=False, max_workers=1)
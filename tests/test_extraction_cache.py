@@ -0,0 +1,28 @@
+import os
+
+import extraction_cache
+
+
+def _entree(path, taille, age):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * taille)
+    os.utime(path, (1_000_000 + age, 1_000_000 + age))
+
+def test_budget_commun_aux_releves_et_aux_pages(tmp_path):
+    cache_dir = str(tmp_path)
+    pages_dir = os.path.join(cache_dir, "pages")
+    _entree(os.path.join(cache_dir, "ancien.parquet"), 400, age=1)
+    _entree(os.path.join(pages_dir, "p1.json"), 300, age=2)
+    _entree(os.path.join(cache_dir, "recent.parquet"), 400, age=3)
+    _entree(os.path.join(pages_dir, "p2.json"), 300, age=4)
+
+    extraction_cache.evict_lru(cache_dir, max_bytes=800)
+
+    restants = sorted(os.listdir(cache_dir)) + sorted(os.listdir(pages_dir))
+    # 1400 octets pour 800 : les deux entrées les plus anciennes sortent, quel que soit leur niveau
+    assert restants == ["pages", "recent.parquet", "p2.json"]
+    assert sum(size for _, size, _ in extraction_cache._cache_entries(cache_dir)) <= 800
+
+def test_cache_absent(tmp_path):
+    extraction_cache.evict_lru(str(tmp_path / "absent"), max_bytes=0)
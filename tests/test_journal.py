@@ -0,0 +1,56 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import _02_rapp
+from _02_rapp import _texte_en_nombre
+
+
+@pytest.mark.parametrize("texte, attendu", [
+    ("1 500 000", 1500000.0), ("1 500", 1500.0),
+    ("1.500.000", 1500000.0), ("1,500,000", 1500000.0),   # Séparateur répété : milliers
+    ("1.500", 1500.0), ("1,500", 1500.0), ("-1.500", -1500.0),  # Suivi de trois chiffres : milliers
+    ("1.500,50", 1500.5), ("1,500.50", 1500.5), ("1.500.000,25", 1500000.25),
+    ("1500,5", 1500.5), ("12.75", 12.75), ("0,125", 0.125), (".5", 0.5), ("1500", 1500.0),
+])
+def test_montants_textes(texte, attendu):
+    assert _texte_en_nombre(texte) == attendu
+
+@pytest.mark.parametrize("texte", ["abc", "1.50.0", "15.00.000,5", "12a", "1,5,00"])
+def test_montants_illisibles(texte):
+    assert np.isnan(_texte_en_nombre(texte))
+
+def _csv(texte, nom="journal.csv"):
+    f = io.BytesIO(texte.encode("utf-8"))
+    f.name = nom
+    return f
+
+def test_journal_csv_milliers_a_points():
+    df = _02_rapp.charger_journal(_csv("Date;Libellé;Débit;Crédit\n05/03/2024;LOYER;1.500.000;\n06/03/2024;REMISE;;2.500\n07/03/2024;FRAIS;-;\n"))
+    assert df["Débit"].fillna(0).tolist() == [1500000.0, 0.0, 0.0]
+    assert df["Crédit"].fillna(0).tolist() == [0.0, 2500.0, 0.0]
+
+def test_journal_montant_illisible_signale():
+    with pytest.raises(ValueError, match=r"Débit.*ligne 3 : '12a'"):
+        _02_rapp.charger_journal(_csv("Date;Libellé;Débit;Crédit\n05/03/2024;LOYER;1 000;\n06/03/2024;FRAIS;12a;\n"))
+
+def test_journal_par_blocs_ligne_du_fichier():
+    contenu = "Date;Libellé;Débit;Crédit\n" + "05/03/2024;LOYER;1 000;\n" * 9 + "06/03/2024;FRAIS;1,2,3;\n"
+    with pytest.raises(ValueError, match="ligne 11"):
+        list(_02_rapp.lire_journal_par_blocs(_csv(contenu), taille_bloc=4))
+
+def test_dates_du_journal_conservees_a_l_export():
+    journal = _csv("Date;Date valeur;Libellé;Débit;Crédit\n05/03/2024;06/03/2024;LOYER;1 000;\n07/03/2024;08/03/2024;FRAIS;250;\n")
+    df = _02_rapp.charger_journal(journal)
+    assert df["Date valeur"].tolist() == ["06/03/2024", "08/03/2024"]
+
+    journal.seek(0)
+    releve = pd.DataFrame({"date": ["01/03/2024"], "libelle": ["Solde précédent"], "debit": [0.0], "credit": [0.0], "solde": [0.0]})
+    resultat = _02_rapp.executer_rapprochement(releve, journal, date_rapprochement=pd.Timestamp(2024, 3, 31).date())
+    non_pointees = resultat.suspens_compta
+    # Colonnes normalisées (minuscules) ; dates saisies jour en premier, reprises telles quelles
+    assert non_pointees["date"].tolist() == ["05/03/2024", "07/03/2024"]
+    assert non_pointees["date valeur"].tolist() == ["06/03/2024", "08/03/2024"]
+    assert not non_pointees.astype(str).apply(lambda c: c.str.contains("00:00:00")).any().any()
@@ -0,0 +1,38 @@
+import pytest
+
+from releves import fitz, releve_decale, mouvements
+
+pytestmark = pytest.mark.skipif(fitz is None, reason="PyMuPDF non installé")
+
+import bank_profiles
+import extract_table
+import layout_inference
+
+
+def test_bornes_deduites_du_releve():
+    octets, _ = releve_decale()
+    doc = fitz.open(stream=octets, filetype="pdf")
+    try:
+        profile = extract_table.profile_for_document(doc, "Banque inconnue")
+    finally:
+        doc.close()
+    assert profile.name == bank_profiles.GENERIC.name
+    edges = list(profile.column_bounds.values())
+    assert edges == sorted(edges)
+    # Dates < 315 (valeur) ; débit aligné à droite sur 445, crédit sur 530
+    assert edges[0] < 80 < edges[1] < 315 < edges[2] < 445 < edges[3] < 530 < edges[4] < 590
+
+def test_releve_decale_extrait_sans_correction(capsys):
+    octets, attendues = releve_decale()
+    df = extract_table.extract_statement_from_bytes(octets, max_workers=1, profile=None)
+    assert mouvements(df) == attendues  # 150/150, dans l'ordre du relevé
+    assert "Correction" not in capsys.readouterr().out
+
+def test_bornes_fixes_inadaptees():
+    # Sans inférence, les bornes Orabank envoient les montants dans la mauvaise colonne
+    octets, attendues = releve_decale()
+    df = extract_table.extract_statement_from_bytes(octets, max_workers=1, profile=bank_profiles.ORABANK)
+    assert mouvements(df) != attendues
+
+def test_tableau_non_reconnu():
+    assert layout_inference.infer_column_bounds([[]], bank_profiles.ORABANK) is None
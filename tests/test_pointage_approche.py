@@ -0,0 +1,30 @@
+from _02_rapp import NAT_JOURS, chercher_pointage_approche, construire_index_trie
+
+
+def _index(lignes):
+    montants, jours = zip(*lignes)
+    return construire_index_trie(list(montants), list(jours), [f"c{i}" for i in range(len(lignes))])
+
+def test_montant_recurrent_date_la_plus_proche():
+    # Loyer mensuel : même montant à chaque échéance
+    index = _index([(150000.0, 100), (150000.0, 130), (150000.0, 160), (150000.0, 190)])
+    utilises = set()
+    assert chercher_pointage_approche(index, 150000.0, 162, 0, 5, utilises) == ("c2", 0.8, 0.0, 2)
+    assert chercher_pointage_approche(index, 150000.0, 131, 0, 5, utilises)[0] == "c1"
+    # Plus aucune échéance dans la fenêtre
+    assert chercher_pointage_approche(index, 150000.0, 161, 0, 5, utilises) is None
+    assert utilises == {"c1", "c2"}
+
+def test_a_ecart_egal_la_ligne_la_plus_haute():
+    index = _index([(500.0, 12), (500.0, 8), (500.0, 12), (500.0, 8)])
+    utilises = set()
+    assert [chercher_pointage_approche(index, 500.0, 10, 0, 3, utilises)[0] for _ in range(4)] == ["c0", "c1", "c2", "c3"]
+
+def test_tolerance_et_dates_inconnues():
+    index = _index([(1000.0, NAT_JOURS), (1002.0, 50), (990.0, 50), (1000.0, 70)])
+    utilises = {"c1"}
+    # 1000 sans date (0.5) contre 990 à la bonne date (1 - 0.5 * 10/20 = 0.75)
+    assert chercher_pointage_approche(index, 1000.0, 50, 20, 10, utilises) == ("c2", 0.75, 10.0, 0)
+    assert chercher_pointage_approche(index, 1000.0, 50, 20, 10, utilises)[0] == "c0"
+    # Date du relevé inconnue : pénalité maximale pour tous, montant exact d'abord
+    assert chercher_pointage_approche(index, 1000.0, NAT_JOURS, 20, 10, utilises) == ("c3", 0.5, 0.0, None)
@@ -0,0 +1,58 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import _02_rapp as rapp
+
+DATE_ARRETE = pd.Timestamp(2024, 3, 31).date()
+MONTANTS = [1000, 2500, 5000, 12000, 15000, 33000, 100000]
+LIBELLES = ['CHQ 1234567', 'VIR 998877 CLIENT', 'FRAIS', 'PRLV 445566', 'REM 555']
+
+
+def sources(seed=0, n_banque=80, n_compta=90):
+    rng = random.Random(seed)
+    banque, solde = [], 1e6
+    for i in range(n_banque):
+        montant, debit = rng.choice(MONTANTS), rng.random() < 0.5
+        solde += -montant if debit else montant
+        banque.append({"N° d'ordre": i + 1, 'date': f"{rng.randint(1, 28):02d}/03/2024", 'date_valeur': '01/03/2024',
+                       'libelle': rng.choice(LIBELLES), 'debit': montant if debit else 0.0,
+                       'credit': 0.0 if debit else montant, 'solde': solde})
+    compta = []
+    for _ in range(n_compta):
+        montant, debit = rng.choice(MONTANTS), rng.random() < 0.5
+        compta.append({'Date': f"{rng.randint(1, 28):02d}/03/2024", 'Libellé': rng.choice(LIBELLES), 'Référence': 'X',
+                       'Débit': montant if debit else np.nan, 'Crédit': np.nan if debit else montant, 'Solde': 5e5 + montant})
+    return pd.DataFrame(banque), pd.DataFrame(compta)
+
+def resume(resultat):
+    return resultat.stats['suspens_banque'], resultat.stats['suspens_compta'], resultat.suspens_ouverts()
+
+
+@pytest.mark.parametrize("sep", [';', ','])
+def test_journal_csv_partitionne_identique(tmp_path, sep):
+    df_banque, df_compta = sources()
+    chemin = tmp_path / 'journal.csv'
+    df_compta.to_csv(chemin, sep=sep, index=False, encoding='utf-8-sig')
+
+    normal = rapp.executer_rapprochement(df_banque.copy(), str(chemin), date_rapprochement=DATE_ARRETE)
+    partitionne = rapp.executer_rapprochement_partitionne(df_banque, str(chemin), date_rapprochement=DATE_ARRETE,
+                                                          nb_partitions=4, taille_bloc=7, dossier_travail=str(tmp_path))
+
+    assert resume(partitionne) == resume(normal)
+    # Le journal a bien été lu en colonnes (un séparateur mal détecté donne une seule colonne, sans montants)
+    assert normal.stats['suspens_compta'] < len(df_compta)
+
+def test_journal_parquet_partitionne_identique(tmp_path):
+    pytest.importorskip('pyarrow')
+    df_banque, df_compta = sources(seed=1)
+    chemin = tmp_path / 'journal.parquet'
+    df_compta.to_parquet(chemin, index=False)
+
+    normal = rapp.executer_rapprochement(df_banque.copy(), str(chemin), date_rapprochement=DATE_ARRETE)
+    partitionne = rapp.executer_rapprochement_partitionne(df_banque, str(chemin), date_rapprochement=DATE_ARRETE,
+                                                          nb_partitions=3, taille_bloc=10, dossier_travail=str(tmp_path))
+
+    assert resume(partitionne) == resume(normal)
@@ -0,0 +1,31 @@
+import time
+
+import pytest
+
+import _02_rapp
+from _02_rapp import NAT_JOURS, BudgetEpuise, pointer_regroupements
+
+
+def test_remise_expliquee_par_les_cheques_proches_en_date():
+    cibles = [("remise", 4500.0, 100)]
+    candidats = [("chq1", 1000.0, 98), ("chq2", 1500.0, 99), ("chq3", 2000.0, 101),
+                 ("loin", 2000.0, 140), ("sans_date", 3500.0, NAT_JOURS), ("trop_gros", 5000.0, 100)]
+    utilises_cibles, utilises_candidats = set(), {"chq3"}
+    groupes = pointer_regroupements(cibles, candidats, 3, 5, time.monotonic() + 10, utilises_cibles, utilises_candidats)
+    # chq3 est déjà pointé, "loin" sort de la fenêtre : 1000 + 3500 (ligne sans date)
+    assert groupes == [("remise", ["chq1", "sans_date"])]
+    assert utilises_cibles == {"remise"} and {"chq1", "sans_date"} <= utilises_candidats
+
+def test_plafond_garde_les_candidats_les_plus_proches(monkeypatch):
+    monkeypatch.setattr(_02_rapp, "MAX_CANDIDATS_REGROUPEMENT", 3)
+    cibles = [("t", 300.0, 0)]
+    candidats = [("loin_a", 100.0, 50), ("loin_b", 200.0, 50), ("proche_a", 100.0, 1), ("proche_b", 200.0, 2), ("proche_c", 50.0, 0)]
+    groupes = pointer_regroupements(cibles, candidats, 2, None, time.monotonic() + 10, set(), set())
+    assert groupes == [("t", ["proche_a", "proche_b"])]
+
+def test_budget_verifie_pour_chaque_cible():
+    # Aucun candidat éligible (tous plus gros que la cible) : seul le contrôle de la boucle des cibles s'applique
+    cibles = [("t", 300.0, 0)]
+    candidats = [("a", 400.0, 0), ("b", 500.0, 0)]
+    with pytest.raises(BudgetEpuise):
+        pointer_regroupements(cibles, candidats, 2, None, time.monotonic() - 1, set(), set())
@@ -0,0 +1,18 @@
+import warnings
+
+import pandas as pd
+
+import _02_rapp
+
+
+def test_solde_precedent_retire_des_colonnes_texte():
+    releve = pd.DataFrame({
+        "Libellé": pd.array(["Solde précédent", "VIR 1"], dtype="string"),
+        "Date": ["01/03/2024", "02/03/2024"],
+        "Débit": [None, 100.0],
+    })
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        df = _02_rapp.normaliser_releve(releve)
+    assert df["libelle"].tolist() == ["VIR 1"]
+    assert df["credit"].tolist() == [0]
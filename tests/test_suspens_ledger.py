@@ -0,0 +1,32 @@
+import datetime
+
+import pytest
+
+import suspens_ledger
+
+
+def _suspens(libelle, montant):
+    return {'raw_date': '05/01/2024', 'libelle': libelle, 'col_C': montant, 'col_D': 0, 'col_E': 0, 'col_F': 0}
+
+def test_grand_livre_tenu_par_compte(tmp_path):
+    db = str(tmp_path / "suspens.sqlite")
+    suspens_ledger.enregistrer_suspens("u1", "TG001 01234", datetime.date(2024, 1, 31), [_suspens("CHQ 1", 100)], db_path=db)
+    suspens_ledger.enregistrer_suspens("u1", "TG001 09999", datetime.date(2024, 1, 31), [_suspens("CHQ 2", 200)], db_path=db)
+
+    # Deux comptes d'une même banque ne se mélangent pas ; le numéro est lu sans espaces ni casse
+    arrete, suspens = suspens_ledger.charger_suspens("u1", "tg00101234", datetime.date(2024, 2, 29), db_path=db)
+    assert arrete == "2024-01-31"
+    assert [s['libelle'] for s in suspens] == ["CHQ 1"]
+    assert suspens_ledger.charger_suspens("u2", "TG001 01234", db_path=db) is None
+
+def test_arrete_repris_et_arrete_sans_suspens(tmp_path):
+    db = str(tmp_path / "suspens.sqlite")
+    suspens_ledger.enregistrer_suspens("u1", "C1", "31/01/2024", [_suspens("CHQ 1", 100)], db_path=db)
+    suspens_ledger.enregistrer_suspens("u1", "C1", "29/02/2024", [], db_path=db)
+
+    assert suspens_ledger.charger_suspens("u1", "C1", "31/03/2024", db_path=db) == ("2024-02-29", [])
+    assert suspens_ledger.charger_suspens("u1", "C1", "29/02/2024", db_path=db)[0] == "2024-01-31"
+
+def test_compte_obligatoire(tmp_path):
+    with pytest.raises(ValueError):
+        suspens_ledger.enregistrer_suspens("u1", "  ", "31/01/2024", [], db_path=str(tmp_path / "s.sqlite"))